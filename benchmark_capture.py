@@ -0,0 +1,92 @@
+"""
+Benchmark screenshot capture profiles
+Captures the local chat stand-in page (fixtures/chat_standin.html) with each
+profile and reports bytes per order, capture time and upload time.
+
+Usage:
+    python benchmark_capture.py                 # estimate upload time from --uplink-mbps
+    python benchmark_capture.py --upload        # really upload to FOLDER_ID in config.ini
+"""
+import argparse
+import os
+import time
+
+from shopee_module import CAPTURE_PROFILES, CaptureProfile, Screenshot, ShopeeAutomation
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def run_benchmark(orders=5, uplink_mbps=10.0, upload=False, device_scale_factor=1.25):
+    from playwright.sync_api import sync_playwright
+
+    service = folder_id = None
+    if upload:
+        from shopee_automation import get_gdrive_service, load_config, upload_to_gdrive
+        service = get_gdrive_service()
+        folder_id = load_config().get('GOOGLE_DRIVE', 'FOLDER_ID')
+        if not service:
+            print("✗ Could not connect to Google Drive, estimating upload time instead")
+            upload = False
+
+    url = 'file://' + os.path.join(FIXTURES, 'chat_standin.html')
+    results = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page(viewport={'width': 1920, 'height': 1080},
+                                device_scale_factor=device_scale_factor)
+        page.goto(url)
+        for name in CAPTURE_PROFILES:
+            shopee = ShopeeAutomation('', '', headless=True, capture_profile=CaptureProfile.from_name(name))
+            profile = shopee.capture_profile
+            sizes, capture_times, upload_times = [], [], []
+            for i in range(orders):
+                started = time.perf_counter()
+                data = shopee._capture(page)
+                capture_times.append(time.perf_counter() - started)
+                sizes.append(len(data))
+                if upload:
+                    screenshot = Screenshot(f"BENCH{i:04d}", f"BENCH{i:04d}_{name}{profile.extension}",
+                                            data, profile.mime_type)
+                    started = time.perf_counter()
+                    upload_to_gdrive(service, screenshot, folder_id)
+                    upload_times.append(time.perf_counter() - started)
+                else:
+                    upload_times.append(sizes[-1] * 8 / (uplink_mbps * 1_000_000))
+            results[name] = {
+                'profile': profile.describe(),
+                'bytes': sum(sizes) / orders,
+                'capture': sum(capture_times) / orders,
+                'upload': sum(upload_times) / orders
+            }
+        browser.close()
+    return results
+
+
+def print_results(results, upload, uplink_mbps):
+    baseline = results.get('lossless')
+    source = "measured" if upload else f"estimated at {uplink_mbps:g} Mbit/s"
+    print("\n" + "="*86)
+    print(f"{'Profile':10s} {'Encoding':34s} {'KB/order':>10s} {'Capture':>9s} {'Upload':>9s} {'vs PNG':>9s}")
+    print("="*86)
+    for name, result in results.items():
+        ratio = f"{result['bytes'] / baseline['bytes'] * 100:.0f}%" if baseline else "-"
+        print(f"{name:10s} {result['profile']:34s} {result['bytes'] / 1024:10.1f} "
+              f"{result['capture'] * 1000:7.0f}ms {result['upload'] * 1000:7.0f}ms {ratio:>9s}")
+    print("="*86)
+    print(f"Upload time per order is {source}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5, help="Screenshots per profile (default: 5)")
+    parser.add_argument('--uplink-mbps', type=float, default=10.0,
+                        help="Uplink speed for the upload time estimate (default: 10)")
+    parser.add_argument('--upload', action='store_true', help="Upload to Google Drive and time it")
+    args = parser.parse_args()
+
+    try:
+        results = run_benchmark(args.orders, args.uplink_mbps, args.upload)
+    except Exception as e:
+        print(f"⚠ Benchmark needs a Playwright browser (playwright install chromium): {e}".splitlines()[0])
+    else:
+        print_results(results, args.upload, args.uplink_mbps)
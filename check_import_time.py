@@ -0,0 +1,80 @@
+"""
+Import-time budget check
+Imports each lightweight entry point in a fresh interpreter with
+`python -X importtime` and fails when it takes longer than its budget or pulls
+in one of the heavy dependencies (Playwright, Google API clients, aiohttp,
+openpyxl), which must stay behind the functions that need them.
+
+Usage:
+    python check_import_time.py            # exit code 1 if any budget is exceeded
+"""
+import os
+import subprocess
+import sys
+
+# Milliseconds allowed for a cold import (generous: a few times what it takes today)
+IMPORT_BUDGETS_MS = {
+    'shopee_automation': 150,
+    'checkpoint_store': 40,
+    'excel_report': 40,
+    'screenshots': 40,
+    'upload_cache': 40,
+    'run_summary': 40,
+    'job_store': 40,
+    'shard_runner': 150,
+    'drive_retry': 60
+}
+HEAVY_MODULES = ('playwright', 'googleapiclient', 'google_auth_oauthlib', 'google.oauth2', 'google.auth',
+                 'httplib2', 'aiohttp', 'openpyxl', 'pandas')
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module):
+    """
+    Import `module` in a new interpreter.
+
+    Returns:
+        tuple: (cumulative import time in ms, list of heavy modules it loaded)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative_us = None
+    heavy = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        name = name.strip()
+        if name == module:
+            cumulative_us = int(cumulative)
+        for heavy_module in HEAVY_MODULES:
+            if name == heavy_module or name.startswith(heavy_module + '.'):
+                heavy.add(heavy_module)
+    return (cumulative_us or 0) / 1000, sorted(heavy)
+
+
+def check_import_budgets(budgets=IMPORT_BUDGETS_MS):
+    """
+    Measure every entry point against its budget and print a table.
+
+    Returns:
+        list: Descriptions of the budgets that were exceeded (empty when all pass)
+    """
+    failures = []
+    print(f"{'Module':20s} {'Import':>9s} {'Budget':>8s}  Heavy dependencies")
+    for module, budget in budgets.items():
+        elapsed, heavy = measure_import(module)
+        status = "✓" if elapsed <= budget and not heavy else "✗"
+        print(f"{status} {module:18s} {elapsed:7.1f}ms {budget:6d}ms  {', '.join(heavy) or '-'}")
+        if elapsed > budget:
+            failures.append(f"{module} took {elapsed:.0f}ms (budget {budget}ms)")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)}")
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_import_budgets()
+    for failure in failures:
+        print(f"✗ {failure}")
+    sys.exit(1 if failures else 0)
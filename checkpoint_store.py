@@ -0,0 +1,247 @@
+"""
+Checkpoint Journal Module
+Append-only JSONL store for processed orders (resume capability)
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class CheckpointJournal:
+    """
+    Append-only checkpoint journal.
+
+    Every processed order is written as one JSON line, so saving is O(1)
+    instead of rewriting the whole file. Lines are flushed immediately and
+    fsync'ed in batches. A partially written last line (crash mid-write) is
+    ignored on load and repaired by the next compaction.
+
+    Records without a gdrive_link but with an 'upload_session' mark a large
+    upload that was started but not finished; they are not counted as
+    processed and are superseded by the order's final record. Records of
+    the same order are merged field by field, so such a record written
+    after the order was processed keeps its link.
+    """
+
+    def __init__(self, path, legacy_path=None, fsync_every=10, fsync_interval=5.0,
+                 compact_min_lines=200, compact_ratio=2.0):
+        """
+        Args:
+            path: Path to the JSONL journal file
+            legacy_path: Old single-document JSON checkpoint to migrate (optional)
+            fsync_every: fsync after this many appended records
+            fsync_interval: fsync when this many seconds passed since the last one
+            compact_min_lines: Never compact journals shorter than this
+            compact_ratio: Compact when lines exceed unique orders by this factor
+        """
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_min_lines = compact_min_lines
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self._lines = None
+        self._orders = None
+        self._sessions = {}
+        self._tail_checked = False
+
+    def _read(self):
+        """
+        Read the journal.
+
+        Returns:
+            tuple: (dict of order_number -> record, line count, needs_repair)
+        """
+        orders = {}
+        lines = 0
+        needs_repair = False
+        with open(self.path, 'rb') as f:
+            raw_lines = f.read().split(b'\n')
+        # A trailing newline leaves an empty last element
+        if raw_lines and raw_lines[-1] == b'':
+            raw_lines.pop()
+        elif raw_lines:
+            needs_repair = True
+        for i, raw in enumerate(raw_lines):
+            if not raw.strip():
+                continue
+            lines += 1
+            try:
+                record = json.loads(raw)
+                order_number = record['order_number']
+            except (ValueError, KeyError, TypeError):
+                needs_repair = True
+                if i != len(raw_lines) - 1:
+                    print(f"⚠ Warning: Skipping corrupt checkpoint line {i + 1}")
+                continue
+            # Later fields win, but a record without a link (e.g. the upload
+            # session of a retry) never erases the link of an earlier record
+            previous = orders.pop(order_number, {})
+            merged = {**previous, **record}
+            if record.get('gdrive_link'):
+                if 'upload_session' not in record:
+                    merged.pop('upload_session', None)
+            elif previous.get('gdrive_link'):
+                merged['gdrive_link'] = previous['gdrive_link']
+            orders[order_number] = merged
+        return orders, lines, needs_repair
+
+    def _migrate_legacy(self):
+        """Convert an old processed_orders.json document into the journal."""
+        with open(self.legacy_path, 'r') as f:
+            legacy = json.load(f)
+        orders = {}
+        for record in legacy.get('processed_orders', []):
+            orders.pop(record['order_number'], None)
+            orders[record['order_number']] = record
+        self._write_compacted(orders)
+        os.remove(self.legacy_path)
+        print(f"✓ Migrated {len(orders)} orders from {self.legacy_path}")
+        return orders
+
+    def _write_compacted(self, orders):
+        """Atomically replace the journal with one line per order."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in orders.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._lines = len(orders)
+        self._orders = set(orders)
+        self._pending = 0
+        self._tail_checked = True
+
+    def _should_compact(self, lines, unique):
+        return lines >= self.compact_min_lines and lines > unique * self.compact_ratio
+
+    def load(self):
+        """
+        Load the checkpoint.
+
+        Returns:
+            dict: 'processed_orders' list of records, 'order_numbers' set for
+                  fast membership checks, 'timestamp' of the last record and
+                  'upload_sessions' dict of unfinished uploads by order number
+        """
+        with self._lock:
+            if not os.path.exists(self.path):
+                if self.legacy_path and os.path.exists(self.legacy_path):
+                    orders = self._migrate_legacy()
+                else:
+                    self._lines = 0
+                    self._orders = set()
+                    self._sessions = {}
+                    return {'processed_orders': [], 'order_numbers': set(), 'timestamp': None,
+                            'upload_sessions': {}}
+            else:
+                orders, lines, needs_repair = self._read()
+                if needs_repair or self._should_compact(lines, len(orders)):
+                    self._write_compacted(orders)
+                else:
+                    self._lines = lines
+                    self._orders = set(orders)
+
+            records = [r for r in orders.values() if r.get('gdrive_link')]
+            self._sessions = {
+                order_number: record for order_number, record in orders.items()
+                if not record.get('gdrive_link') and record.get('upload_session')
+            }
+            return {
+                'processed_orders': records,
+                'order_numbers': {r['order_number'] for r in records},
+                'timestamp': records[-1].get('timestamp') if records else None,
+                'upload_sessions': dict(self._sessions)
+            }
+
+    def append(self, order_number, gdrive_link, **extra):
+        """
+        Append one processed order to the journal.
+
+        Args:
+            order_number: Order number that was processed
+            gdrive_link: Google Drive link for the screenshot (None for an
+                         unfinished upload recorded with upload_session=...)
+            **extra: Additional fields stored with the record
+        """
+        record = {
+            'order_number': order_number,
+            'gdrive_link': gdrive_link,
+            'timestamp': datetime.now().isoformat()
+        }
+        record.update(extra)
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self._orders is None or not os.path.exists(self.path):
+                # First use, or the journal was removed externally
+                self.load()
+
+            with open(self.path, 'a+b') as f:
+                if not self._tail_checked:
+                    # Never glue a new record onto a torn last line
+                    if f.tell() > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            f.write(b'\n')
+                    self._tail_checked = True
+                f.write(line.encode('utf-8'))
+                f.flush()
+                self._pending += 1
+                now = time.monotonic()
+                if self._pending >= self.fsync_every or now - self._last_fsync >= self.fsync_interval:
+                    os.fsync(f.fileno())
+                    self._pending = 0
+                    self._last_fsync = now
+
+            self._lines += 1
+            self._orders.add(order_number)
+            if gdrive_link:
+                self._sessions.pop(order_number, None)
+            elif record.get('upload_session'):
+                self._sessions[order_number] = record
+            if self._should_compact(self._lines, len(self._orders)):
+                self.compact()
+
+    def upload_session(self, order_number):
+        """
+        Returns:
+            dict: The unfinished upload record for order_number, or None
+        """
+        with self._lock:
+            if self._orders is None:
+                self.load()
+            return self._sessions.get(order_number)
+
+    def flush(self):
+        """fsync any records that were written since the last fsync."""
+        with self._lock:
+            if self._pending and os.path.exists(self.path):
+                with open(self.path, 'ab') as f:
+                    os.fsync(f.fileno())
+            self._pending = 0
+            self._last_fsync = time.monotonic()
+
+    def compact(self):
+        """Rewrite the journal with a single line per order."""
+        with self._lock:
+            if os.path.exists(self.path):
+                orders, _, _ = self._read()
+                self._write_compacted(orders)
+
+    def clear(self):
+        """Delete the journal (and any legacy checkpoint)."""
+        with self._lock:
+            for path in (self.path, self.legacy_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            self._lines = 0
+            self._orders = set()
+            self._sessions = {}
+            self._pending = 0
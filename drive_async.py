@@ -0,0 +1,232 @@
+"""
+Async Google Drive Module
+Drive v3 REST uploads and permission grants over one pooled keep-alive HTTP session
+"""
+import asyncio
+import json
+import uuid
+
+import aiohttp
+import httplib2
+from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+
+from drive_retry import NETWORK_ERROR, RATE_LIMITED, RetryEngine, classify_error
+
+DRIVE_API_URL = 'https://www.googleapis.com'
+FILE_FIELDS = 'id, webViewLink'
+
+
+def _http_error(status, headers, content, uri):
+    """HttpError for a failed response, so drive_retry classifies it like a googleapiclient error."""
+    resp = httplib2.Response({'status': status, **{k.lower(): v for k, v in headers.items()}})
+    return HttpError(resp, content, uri=uri)
+
+
+def _next_byte(range_header):
+    """First byte Drive still needs, from the Range header of a 308 response."""
+    if not range_header:
+        return 0
+    return int(range_header.rsplit('-', 1)[1]) + 1
+
+
+class AsyncDriveUploader:
+    """
+    Uploads files and grants permissions with the Drive v3 REST API on asyncio.
+
+    All requests share one aiohttp session whose connector keeps up to
+    max_connections keep-alive connections open, so many uploads can be in
+    flight without a thread (or a googleapiclient service) each. Requests are
+    rate limited and retried by the shared RetryEngine, and a 401 refreshes
+    the credentials once before the request is repeated.
+    """
+
+    def __init__(self, credentials, base_url=DRIVE_API_URL, max_connections=20, timeout=120, retry=None,
+                 simple_upload_limit=5 * 1024 * 1024, chunk_size=8 * 1024 * 1024):
+        """
+        Args:
+            credentials: google.auth credentials, e.g. get_gdrive_service().credentials
+            base_url: Drive API root (a local stand-in server in tests)
+            max_connections: Maximum open connections in the pool
+            timeout: Seconds before a single request is abandoned
+            retry: RetryEngine shared with the other Drive calls (default: a new one)
+            simple_upload_limit: Files up to this size are sent in one multipart request
+            chunk_size: Resumable upload chunk size (a multiple of 256 KB)
+        """
+        self.credentials = credentials
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retry = retry or RetryEngine()
+        self.simple_upload_limit = simple_upload_limit
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        # Created lazily so it belongs to the loop that runs the uploads
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _authorize(self, headers, refresh=False):
+        if refresh or not self.credentials.valid:
+            # google.auth refresh is blocking; SharedCredentials makes it happen once across workers
+            await asyncio.to_thread(self.credentials.refresh, Request())
+        self.credentials.apply(headers)
+
+    async def _send(self, method, url, data=None, headers=None, params=None, ok=(200,)):
+        """
+        Send one request, refreshing the token once on a 401.
+
+        Returns:
+            tuple: (status, response headers, body bytes)
+
+        Raises:
+            HttpError: For any status not in ok
+        """
+        headers = dict(headers or {})
+        for attempt in range(2):
+            await self._authorize(headers, refresh=attempt > 0)
+            self.requests += 1
+            async with self._get_session().request(method, url, data=data, headers=headers,
+                                                   params=params) as response:
+                content = await response.read()
+                if response.status == 401 and attempt == 0:
+                    continue
+                if response.status not in ok:
+                    raise _http_error(response.status, response.headers, content, url)
+                return response.status, response.headers, content
+
+    async def _call(self, func, description, max_retries=None):
+        """RetryEngine.call() for coroutines: waits with asyncio.sleep instead of blocking."""
+        attempts = max_retries or self.retry.max_retries
+        delay = self.retry.base_delay
+        for attempt in range(1, attempts + 1):
+            await asyncio.sleep(self.retry.reserve())
+            try:
+                result = await func()
+            except (HttpError, aiohttp.ClientError, OSError) as error:
+                reason = NETWORK_ERROR if isinstance(error, aiohttp.ClientError) else classify_error(error)
+                if reason is None:
+                    raise
+                retry_after = self.retry.record(error, reason)
+                if attempt >= attempts:
+                    raise
+                delay = max(self.retry.jitter(delay), retry_after or 0)
+                if reason == RATE_LIMITED:
+                    self.retry.bucket.pause(delay)
+                print(f"    ⚠ {description} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+            else:
+                self.retry.breaker.record_success()
+                return result
+
+    async def upload(self, name, data, mime_type, folder_id, resume_uri=None, on_session=None, max_retries=None):
+        """
+        Create a file in folder_id with the given bytes.
+
+        Files up to simple_upload_limit go in one multipart request; larger
+        ones use a chunked resumable session, which retries continue.
+
+        Args:
+            name: File name on Drive
+            data: File content
+            mime_type: Content type of data
+            folder_id: ID of the Google Drive folder to upload to
+            resume_uri: Session URI of an earlier, interrupted resumable upload of the same file
+            on_session: Optional callback(session_uri) when a resumable session is opened
+            max_retries: Maximum number of attempts (default: the RetryEngine's)
+
+        Returns:
+            dict: 'id' and 'webViewLink' of the new file
+        """
+        metadata = {'name': name, 'parents': [folder_id]}
+        if len(data) <= self.simple_upload_limit:
+            return await self._call(lambda: self._upload_multipart(metadata, data, mime_type), "Upload",
+                                    max_retries)
+        session = {'uri': resume_uri}
+        return await self._call(lambda: self._upload_resumable(metadata, data, mime_type, session, on_session),
+                                "Upload", max_retries)
+
+    async def _upload_multipart(self, metadata, data, mime_type):
+        boundary = uuid.uuid4().hex
+        body = b''.join([
+            f'--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n'.encode('utf-8'),
+            json.dumps(metadata).encode('utf-8'),
+            f'\r\n--{boundary}\r\nContent-Type: {mime_type}\r\n\r\n'.encode('utf-8'),
+            data,
+            f'\r\n--{boundary}--'.encode('utf-8')
+        ])
+        _, _, content = await self._send(
+            'POST', f'{self.base_url}/upload/drive/v3/files', data=body,
+            params={'uploadType': 'multipart', 'fields': FILE_FIELDS},
+            headers={'Content-Type': f'multipart/related; boundary={boundary}'}
+        )
+        return json.loads(content)
+
+    async def _upload_resumable(self, metadata, data, mime_type, session, on_session):
+        size = len(data)
+        offset = 0
+        if session.get('uri'):
+            # Ask how much of the interrupted upload Drive already has
+            status, headers, content = await self._send('PUT', session['uri'], data=b'',
+                                                        headers={'Content-Range': f'bytes */{size}'},
+                                                        ok=(200, 201, 308, 404, 410))
+            if status in (200, 201):
+                return json.loads(content)
+            if status == 308:
+                offset = _next_byte(headers.get('Range'))
+                print(f"    ↻ Resuming upload at {offset / 1048576:.1f} MB")
+            else:
+                print(f"    ⚠ Upload session expired, starting a new one")
+                session['uri'] = None
+        if not session.get('uri'):
+            _, headers, _ = await self._send(
+                'POST', f'{self.base_url}/upload/drive/v3/files', data=json.dumps(metadata).encode('utf-8'),
+                params={'uploadType': 'resumable', 'fields': FILE_FIELDS},
+                headers={'Content-Type': 'application/json; charset=UTF-8', 'X-Upload-Content-Type': mime_type,
+                         'X-Upload-Content-Length': str(size)}
+            )
+            session['uri'] = headers['Location']
+            if on_session:
+                on_session(session['uri'])
+        view = memoryview(data)
+        while True:
+            end = min(offset + self.chunk_size, size)
+            status, headers, content = await self._send(
+                'PUT', session['uri'], data=view[offset:end],
+                headers={'Content-Range': f'bytes {offset}-{end - 1}/{size}'}, ok=(200, 201, 308)
+            )
+            if status in (200, 201):
+                return json.loads(content)
+            offset = _next_byte(headers.get('Range'))
+
+    async def share(self, file_id, permission, max_retries=None):
+        """
+        Grant a permission (e.g. anyone-with-the-link reader) on a file.
+
+        Returns:
+            dict: The created permission's 'id'
+        """
+        async def create_permission():
+            _, _, content = await self._send(
+                'POST', f'{self.base_url}/drive/v3/files/{file_id}/permissions',
+                data=json.dumps(permission).encode('utf-8'), params={'fields': 'id'},
+                headers={'Content-Type': 'application/json; charset=UTF-8'}
+            )
+            return json.loads(content)
+        return await self._call(create_permission, "Share", max_retries)
+
+    async def close(self):
+        """Close the pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,185 @@
+"""
+Google Drive Client Module
+Thread-safe pool of Drive API clients sharing one set of credentials
+"""
+import json
+import os
+import threading
+
+import google_auth_httplib2
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+
+DISCOVERY_CACHE_FILE = 'drive_v3_discovery.json'
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/drive/v3/rest'
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def _is_drive_v3(document):
+    return isinstance(document, dict) and document.get('name') == 'drive' and document.get('version') == 'v3'
+
+
+def _bundled_document():
+    # google-api-python-client 2.x ships discovery documents for most APIs
+    try:
+        from googleapiclient import discovery_cache
+        content = discovery_cache.get_static_doc('drive', 'v3')
+        return json.loads(content) if content else None
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+
+def _cached_document(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _download_document(cache_file):
+    response, content = httplib2.Http(timeout=30).request(DISCOVERY_URL)
+    if response.status != 200:
+        raise HttpError(response, content, uri=DISCOVERY_URL)
+    document = json.loads(content)
+    tmp_path = cache_file + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"⚠ Warning: Could not cache Drive discovery document: {e}")
+    return document
+
+
+def load_discovery_document(cache_file=DISCOVERY_CACHE_FILE):
+    """
+    Return the Drive v3 discovery document, parsed once per process.
+
+    The newest (by 'revision') of the copy bundled with google-api-python-client
+    and the copy cached in cache_file is used; documents that aren't Drive v3
+    are ignored. Only when neither is usable is the document downloaded, and
+    it is then saved to cache_file so later runs start offline.
+    """
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            candidates = [d for d in (_bundled_document(), _cached_document(cache_file)) if _is_drive_v3(d)]
+            if candidates:
+                _discovery_document = max(candidates, key=lambda d: d.get('revision', ''))
+            else:
+                _discovery_document = _download_document(cache_file)
+        return _discovery_document
+
+
+class SharedCredentials:
+    """
+    Credentials wrapper that coordinates token refresh across threads.
+
+    All clients in a DriveClientPool authorize with the same instance. When
+    the token expires (or a request gets a 401), the first worker refreshes it
+    under a lock; workers that were waiting for the lock see the new token and
+    skip their own refresh.
+    """
+
+    def __init__(self, credentials, on_refresh=None):
+        """
+        Args:
+            credentials: google.auth credentials to share
+            on_refresh: Optional callback(credentials) after each refresh (e.g. save token.json)
+        """
+        self._credentials = credentials
+        self._lock = threading.Lock()
+        self.on_refresh = on_refresh
+        self.refreshes = 0
+
+    def __getattr__(self, name):
+        # token, valid, expired, universe_domain, ... of the wrapped credentials
+        if name == '_credentials':
+            raise AttributeError(name)
+        return getattr(self._credentials, name)
+
+    def refresh(self, request):
+        stale_token = self._credentials.token
+        with self._lock:
+            if self._credentials.token != stale_token and self._credentials.valid:
+                # Another worker refreshed while we were waiting
+                return
+            self._credentials.refresh(request)
+            self.refreshes += 1
+            if self.on_refresh:
+                self.on_refresh(self._credentials)
+
+    def apply(self, headers, token=None):
+        self._credentials.apply(headers, token=token)
+
+    def before_request(self, request, method, url, headers):
+        if not self._credentials.valid:
+            self.refresh(request)
+        self.apply(headers)
+
+
+class DriveClientPool:
+    """
+    Drive API clients, one per worker thread.
+
+    httplib2.Http is not thread-safe, so each thread gets its own
+    AuthorizedHttp (which keeps its connections alive between requests) and
+    its own Drive service built on it. The pool can be passed anywhere a
+    Drive service is expected: files(), permissions(), etc. are forwarded to
+    the calling thread's client.
+
+    Clients are built from the discovery document loaded once by
+    load_discovery_document(), so building one takes no network round trip.
+    Expired credentials are refreshed on the first request, not here.
+    """
+
+    def __init__(self, credentials, on_refresh=None, timeout=120, api_endpoint=None):
+        """
+        Args:
+            credentials: google.auth credentials shared by all clients
+            on_refresh: Optional callback(credentials) after a token refresh
+            timeout: Socket timeout in seconds for each client's connections
+            api_endpoint: Optional Drive API root to use instead of Google's
+                          (e.g. a local stand-in server)
+        """
+        self.credentials = SharedCredentials(credentials, on_refresh)
+        self.timeout = timeout
+        self.discovery = load_discovery_document()
+        self.client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._https = []
+
+    def _build(self):
+        http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+        with self._lock:
+            self._https.append(http)
+        return build_from_document(self.discovery, http=http, client_options=self.client_options)
+
+    def get(self):
+        """Return the calling thread's Drive service, building it on first use."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self._build()
+        return service
+
+    @property
+    def size(self):
+        """Number of clients built so far."""
+        with self._lock:
+            return len(self._https)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def close(self):
+        """Close the connections of every client."""
+        with self._lock:
+            https, self._https = self._https, []
+        for http in https:
+            http.close()
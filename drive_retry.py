@@ -0,0 +1,521 @@
+"""
+Drive Retry Module
+Shared rate limiting, error-classified retries, circuit breaking and
+adaptive upload concurrency for Google Drive calls
+"""
+import contextvars
+import email.utils
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+
+# Retry reasons (errors without one are not retried)
+RATE_LIMITED = 'rate_limited'
+SERVER_ERROR = 'server_error'
+NETWORK_ERROR = 'network_error'
+
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+# Local file problems are OSErrors too, but retrying won't fix them
+LOCAL_FILE_ERRORS = (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError)
+
+
+def error_reasons(error):
+    """Return the Drive error reasons (e.g. 'userRateLimitExceeded') in an HttpError body."""
+    try:
+        content = error.content.decode('utf-8') if isinstance(error.content, bytes) else error.content
+        body = json.loads(content)
+    except (AttributeError, TypeError, ValueError):
+        return set()
+    details = body.get('error') if isinstance(body, dict) else None
+    if not isinstance(details, dict):
+        return set()
+    return {e.get('reason') for e in details.get('errors', []) if isinstance(e, dict)}
+
+
+def classify_error(error):
+    """
+    Decide whether a failed Drive call is worth retrying.
+
+    Returns:
+        str: RATE_LIMITED (429, or 403 with a rate-limit reason), SERVER_ERROR
+             (5xx), NETWORK_ERROR (timeouts, dropped connections), or None
+             when the error is permanent (bad request, no access, not found)
+    """
+    # Only reached after a failed request, when googleapiclient is loaded anyway
+    import httplib2
+    from googleapiclient.errors import HttpError
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 429 or (status == 403 and error_reasons(error) & RATE_LIMIT_REASONS):
+            return RATE_LIMITED
+        if status >= 500:
+            return SERVER_ERROR
+        if status == 408:
+            return NETWORK_ERROR
+        return None
+    if isinstance(error, LOCAL_FILE_ERRORS):
+        return None
+    if isinstance(error, (OSError, httplib2.HttpLib2Error)):
+        # socket.timeout, ConnectionResetError, ssl.SSLError, ...
+        return NETWORK_ERROR
+    return None
+
+
+def retry_after_seconds(error):
+    """
+    Return the delay requested by a Retry-After header, or None.
+
+    Accepts both forms of the header: a number of seconds or an HTTP date.
+    """
+    resp = getattr(error, 'resp', None)
+    value = resp.get('retry-after') if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def decorrelated_jitter(previous, base, cap, rng=random):
+    """Next backoff delay: random between base and 3x the previous delay, at most cap."""
+    return min(cap, rng.uniform(base, max(base, previous * 3)))
+
+
+class TokenBucket:
+    """
+    Request rate limit shared by all upload workers.
+
+    Tokens refill at `rate` per second up to `capacity`. A request for more
+    tokens than the capacity (a large batch) is let through once the bucket is
+    full and leaves it in debt, so the following requests wait for it.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: Tokens (requests) per second
+            capacity: Maximum burst size (default: one second of requests)
+            clock: Monotonic time source
+            sleep: Function used to wait
+        """
+        self.rate = max(0.001, float(rate))
+        self.capacity = max(1.0, float(capacity or rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.waited = 0.0
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` requests may be sent."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.tokens >= min(tokens, self.capacity):
+                    self.tokens -= tokens
+                    return
+                else:
+                    wait = (min(tokens, self.capacity) - self.tokens) / self.rate
+            self.waited += wait
+            self.sleep(wait)
+
+    def reserve(self, tokens=1):
+        """
+        Non-blocking acquire() for asyncio callers: take `tokens` now.
+
+        Returns:
+            float: Seconds to wait before sending
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = max(0.0, self._paused_until - now, -self.tokens / self.rate)
+        self.waited += wait
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every worker for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+
+class CircuitBreaker:
+    """
+    Pauses all Drive calls while Drive keeps answering with 5xx errors.
+
+    After `threshold` server errors in a row (from any worker) the breaker
+    opens and every worker waits `cooldown` seconds. The next call is a trial:
+    a success closes the breaker, another server error opens it again.
+    """
+
+    def __init__(self, threshold=5, cooldown=30, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            threshold: Consecutive server errors that open the breaker
+            cooldown: Seconds all workers pause once it is open
+            clock: Monotonic time source
+            sleep: Function used to wait
+        """
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.failures = 0
+        self.opens = 0
+        self._open_until = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half_open' (cooled down, waiting for a trial call)."""
+        with self._lock:
+            if self.clock() < self._open_until:
+                return 'open'
+            return 'half_open' if self._trial else 'closed'
+
+    def remaining(self):
+        """Seconds until the breaker stops blocking calls (0 when closed)."""
+        with self._lock:
+            return max(0.0, self._open_until - self.clock())
+
+    def wait(self):
+        """Block while the breaker is open."""
+        while True:
+            with self._lock:
+                remaining = self._open_until - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(remaining)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        """Count a server error; returns True if this opened the breaker."""
+        with self._lock:
+            if self.clock() < self._open_until:
+                return False
+            self.failures += 1
+            if not self._trial and self.failures < self.threshold:
+                return False
+            self._open_until = self.clock() + self.cooldown
+            self._trial = True
+            self.failures = 0
+            self.opens += 1
+        print(f"    ⏸ Google Drive keeps failing (5xx), pausing all uploads for {self.cooldown}s")
+        return True
+
+
+class RetryEngine:
+    """
+    Retry and rate-limit policy shared by every Drive call of a run.
+
+    Each attempt takes a token from the shared TokenBucket and waits while
+    the CircuitBreaker is open. Failed attempts are retried only for
+    rate-limit, server and network errors, after a decorrelated-jitter delay
+    that honours Retry-After. A rate-limited response pauses all workers, not
+    just the one that got it.
+    """
+
+    def __init__(self, requests_per_second=10, burst=None, max_retries=5, base_delay=1, max_delay=64,
+                 breaker_threshold=5, breaker_cooldown=30, clock=time.monotonic, sleep=time.sleep, rng=None,
+                 on_rate_limited=None):
+        """
+        Args:
+            requests_per_second: Sustained Drive request rate (the quota)
+            burst: Requests that may be sent at once (default: one second's worth)
+            max_retries: Attempts per call, including the first
+            base_delay: Shortest backoff delay in seconds
+            max_delay: Longest backoff delay in seconds (Retry-After may ask for more)
+            breaker_threshold: Consecutive 5xx errors that pause all workers
+            breaker_cooldown: Seconds to pause once the breaker opens
+            clock: Monotonic time source
+            sleep: Function used to wait
+            rng: random.Random used for jitter
+            on_rate_limited: Optional callback() for every rate-limited response
+                             (e.g. AdaptiveConcurrency.throttled)
+        """
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.bucket = TokenBucket(requests_per_second, burst, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown, clock=clock, sleep=sleep)
+        self.retries = Counter()
+        self.on_rate_limited = on_rate_limited
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Wait until `tokens` requests may be sent."""
+        self.breaker.wait()
+        self.bucket.acquire(tokens)
+
+    def reserve(self, tokens=1):
+        """
+        Non-blocking acquire() for asyncio callers.
+
+        Returns:
+            float: Seconds to wait before sending
+        """
+        return self.breaker.remaining() + self.bucket.reserve(tokens)
+
+    def record(self, error, reason):
+        """
+        Account for a failed request that will be retried.
+
+        Returns:
+            float: Delay requested by Retry-After, or None
+        """
+        with self._lock:
+            self.retries[reason] += 1
+        retry_after = retry_after_seconds(error)
+        if reason == SERVER_ERROR:
+            self.breaker.record_failure()
+        elif reason == RATE_LIMITED:
+            if retry_after:
+                self.bucket.pause(retry_after)
+            if self.on_rate_limited:
+                self.on_rate_limited()
+        return retry_after
+
+    def jitter(self, previous):
+        """Next backoff delay after `previous`."""
+        return decorrelated_jitter(previous, self.base_delay, self.max_delay, self.rng)
+
+    def call(self, func, max_retries=None, description="Drive request"):
+        """
+        Call func() under the shared rate limit, retrying transient errors.
+
+        Args:
+            func: Function making one Drive request
+            max_retries: Attempts including the first (default: the engine's)
+            description: What is being done, for retry messages
+
+        Returns:
+            The result of func()
+
+        Raises:
+            The last error, once it is permanent or attempts are used up
+        """
+        attempts = max_retries or self.max_retries
+        delay = self.base_delay
+        for attempt in range(1, attempts + 1):
+            self.acquire()
+            try:
+                result = func()
+            except Exception as error:
+                reason = classify_error(error)
+                if reason is None:
+                    raise
+                retry_after = self.record(error, reason)
+                if attempt >= attempts:
+                    raise
+                delay = max(self.jitter(delay), retry_after or 0)
+                if reason == RATE_LIMITED:
+                    self.bucket.pause(delay)
+                print(f"    ⚠ {description} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s...")
+                self.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def execute(self, request, **kwargs):
+        """Execute a googleapiclient request through call()."""
+        return self.call(request.execute, **kwargs)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Retries per reason, breaker openings and seconds spent
+                  waiting on the rate limit
+        """
+        with self._lock:
+            retries = dict(self.retries)
+        return {'retries': retries, 'breaker_opens': self.breaker.opens, 'throttled': self.bucket.waited}
+
+
+# Set by skip_latency_sample() during a call made through AdaptiveConcurrency
+_unmeasured = contextvars.ContextVar('unmeasured_call', default=False)
+
+
+def skip_latency_sample():
+    """
+    Keep the current AdaptiveConcurrency.run() call out of the latency and
+    error statistics, e.g. because a cache hit answered it without an upload.
+    """
+    _unmeasured.set(True)
+
+
+class AdaptiveConcurrency:
+    """
+    Number of uploads allowed in flight, tuned while the run goes (AIMD).
+
+    Completed uploads are evaluated in windows of at least twice the current
+    limit. A window with a healthy p95 latency and error rate raises the limit
+    by one; a p95 above latency_tolerance times the best p95 of the last
+    baseline_windows windows cuts it by decrease_factor, as does a
+    rate-limited (403/429) response, which takes effect at once (at most once
+    per window). Only successful uploads count towards the p95, and calls
+    that skip_latency_sample() (cache hits) are left out entirely. Every
+    change is kept in `decisions` for the run summary.
+    """
+
+    def __init__(self, initial=3, minimum=1, maximum=8, decrease_factor=0.5, latency_tolerance=1.5,
+                 max_error_rate=0.1, baseline_windows=5, clock=time.monotonic):
+        """
+        Args:
+            initial: Starting number of concurrent uploads
+            minimum: Lowest limit a decrease can reach
+            maximum: Highest limit (and number of worker threads to start)
+            decrease_factor: Multiplier applied to the limit on a decrease
+            latency_tolerance: p95 growth over the baseline that counts as overload
+            max_error_rate: Failed share of a window above which the limit is held
+            baseline_windows: Number of recent windows whose best p95 is the baseline
+            clock: Monotonic time source
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.clock = clock
+        self.in_flight = 0
+        self.peak = 0
+        self.last_p95 = None
+        self.decisions = []
+        # p95 of recent windows; an old fast window can't hold the baseline down forever
+        self._recent_p95 = deque(maxlen=max(1, baseline_windows))
+        self._window = []
+        self._cut_this_window = False
+        self._started = clock()
+        self._cond = threading.Condition()
+
+    def run(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) once a slot is free.
+
+        A None result or an exception counts as a failed upload.
+        """
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+        started = self.clock()
+        ok = False
+        token = _unmeasured.set(False)
+        try:
+            result = func(*args, **kwargs)
+            ok = result is not None
+            return result
+        finally:
+            measured = not _unmeasured.get()
+            _unmeasured.reset(token)
+            self._release(self.clock() - started, ok, measured)
+
+    async def run_async(self, func, *args, **kwargs):
+        """run() for coroutine functions; waiting for a slot doesn't block the event loop."""
+        import asyncio
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    break
+            await asyncio.sleep(0.05)
+        started = self.clock()
+        ok = False
+        token = _unmeasured.set(False)
+        try:
+            result = await func(*args, **kwargs)
+            ok = result is not None
+            return result
+        finally:
+            measured = not _unmeasured.get()
+            _unmeasured.reset(token)
+            self._release(self.clock() - started, ok, measured)
+
+    def _try_acquire(self):
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        return True
+
+    def _release(self, latency, ok, measured=True):
+        with self._cond:
+            self.in_flight -= 1
+            if measured:
+                self._window.append((latency, ok))
+                if len(self._window) >= max(4, 2 * self.limit):
+                    self._evaluate()
+            self._cond.notify_all()
+
+    def _evaluate(self):
+        # Failures are often fast (an error comes back at once), so they only count as errors
+        latencies = sorted(latency for latency, ok in self._window if ok)
+        error_rate = sum(1 for _, ok in self._window if not ok) / len(self._window)
+        self._window = []
+        self._cut_this_window = False
+        p95 = latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else None
+        baseline = min(self._recent_p95) if self._recent_p95 else None
+        if p95 is not None:
+            self.last_p95 = p95
+            self._recent_p95.append(p95)
+        if baseline and p95 is not None and p95 > baseline * self.latency_tolerance:
+            self._decrease(f"p95 {p95:.1f}s > {baseline * self.latency_tolerance:.1f}s")
+            return
+        if error_rate > self.max_error_rate:
+            self._decide(self.limit, f"hold, {error_rate:.0%} failed")
+        elif self.limit < self.maximum:
+            self._decide(self.limit + 1, f"healthy, p95 {p95:.1f}s")
+
+    def _decrease(self, reason):
+        new_limit = max(self.minimum, int(self.limit * self.decrease_factor))
+        # Already at the minimum: nothing changes, so nothing is recorded
+        if new_limit < self.limit:
+            self._decide(new_limit, reason)
+
+    def _decide(self, new_limit, reason):
+        self.decisions.append((self.clock() - self._started, self.limit, new_limit, reason))
+        self.limit = new_limit
+        self._cond.notify_all()
+
+    def throttled(self):
+        """Cut the limit after a rate-limited response (once per window)."""
+        with self._cond:
+            if self._cut_this_window or self.limit <= self.minimum:
+                return
+            self._cut_this_window = True
+            self._window = []
+            self._decrease("throttled (403/429)")
+
+    def summary(self):
+        """
+        Returns:
+            dict: Current limit, its range, peak uploads in flight, the last
+                  window's p95 and the list of (seconds, old, new, reason) decisions
+        """
+        with self._cond:
+            return {'limit': self.limit, 'minimum': self.minimum, 'maximum': self.maximum, 'peak': self.peak,
+                    'p95': self.last_p95, 'decisions': list(self.decisions)}
@@ -0,0 +1,440 @@
+"""
+Excel Report Module
+Order-number index and streaming writer for shopee_report.xlsx
+"""
+import json
+import os
+import threading
+
+INDEX_VERSION = 1
+
+# Shopee CS template layout
+REPORT_HEADERS = [
+    "No",
+    "OrderSN/ Nomor Pesanan",
+    "Bukti pembeli sudah menerima pesanan\n- Screenshot yang menunjukkan pembeli sudah mengonfirmasi menerima produk non fisik. Screenshot harus dari Chat di Shopee, screenshot dari platform lain (cth Whatsapp) tidak akan diproses\n- Masukkan foto kedalam google drive dan salin ulang link kedalam kolom dibawah ini\n- Pastikan google drive tidak terkunci sehingga dapat diakses oleh Tim Shopee"
+]
+COLUMN_WIDTHS = {'A': 6, 'B': 25, 'C': 120}
+HEADER_ROW_HEIGHT = 100
+DATA_ROW_HEIGHT = 30
+
+_cell_styles = None
+
+
+def _file_signature(path):
+    """Return [mtime_ns, size] of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _is_plain_cell(cell, alignments, header=False):
+    """
+    Whether a read-only cell has no formatting beyond what ReportWriter
+    applies, so streaming it from the ledger doesn't lose anything.
+
+    Args:
+        cell: Cell from a read-only worksheet
+        alignments: Alignments the writer may have given this cell
+        header: Header cells may be bold
+    """
+    if not getattr(cell, 'has_style', False):
+        return True
+    from openpyxl.styles import Alignment, DEFAULT_FONT
+    font, border = cell.font, cell.border
+    return (cell.fill.fill_type is None
+            and cell.number_format == 'General'
+            and not any(side is not None and side.style for side in (border.left, border.right, border.top, border.bottom))
+            and font.name in (None, DEFAULT_FONT.name) and font.sz in (None, DEFAULT_FONT.sz)
+            and (header or not font.b) and not font.i and not font.u and not font.strike
+            and font.color in (None, DEFAULT_FONT.color)
+            and cell.alignment in (Alignment(),) + alignments)
+
+
+def _get_cell_styles():
+    """
+    Return the report's cell styles. Style objects are immutable, so every
+    cell shares the same instances; openpyxl is only imported when a report
+    is actually written.
+    """
+    global _cell_styles
+    if _cell_styles is None:
+        from openpyxl.styles import Alignment, Font
+        _cell_styles = {
+            'header_font': Font(bold=True),
+            'header': Alignment(wrap_text=True, vertical='top'),
+            'center': Alignment(horizontal='center', vertical='center'),
+            'link': Alignment(wrap_text=True, vertical='top')
+        }
+    return _cell_styles
+
+
+class OrderIndex:
+    """
+    Set of order numbers already present in an Excel report.
+
+    The index is built with a single read-only pass over column B and cached
+    in a sidecar JSON file keyed by the workbook's mtime and size, so later
+    runs only re-read the workbook when it was changed outside this tool.
+    """
+
+    def __init__(self, excel_file, index_file=None):
+        """
+        Args:
+            excel_file: Path to the Excel report
+            index_file: Path to the sidecar cache (default: <excel_file>.index.json)
+        """
+        self.excel_file = excel_file
+        self.index_file = index_file or excel_file + '.index.json'
+        self.order_numbers = set()
+        self.rows = 0
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _read_sidecar(self, signature):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != INDEX_VERSION or data.get('signature') != signature:
+            return False
+        self.order_numbers = set(data.get('order_numbers', []))
+        self.rows = data.get('rows', len(self.order_numbers))
+        return True
+
+    def _write_sidecar(self, signature):
+        tmp_path = self.index_file + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': INDEX_VERSION,
+                    'signature': signature,
+                    'rows': self.rows,
+                    'order_numbers': sorted(self.order_numbers)
+                }, f)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            print(f"⚠ Warning: Could not save Excel index: {e}")
+
+    def _rebuild(self):
+        """Scan column B of the workbook once in read-only mode."""
+        order_numbers = set()
+        rows = 0
+        import openpyxl
+        wb = openpyxl.load_workbook(self.excel_file, read_only=True)
+        try:
+            ws = wb.active
+            for (value,) in ws.iter_rows(min_row=2, min_col=2, max_col=2, values_only=True):
+                if value is None:
+                    continue
+                rows += 1
+                order_numbers.add(str(value).strip())
+        finally:
+            wb.close()
+        self.order_numbers = order_numbers
+        self.rows = rows
+
+    def load(self):
+        """
+        Make sure the index matches the workbook on disk.
+
+        Returns:
+            set: Order numbers present in the report
+        """
+        with self._lock:
+            signature = _file_signature(self.excel_file)
+            if signature == self._signature:
+                return self.order_numbers
+            if signature is None:
+                self.order_numbers = set()
+                self.rows = 0
+            elif not self._read_sidecar(signature):
+                self._rebuild()
+                self._write_sidecar(signature)
+            self._signature = signature
+            return self.order_numbers
+
+    def find_duplicates(self, order_numbers):
+        """
+        Args:
+            order_numbers: Iterable of order numbers to check
+
+        Returns:
+            set: The given order numbers that are already in the report
+        """
+        existing = self.load()
+        return {o for o in order_numbers if o in existing}
+
+    def add(self, order_numbers):
+        """
+        Record rows that were just appended to the workbook.
+
+        Call load() before saving the workbook and add() right after, so the
+        index is re-stamped with the new mtime/size instead of being rebuilt.
+
+        Args:
+            order_numbers: Order numbers of the appended rows
+        """
+        with self._lock:
+            for order_number in order_numbers:
+                self.order_numbers.add(str(order_number).strip())
+                self.rows += 1
+            self._signature = _file_signature(self.excel_file)
+            self._write_sidecar(self._signature)
+
+
+class ReportWriter:
+    """
+    Append-optimized writer for the Shopee CS Excel report.
+
+    The rows of the report are kept in a JSONL ledger next to the workbook.
+    While the workbook holds exactly the ledger's rows (it was streamed by
+    this writer and not touched since), appending streams the whole report
+    into a fresh workbook in write-only mode, swaps it in atomically and then
+    adds the new rows to the ledger together with the new workbook's
+    signature.
+
+    When the workbook doesn't match the ledger (it has no ledger yet, or was
+    edited outside this tool) it is read once in read-only mode. If it still
+    has the plain template layout the ledger is seeded from it and the
+    report is streamed again. Otherwise it has extra columns, rows without
+    an order number or formatting the ledger doesn't know about, and new
+    rows are appended to it in place so nothing in it is lost, until a later
+    edit brings it back to the template layout.
+    """
+
+    def __init__(self, excel_file, index=None, ledger_file=None):
+        """
+        Args:
+            excel_file: Path to the Excel report
+            index: OrderIndex to keep in sync with appended rows (optional)
+            ledger_file: Path to the row ledger (default: <excel_file>.rows.jsonl)
+        """
+        self.excel_file = excel_file
+        self.index = index
+        self.ledger_file = ledger_file or excel_file + '.rows.jsonl'
+
+    def _read_ledger(self):
+        """
+        Rows written after the last signature record belong to a run that
+        stopped before its workbook was swapped in, so they are left out.
+
+        Returns:
+            tuple: (list of [order_number, gdrive_link] rows, signature of the
+                   workbook they belong to, whether that workbook was streamed
+                   from them), or (None, None, False) if unreadable
+        """
+        rows = []
+        pending = []
+        signature = None
+        streamed = False
+        try:
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'signature' in record:
+                        rows.extend(pending)
+                        pending = []
+                        signature = record['signature']
+                        streamed = record.get('streamed', True)
+                    else:
+                        pending.append([record['order_number'], record['gdrive_link']])
+        except (OSError, KeyError, TypeError):
+            return None, None, False
+        return rows, signature, streamed
+
+    @staticmethod
+    def _ledger_lines(rows, signature, streamed):
+        lines = [json.dumps({'order_number': order_number, 'gdrive_link': gdrive_link}, ensure_ascii=False) + '\n'
+                 for order_number, gdrive_link in rows]
+        lines.append(json.dumps({'signature': signature, 'streamed': streamed}) + '\n')
+        return ''.join(lines)
+
+    def _write_ledger(self, rows, signature, streamed=True):
+        tmp_path = self.ledger_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self._ledger_lines(rows, signature, streamed))
+        os.replace(tmp_path, self.ledger_file)
+
+    def _append_ledger(self, rows, signature):
+        # One write for the rows and the signature of the workbook holding them
+        with open(self.ledger_file, 'a', encoding='utf-8') as f:
+            f.write(self._ledger_lines(rows, signature, True))
+
+    def _write_workbook(self, rows):
+        """Stream all rows into a new workbook and swap it in atomically."""
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        styles = _get_cell_styles()
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+
+        for column, width in COLUMN_WIDTHS.items():
+            ws.column_dimensions[column].width = width
+        ws.sheet_format.defaultRowHeight = DATA_ROW_HEIGHT
+        ws.sheet_format.customHeight = True
+        ws.row_dimensions[1].height = HEADER_ROW_HEIGHT
+
+        header = []
+        for title in REPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = styles['header_font']
+            cell.alignment = styles['header']
+            header.append(cell)
+        ws.append(header)
+
+        for no, (order_number, gdrive_link) in enumerate(rows, start=1):
+            no_cell = WriteOnlyCell(ws, value=no)
+            no_cell.alignment = styles['center']
+            order_cell = WriteOnlyCell(ws, value=order_number)
+            order_cell.alignment = styles['center']
+            link_cell = WriteOnlyCell(ws, value=gdrive_link)
+            link_cell.alignment = styles['link']
+            ws.append([no_cell, order_cell, link_cell])
+
+        self._save(wb)
+
+    def _save(self, wb):
+        root, ext = os.path.splitext(self.excel_file)
+        tmp_path = root + '.tmp' + ext
+        wb.save(tmp_path)
+        os.replace(tmp_path, self.excel_file)
+
+    def _template_rows(self):
+        """
+        Read the workbook in read-only mode and return its rows if it has the
+        plain Shopee CS template layout: one sheet, the template header,
+        rows numbered 1..n in columns A-C only and default formatting.
+
+        Returns:
+            list: [order_number, gdrive_link] of every data row, or None if the
+                  workbook has anything else in it
+        """
+        import openpyxl
+        styles = _get_cell_styles()
+        header_alignments = (styles['header'],)
+        data_alignments = ((styles['center'],), (styles['center'],), (styles['link'],))
+        wb = openpyxl.load_workbook(self.excel_file, read_only=True)
+        try:
+            if len(wb.worksheets) != 1:
+                return None
+            rows = []
+            has_header = False
+            blank_rows = 0
+            for row_no, cells in enumerate(wb.active.iter_rows(), start=1):
+                values = [cell.value for cell in cells]
+                if any(value is not None for value in values[3:]) or len(cells) > 3 and not all(
+                        _is_plain_cell(cell, ()) for cell in cells[3:]):
+                    return None
+                values = (values + [None, None, None])[:3]
+                if row_no == 1:
+                    if values != REPORT_HEADERS or not all(
+                            _is_plain_cell(cell, header_alignments, header=True) for cell in cells[:3]):
+                        return None
+                    has_header = True
+                    continue
+                if not all(_is_plain_cell(cell, alignments) for cell, alignments in zip(cells, data_alignments)):
+                    return None
+                no, order_number, gdrive_link = values
+                if values == [None, None, None]:
+                    # Empty rows are only dropped after the last data row
+                    blank_rows += 1
+                    continue
+                if (blank_rows or type(no) is not int or no != len(rows) + 1
+                        or not isinstance(order_number, str) or not order_number
+                        or order_number != order_number.strip()
+                        or not (gdrive_link is None or isinstance(gdrive_link, str))):
+                    return None
+                rows.append([order_number, gdrive_link])
+            return rows if has_header else None
+        finally:
+            wb.close()
+
+    def _append_in_place(self, new_rows):
+        """
+        Append rows below the last used row of the existing workbook, keeping
+        everything else in it as it is.
+
+        Returns:
+            list: [order_number, gdrive_link] of every data row, for the ledger
+        """
+        import openpyxl
+        styles = _get_cell_styles()
+        wb = openpyxl.load_workbook(self.excel_file)
+        ws = wb.active
+
+        last_row = ws.max_row
+        while last_row > 1 and all(cell.value is None for cell in ws[last_row]):
+            last_row -= 1
+        # Numbering continues from the last numbered row (note rows have no number)
+        no = next((value + 1 for value in (ws.cell(row=row, column=1).value for row in range(last_row, 1, -1))
+                   if isinstance(value, int)), 1)
+
+        for offset, (order_number, gdrive_link) in enumerate(new_rows):
+            row = last_row + 1 + offset
+            for column, value, alignment in ((1, no + offset, 'center'), (2, order_number, 'center'),
+                                             (3, gdrive_link, 'link')):
+                cell = ws.cell(row=row, column=column, value=value)
+                cell.alignment = styles[alignment]
+            ws.row_dimensions[row].height = DATA_ROW_HEIGHT
+
+        rows = [[str(order_number).strip(), gdrive_link]
+                for _, order_number, gdrive_link in ws.iter_rows(min_row=2, max_col=3, values_only=True)
+                if order_number is not None]
+        self._save(wb)
+        return rows
+
+    def append(self, order_data):
+        """
+        Append rows to the report, creating it if needed.
+
+        Args:
+            order_data: List of dictionaries with 'order_number' and 'gdrive_link'
+
+        Returns:
+            int: Total number of data rows in the report
+        """
+        if self.index is not None:
+            try:
+                self.index.load()
+                index_fresh = True
+            except Exception:
+                index_fresh = False
+
+        new_rows = [[data['order_number'], data['gdrive_link']] for data in order_data]
+        signature = _file_signature(self.excel_file)
+        rows, ledger_signature, streamed = self._read_ledger()
+        seeded = False
+        if signature is not None and (rows is None or ledger_signature != signature):
+            # No ledger yet (e.g. a report from before it existed) or edited
+            # outside this tool: stream it again if it is still plain template
+            rows = self._template_rows()
+            streamed = seeded = rows is not None
+
+        if signature is None:
+            # New report: streamed from an empty ledger
+            rows = new_rows
+            self._write_workbook(rows)
+            self._write_ledger(rows, _file_signature(self.excel_file))
+        elif streamed:
+            # The new rows are only signed once the workbook holding them is
+            # swapped in; if we stop before that, the next run doesn't see them
+            rows.extend(new_rows)
+            self._write_workbook(rows)
+            if seeded:
+                self._write_ledger(rows, _file_signature(self.excel_file))
+            else:
+                self._append_ledger(new_rows, _file_signature(self.excel_file))
+        else:
+            rows = self._append_in_place(new_rows)
+            self._write_ledger(rows, _file_signature(self.excel_file), streamed=False)
+
+        if self.index is not None and index_fresh:
+            self.index.add(order_number for order_number, _ in new_rows)
+        return len(rows)
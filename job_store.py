@@ -0,0 +1,291 @@
+"""
+Job Store Module
+SQLite queue of orders and the stage each one has reached (WAL mode, crash safe)
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DETECTED = 'detected'
+CAPTURED = 'captured'
+UPLOADED = 'uploaded'
+SHARED = 'shared'
+REPORTED = 'reported'
+FAILED = 'failed'
+# Stages in the order an order moves through them
+STAGES = (DETECTED, CAPTURED, UPLOADED, SHARED, REPORTED)
+# Stages of an order that still has work left
+UNFINISHED = (DETECTED, CAPTURED, UPLOADED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    order_number TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failed_stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    gdrive_link TEXT,
+    file_id TEXT,
+    screenshot TEXT,
+    claimed_by TEXT,
+    claimed_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, updated_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    order_number TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    error TEXT,
+    at REAL NOT NULL
+);
+"""
+
+
+def default_worker_id():
+    """Worker name used for claims: host and process id."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore:
+    """
+    Durable queue of orders with the stage each one has reached.
+
+    Every order moves through detected → captured → uploaded → shared →
+    reported, or to failed with the stage it failed at and the reason.
+    Each change is committed to SQLite (WAL mode) at once, so a crash loses
+    at most the step that was running. A worker claims an order before
+    working on it; the claim stops other processes using the same database
+    from taking it and expires after lease_seconds without progress, so the
+    orders of a crashed worker are picked up again. Failed orders are
+    re-queued by requeue() until they have used max_attempts.
+    """
+
+    def __init__(self, path='jobs.db', worker=None, max_attempts=3, lease_seconds=600, clock=time.time):
+        """
+        Args:
+            path: SQLite database file
+            worker: Name of this worker in claims (default: host:pid)
+            max_attempts: Attempts per order before requeue() gives up on it
+            lease_seconds: Claims without progress for this long can be taken over
+            clock: Time source (replaced in tests)
+        """
+        self.path = path
+        self.worker = worker or default_worker_id()
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two processes can't
+        # both read an order as unclaimed and then claim it
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _event(self, conn, order_number, state, error=None):
+        conn.execute("INSERT INTO job_events (order_number, state, worker, error, at) VALUES (?, ?, ?, ?, ?)",
+                     (order_number, state, self.worker, error, self._clock()))
+
+    def _claimable(self, row, now):
+        return (row is None or not row['claimed_by'] or row['claimed_by'] == self.worker
+                or row['claimed_at'] < now - self.lease_seconds)
+
+    def add(self, order_numbers):
+        """
+        Queue orders that are not in the store yet.
+
+        Returns:
+            int: Number of orders added
+        """
+        now = self._clock()
+        added = 0
+        with self._transaction() as conn:
+            for order_number in order_numbers:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (order_number, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (order_number, DETECTED, now, now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                    self._event(conn, order_number, DETECTED)
+        return added
+
+    def claim(self, order_number):
+        """
+        Claim one order for this worker and count an attempt.
+
+        An order that was failed, shared or reported starts again from
+        detected; one that stopped half way keeps its stage.
+
+        Returns:
+            bool: False if another worker holds a live claim on it
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT state, claimed_by, claimed_at FROM jobs WHERE order_number = ?",
+                               (order_number,)).fetchone()
+            if not self._claimable(row, now):
+                return False
+            if row is None:
+                conn.execute("INSERT INTO jobs (order_number, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                             (order_number, DETECTED, now, now))
+            state = row['state'] if row is not None and row['state'] in UNFINISHED else DETECTED
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, error = NULL, failed_stage = NULL, "
+                "claimed_by = ?, claimed_at = ?, updated_at = ? WHERE order_number = ?",
+                (state, self.worker, now, now, order_number)
+            )
+        return True
+
+    def advance(self, order_number, state, gdrive_link=None, file_id=None, screenshot=None):
+        """
+        Record that an order reached a stage. Stages never move backwards
+        (a late 'uploaded' after 'shared' is ignored); shared and reported
+        orders are done and their claim is released.
+
+        Args:
+            order_number: Order that progressed
+            state: One of STAGES
+            gdrive_link, file_id, screenshot: Stored when given
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT state FROM jobs WHERE order_number = ?", (order_number,)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO jobs (order_number, state, claimed_by, claimed_at, created_at, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (order_number, state, self.worker, now, now, now))
+            elif row['state'] in STAGES and STAGES.index(row['state']) > STAGES.index(state):
+                return
+            done = state in (SHARED, REPORTED)
+            conn.execute(
+                "UPDATE jobs SET state = ?, gdrive_link = COALESCE(?, gdrive_link), file_id = COALESCE(?, file_id), "
+                "screenshot = COALESCE(?, screenshot), claimed_by = CASE WHEN ? THEN NULL ELSE claimed_by END, "
+                "claimed_at = ?, updated_at = ? WHERE order_number = ?",
+                (state, gdrive_link, file_id, screenshot, done, now, now, order_number)
+            )
+            self._event(conn, order_number, state)
+
+    def fail(self, order_number, reason):
+        """Mark an order failed at its current stage and release its claim."""
+        now = self._clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET failed_stage = CASE WHEN state = ? THEN failed_stage ELSE state END, state = ?, "
+                "error = ?, claimed_by = NULL, claimed_at = NULL, updated_at = ? WHERE order_number = ?",
+                (FAILED, FAILED, reason, now, order_number)
+            )
+            self._event(conn, order_number, FAILED, reason)
+
+    def requeue(self):
+        """
+        Put failed orders with attempts left back in the queue and collect
+        orders an earlier run left unfinished (and nobody is working on).
+
+        Returns:
+            list: Order numbers to process again, oldest first
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            failed = conn.execute("SELECT order_number FROM jobs WHERE state = ? AND attempts < ?",
+                                  (FAILED, self.max_attempts)).fetchall()
+            for row in failed:
+                conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE order_number = ?",
+                             (DETECTED, now, row['order_number']))
+                self._event(conn, row['order_number'], DETECTED, 'requeued')
+            rows = conn.execute(
+                "SELECT order_number FROM jobs WHERE state IN (?, ?, ?) AND (claimed_by IS NULL "
+                "OR claimed_by = ? OR claimed_at < ?) ORDER BY created_at, order_number",
+                (*UNFINISHED, self.worker, now - self.lease_seconds)
+            ).fetchall()
+        return [row['order_number'] for row in rows]
+
+    def release(self, all_workers=False):
+        """
+        Drop this worker's claims (all claims with all_workers=True, when no
+        other worker can be running), so the orders can be claimed at once.
+        """
+        with self._transaction() as conn:
+            if all_workers:
+                conn.execute("UPDATE jobs SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by IS NOT NULL")
+            else:
+                conn.execute("UPDATE jobs SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?",
+                             (self.worker,))
+
+    def mark_reported(self, order_numbers):
+        """Record that these orders were written to the Excel report."""
+        for order_number in order_numbers:
+            self.advance(order_number, REPORTED)
+
+    def get(self, order_number):
+        """
+        Returns:
+            dict: The order's row, or None if it isn't in the store
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE order_number = ?", (order_number,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """
+        Returns:
+            dict: Number of orders per state
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {row['state']: row['n'] for row in rows}
+
+    def unreported(self):
+        """
+        Returns:
+            list: Dicts with 'order_number' and 'gdrive_link' of shared orders
+                  not in the Excel report yet, in the order they were shared
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT order_number, gdrive_link FROM jobs WHERE state = ? "
+                                      "ORDER BY updated_at, order_number", (SHARED,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def failed(self):
+        """
+        Returns:
+            list: Dicts with 'order', 'reason', 'stage' and 'attempts' of failed orders
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT order_number, error, failed_stage, attempts FROM jobs WHERE state = ? "
+                                      "ORDER BY updated_at, order_number", (FAILED,)).fetchall()
+        return [{'order': row['order_number'], 'reason': row['error'], 'stage': row['failed_stage'],
+                 'attempts': row['attempts']} for row in rows]
+
+    def history(self, order_number):
+        """
+        Returns:
+            list: (state, worker, error, timestamp) tuples for the order, oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT state, worker, error, at FROM job_events WHERE order_number = ? "
+                                      "ORDER BY rowid", (order_number,)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,115 @@
+"""
+Run Summary Module
+Exit codes and the JSON summary of a run, for schedulers and wrapper scripts
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+EXIT_OK = 0               # Every order processed, or nothing to do
+EXIT_ERROR = 1            # Unexpected error (see 'message')
+EXIT_USAGE = 2            # Invalid command-line option or config value (argparse exits with 2 as well)
+EXIT_ORDERS_FAILED = 3    # Run finished but some orders failed (listed under 'failed')
+EXIT_CONFIG = 4           # config.ini or the orders file is missing or incomplete
+EXIT_DRIVE = 5            # Could not connect to Google Drive
+EXIT_LOGIN = 6            # Shopee login or verification needs a person
+EXIT_INTERRUPTED = 130    # Stopped with Ctrl+C
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds).isoformat(timespec='seconds')
+
+
+class RunSummary:
+    """
+    Outcome of one run: exit code, status, order counts, per-order results
+    and Drive statistics, written as JSON when the run ends.
+    """
+
+    def __init__(self, path=None, clock=time.time):
+        """
+        Args:
+            path: JSON file to write (None: keep the summary in memory only)
+            clock: Time source (replaced in tests)
+        """
+        self.path = path
+        self._clock = clock
+        self.started = clock()
+        self.finished = None
+        self.exit_code = None
+        self.status = 'running'
+        self.message = None
+        self.requested = 0
+        self.to_process = 0
+        self.succeeded = []
+        self.failed = []
+        self.excel_report = None
+        self.stats = {}
+
+    def finish(self, exit_code, status, message=None):
+        """
+        Record how the run ended. Only the first call counts, so cleanup code
+        can't overwrite the actual cause.
+
+        Returns:
+            int: The recorded exit code
+        """
+        if self.exit_code is None:
+            self.exit_code = exit_code
+            self.status = status
+            self.message = message
+            self.finished = self._clock()
+        return self.exit_code
+
+    def record_orders(self, order_data, failed_orders, excel_report=None):
+        """
+        Args:
+            order_data: List of dicts with 'order_number' and 'gdrive_link'
+            failed_orders: List of dicts with 'order' and 'reason'
+            excel_report: Path of the updated Excel report, if one was written
+        """
+        self.succeeded = [dict(data) for data in order_data]
+        self.failed = [dict(fail) for fail in failed_orders]
+        self.excel_report = excel_report or self.excel_report
+
+    def to_dict(self):
+        finished = self.finished or self._clock()
+        return {
+            'status': self.status,
+            'exit_code': self.exit_code,
+            'message': self.message,
+            'started_at': _timestamp(self.started),
+            'finished_at': _timestamp(finished),
+            'duration_seconds': round(finished - self.started, 1),
+            'orders': {
+                'requested': self.requested,
+                'skipped': self.requested - self.to_process,
+                'processed': self.to_process,
+                'succeeded': len(self.succeeded),
+                'failed': len(self.failed)
+            },
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'excel_report': self.excel_report,
+            **self.stats
+        }
+
+    def write(self):
+        """
+        Write the summary to path (atomically, so a reader never sees half a file).
+
+        Returns:
+            str: The path written, or None when there is no path or writing failed
+        """
+        if not self.path:
+            return None
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠ Warning: Could not save run summary: {e}")
+            return None
+        return self.path
@@ -0,0 +1,133 @@
+"""
+Screenshot Module
+Capture profiles and in-memory screenshots, independent of the browser
+"""
+import os
+
+# Screenshot capture profiles (config.ini CAPTURE_PROFILE)
+CAPTURE_PROFILES = {
+    # Lossless PNG of the viewport at device resolution (the original behaviour)
+    'lossless': {'image_type': 'png', 'quality': None, 'clip': False, 'scale': 'device'},
+    # JPEG of the chat panel only, one pixel per CSS pixel
+    'compact': {'image_type': 'jpeg', 'quality': 70, 'clip': True, 'scale': 'css'},
+    # WebP of the chat panel (needs Pillow, falls back to JPEG)
+    'smallest': {'image_type': 'webp', 'quality': 60, 'clip': True, 'scale': 'css'}
+}
+IMAGE_EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+IMAGE_MIME_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}
+
+
+def image_mime_type(file_path):
+    """Return the MIME type of a screenshot file from its extension."""
+    return IMAGE_MIME_TYPES.get(os.path.splitext(file_path)[1].lower(), 'application/octet-stream')
+
+
+class CaptureProfile:
+    """
+    How chat screenshots are encoded: image type and quality, whether to clip
+    to the chat panel, and whether to capture at CSS or device pixel scale.
+    """
+    
+    def __init__(self, image_type='png', quality=None, clip=False, scale='device'):
+        """
+        Args:
+            image_type: 'png', 'jpeg' or 'webp'
+            quality: 1-100 for jpeg/webp (ignored for png)
+            clip: Capture only the chat panel's bounding box when it is found
+            scale: 'css' (one pixel per CSS pixel) or 'device' (full DPR)
+        """
+        if image_type not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported image type: {image_type}")
+        if image_type == 'webp':
+            try:
+                import PIL.Image  # noqa: F401
+            except ImportError:
+                print("⚠ Warning: WebP capture needs Pillow (pip install pillow), using JPEG")
+                image_type = 'jpeg'
+        self.image_type = image_type
+        self.quality = quality if image_type != 'png' else None
+        self.clip = clip
+        self.scale = scale
+    
+    @classmethod
+    def from_name(cls, name, **overrides):
+        """
+        Build a profile from CAPTURE_PROFILES, with optional overrides
+        (keys with a None value are ignored).
+        """
+        if name not in CAPTURE_PROFILES:
+            raise ValueError(f"Unknown capture profile: {name} (choose from {', '.join(CAPTURE_PROFILES)})")
+        options = dict(CAPTURE_PROFILES[name])
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+    
+    @property
+    def extension(self):
+        return IMAGE_EXTENSIONS[self.image_type]
+    
+    @property
+    def mime_type(self):
+        return IMAGE_MIME_TYPES[self.extension]
+    
+    def screenshot_kwargs(self, full_page=False):
+        """Keyword arguments for page.screenshot() / locator.screenshot()."""
+        kwargs = {
+            # Playwright encodes PNG and JPEG; WebP is converted from PNG in encode()
+            'type': 'jpeg' if self.image_type == 'jpeg' else 'png',
+            'scale': self.scale,
+            'animations': 'disabled',
+            'caret': 'hide'
+        }
+        if self.image_type == 'jpeg' and self.quality:
+            kwargs['quality'] = int(self.quality)
+        if full_page:
+            kwargs['full_page'] = True
+        return kwargs
+    
+    def encode(self, data):
+        """Convert Playwright's output to the profile's image type."""
+        if self.image_type != 'webp':
+            return data
+        import io
+        from PIL import Image
+        output = io.BytesIO()
+        with Image.open(io.BytesIO(data)) as image:
+            image.save(output, format='WEBP', quality=int(self.quality or 80), method=4)
+        return output.getvalue()
+    
+    def describe(self):
+        quality = f" q{self.quality}" if self.quality else ""
+        clip = ", chat panel" if self.clip else ""
+        return f"{self.image_type}{quality}, {self.scale} scale{clip}"
+
+
+def write_screenshot(screenshot_path, data):
+    """Write encoded screenshot bytes to screenshot_path."""
+    with open(screenshot_path, 'wb') as f:
+        f.write(data)
+    return screenshot_path
+
+
+class Screenshot:
+    """
+    A chat screenshot held in memory, ready to be uploaded from a buffer.
+    """
+    
+    def __init__(self, order_number, name, data, mime_type):
+        """
+        Args:
+            order_number: Order the screenshot belongs to
+            name: File name to use on Google Drive (and in the local archive)
+            data: Encoded image bytes
+            mime_type: MIME type of data
+        """
+        self.order_number = order_number
+        self.name = name
+        self.data = data
+        self.mime_type = mime_type
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __str__(self):
+        return self.name
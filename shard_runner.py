@@ -0,0 +1,312 @@
+"""
+Shard Runner Module
+Splits the orders over several worker processes, each with its own browser profile
+"""
+import configparser
+import multiprocessing
+import os
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+
+import shopee_automation
+from run_summary import EXIT_ERROR, EXIT_LOGIN, EXIT_OK, EXIT_ORDERS_FAILED, RunSummary
+
+SHARD_FOLDER = 'shards'
+# Lock files of the running browser and caches it rebuilds; not copied into worker profiles
+PROFILE_SKIP_PATTERNS = ('Singleton*', 'lockfile', 'Cache', 'Code Cache', 'GPUCache', 'ShaderCache',
+                         'GrShaderCache', 'GraphiteDawnCache', 'DawnCache', 'DawnGraphiteCache', 'DawnWebGPUCache',
+                         'CacheStorage', 'ScriptCache', 'Crashpad', 'BrowserMetrics*', 'blob_storage')
+
+
+def split_orders(order_numbers, shards):
+    """
+    Deal orders round-robin into at most `shards` non-empty lists.
+
+    Returns:
+        list: One list of order numbers per shard
+    """
+    shards = max(1, min(shards, len(order_numbers)))
+    return [order_numbers[i::shards] for i in range(shards)] if order_numbers else []
+
+
+def clone_profile(source, target):
+    """
+    Copy a persistent browser profile (with its Shopee login) for a worker.
+    The previous copy is replaced, so every run starts from the current login.
+
+    Returns:
+        str: target
+    """
+    if os.path.exists(target):
+        shutil.rmtree(target, ignore_errors=True)
+    if not os.path.isdir(source):
+        # No saved login yet: the worker starts with an empty profile
+        os.makedirs(target, exist_ok=True)
+        return target
+    try:
+        shutil.copytree(source, target, ignore=shutil.ignore_patterns(*PROFILE_SKIP_PATTERNS),
+                        symlinks=True, ignore_dangling_symlinks=True)
+    except shutil.Error as e:
+        # Files the browser holds open can't always be copied; the rest of the profile still works
+        print(f"⚠ Warning: {len(e.args[0])} file(s) not copied from {source}")
+    return target
+
+
+def shard_paths(index):
+    """Files of one shard, all under shards/shard<index>/."""
+    folder = os.path.join(SHARD_FOLDER, f'shard{index}')
+    return {
+        'folder': folder,
+        'orders': os.path.join(folder, 'orders.txt'),
+        'checkpoint': os.path.join(folder, 'processed_orders.jsonl'),
+        'legacy_checkpoint': os.path.join(folder, 'processed_orders.json'),
+        'upload_cache': os.path.join(folder, 'upload_cache.json'),
+        'profile': os.path.join(folder, 'browser_data'),
+        'log': os.path.join(folder, 'run.log')
+    }
+
+
+def prepare_shard(index, order_numbers, source_profile):
+    """
+    Write a shard's order list, clone the browser profile and copy the upload cache.
+
+    Returns:
+        dict: The shard's paths (see shard_paths)
+    """
+    paths = shard_paths(index)
+    os.makedirs(paths['folder'], exist_ok=True)
+    with open(paths['orders'], 'w') as f:
+        f.write('\n'.join(order_numbers) + '\n')
+    clone_profile(source_profile, paths['profile'])
+    if os.path.exists(shopee_automation.UPLOAD_CACHE_FILE):
+        shutil.copyfile(shopee_automation.UPLOAD_CACHE_FILE, paths['upload_cache'])
+    return paths
+
+
+def shard_settings(config, index, shards, paths):
+    """
+    Settings for one worker: config.ini plus the shard's files, batch mode
+    and its share of the Drive request rate.
+
+    Returns:
+        dict: Section -> options, for configparser.read_dict() in the worker
+    """
+    settings = configparser.ConfigParser()
+    settings.read_dict({section: dict(config.items(section, raw=True)) for section in config.sections()})
+    if not settings.has_section('AUTOMATION'):
+        settings.add_section('AUTOMATION')
+    requests_per_second = config.getfloat('AUTOMATION', 'DRIVE_REQUESTS_PER_SECOND', fallback=10)
+    overrides = {
+        'SHARD': f'{index}/{shards}',
+        'SHARD_WORKERS': '1',
+        'BATCH_MODE': 'true',
+        'UNATTENDED_CAPTURE': 'true',
+        'ORDERS_FILE': paths['orders'],
+        'BROWSER_DATA_DIR': paths['profile'],
+        # The runner already applied these policies to the whole order list
+        'RESUME_POLICY': 'resume',
+        'DUPLICATE_POLICY': 'process',
+        'INVALID_ORDER_POLICY': 'keep',
+        'SUMMARY_FILE': '',
+        # All workers share one Drive quota
+        'DRIVE_REQUESTS_PER_SECOND': str(requests_per_second / shards)
+    }
+    for option, value in overrides.items():
+        settings.set('AUTOMATION', option, value)
+    return {section: dict(settings.items(section, raw=True)) for section in settings.sections()}
+
+
+def run_shard(index, settings, paths):
+    """
+    Worker process: run main() on one shard, logging to the shard's run.log.
+
+    Returns:
+        dict: The shard's RunSummary.to_dict()
+    """
+    config = configparser.ConfigParser()
+    config.read_dict(settings)
+    # Each worker writes its own checkpoint and cache; the runner merges them afterwards
+    shopee_automation.CHECKPOINT_FILE = paths['checkpoint']
+    shopee_automation.LEGACY_CHECKPOINT_FILE = paths['legacy_checkpoint']
+    shopee_automation.UPLOAD_CACHE_FILE = paths['upload_cache']
+    summary = RunSummary()
+    with open(paths['log'], 'w', encoding='utf-8', buffering=1) as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            shopee_automation.run_main(config, summary)
+        except BaseException as e:
+            traceback.print_exc()
+            summary.finish(EXIT_ERROR, 'error', str(e) or type(e).__name__)
+        summary.finish(EXIT_ERROR, 'error', "Shard ended without a result")
+        summary.stats = shopee_automation.run_stats()
+    return summary.to_dict()
+
+
+def recover_shards():
+    """
+    Merge checkpoints and upload caches that workers of an interrupted run
+    left behind, so nothing they finished is lost.
+
+    Returns:
+        int: Number of processed orders recovered
+    """
+    if not os.path.isdir(SHARD_FOLDER):
+        return 0
+    recovered = 0
+    for name in sorted(os.listdir(SHARD_FOLDER)):
+        paths = shard_paths(name[len('shard'):]) if name.startswith('shard') else None
+        if paths:
+            recovered += shopee_automation.merge_checkpoint_journal(paths['checkpoint'])
+            shopee_automation.merge_upload_cache(paths['upload_cache'])
+    if recovered:
+        print(f"↻ {recovered} pesanan dari worker run sebelumnya digabung ke checkpoint")
+    return recovered
+
+
+def detect_orders(config):
+    """
+    Detect the orders to ship with one browser on the main profile (which
+    also checks the login the workers' copies will use).
+
+    Returns:
+        list: Order numbers, or None when the login failed
+    """
+    from shopee_module import ShopeeAutomation
+
+    shopee = ShopeeAutomation(config.get('SHOPEE', 'USERNAME'), config.get('SHOPEE', 'PASSWORD'),
+                              chrome_profile=config.get('SHOPEE', 'CHROME_PROFILE', fallback='Default'),
+                              **shopee_automation.load_capture_options(config))
+    shopee.start_browser()
+    try:
+        if not shopee.login():
+            return None
+        detection_mode = config.get('AUTOMATION', 'DETECTION_MODE', fallback='network')
+        return shopee.get_orders_to_ship(auto_detect=True, detection_mode=detection_mode)
+    finally:
+        shopee.close_browser()
+
+
+def run_sharded(config, summary, executor=None, worker=run_shard):
+    """
+    Process the orders with SHARD_WORKERS browser processes at once.
+
+    The runner reads (or detects) the orders, applies the resume and
+    duplicate policies, and deals the rest into one shard per worker. Each
+    worker gets its own copy of browser_data/ and its own checkpoint and
+    upload cache, and shares the job store. When all workers are done their
+    checkpoints and caches are merged back and one Excel report is written.
+
+    Args:
+        config: Settings from load_config() with command-line overrides applied
+        summary: RunSummary the merged outcome is recorded in
+        executor: Executor to run the workers on (default: a process pool)
+        worker: Function run per shard (default: run_shard)
+
+    Returns:
+        int: Exit code (see run_summary.py)
+    """
+    workers = config.getint('AUTOMATION', 'SHARD_WORKERS', fallback=1)
+    print("\n" + "="*70)
+    print(f"🚀 SHOPEE AUTOMATION - {workers} WORKERS")
+    print("="*70)
+
+    policies = shopee_automation.prepare_run(config, summary)
+    if policies is None:
+        return summary.exit_code
+    shopee_automation.enable_upload_cache(config)
+    # No worker is running yet, so stale claims can be dropped
+    shopee_automation.enable_job_store(config)
+    try:
+        recover_shards()
+        processed_order_numbers = shopee_automation.prepare_resume(policies['resume'])
+
+        print("\n📦 Getting orders...")
+        orders_file = config.get('AUTOMATION', 'ORDERS_FILE', fallback='')
+        if orders_file:
+            order_numbers = shopee_automation.get_batch_orders(orders_file, policies['invalid_orders'])
+        elif config.getboolean('AUTOMATION', 'AUTO_DETECT_ORDERS', fallback=True):
+            order_numbers = detect_orders(config)
+            if order_numbers is None:
+                print("✗ Login failed. Aborting.")
+                return summary.finish(EXIT_LOGIN, 'login_failed', "Shopee login failed or needs a person")
+        else:
+            order_numbers = []
+        if not order_numbers and not orders_file and not policies['batch']:
+            order_numbers = shopee_automation.get_batch_orders(invalid_policy=policies['invalid_orders'])
+        summary.requested = len(order_numbers)
+        if order_numbers:
+            order_numbers = shopee_automation.filter_orders(order_numbers, processed_order_numbers,
+                                                            policies['duplicates'])
+        queued = shopee_automation.queue_orders(order_numbers)
+        summary.requested += len(queued) - len(order_numbers)
+        order_numbers = queued
+        summary.to_process = len(order_numbers)
+        if not summary.requested:
+            print("No orders to process. Exiting.")
+            return summary.finish(EXIT_OK, 'no_orders', "No orders found")
+        if not order_numbers:
+            return summary.finish(EXIT_OK, 'nothing_to_do', "All orders already processed")
+
+        shards = split_orders(order_numbers, workers)
+        source_profile = config.get('AUTOMATION', 'BROWSER_DATA_DIR', fallback='browser_data')
+        print(f"\n📸 PROCESSING {len(order_numbers)} ORDERS WITH {len(shards)} WORKERS")
+        tasks = []
+        for index, shard_orders in enumerate(shards, 1):
+            paths = prepare_shard(index, shard_orders, source_profile)
+            tasks.append((index, shard_settings(config, index, len(shards), paths), paths))
+            print(f"  • Shard {index}: {len(shard_orders)} pesanan (log: {paths['log']})")
+
+        start_time = time.time()
+        results = {}
+        if executor is None:
+            # spawn: every worker starts its own interpreter and Playwright, also on Linux
+            executor = ProcessPoolExecutor(max_workers=len(tasks), mp_context=multiprocessing.get_context('spawn'))
+        with executor:
+            futures = {executor.submit(worker, index, settings, paths): (index, paths)
+                       for index, settings, paths in tasks}
+            for future in as_completed(futures):
+                index, paths = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'exit_code': EXIT_ERROR, 'status': 'error', 'message': str(e),
+                              'succeeded': [], 'failed': []}
+                results[index] = result
+                ok = result['exit_code'] in (EXIT_OK, EXIT_ORDERS_FAILED)
+                print(f"{'✓' if ok else '✗'} Shard {index}/{len(tasks)}: {len(result['succeeded'])} berhasil, "
+                      f"{len(result['failed'])} gagal ({result['status']}) - log: {paths['log']}")
+
+        # One checkpoint, one upload cache and one report for the whole run
+        for _, _, paths in tasks:
+            shopee_automation.merge_checkpoint_journal(paths['checkpoint'])
+            shopee_automation.merge_upload_cache(paths['upload_cache'])
+        order_data = [row for index in sorted(results) for row in results[index]['succeeded']]
+        failed_orders = [fail for index in sorted(results) for fail in results[index]['failed']]
+        summary.excel_report = shopee_automation.report_results(order_data, failed_orders, len(order_numbers),
+                                                                start_time)
+        summary.record_orders(order_data, failed_orders)
+        summary.stats['shards'] = [
+            {'shard': index, 'orders': len(shards[index - 1]), 'exit_code': results[index]['exit_code'],
+             'status': results[index]['status'], 'message': results[index].get('message'),
+             'drive': results[index].get('drive')}
+            for index in sorted(results)
+        ]
+
+        problems = [index for index in sorted(results)
+                    if results[index]['exit_code'] not in (EXIT_OK, EXIT_ORDERS_FAILED)]
+        if problems:
+            # Their unfinished orders stay queued in the job store for the next run
+            first = results[problems[0]]
+            return summary.finish(first['exit_code'], first['status'],
+                                  f"Shard {problems[0]} of {len(tasks)}: {first.get('message')}")
+        if failed_orders:
+            return summary.finish(EXIT_ORDERS_FAILED, 'completed_with_failures',
+                                  f"{len(failed_orders)} of {len(order_numbers)} order(s) failed")
+        return summary.finish(EXIT_OK, 'completed')
+    finally:
+        shopee_automation.flush_checkpoint()
+        shopee_automation.save_upload_cache()
+        if shopee_automation._job_store is not None:
+            shopee_automation._job_store.release()
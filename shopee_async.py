@@ -0,0 +1,608 @@
+"""
+Shopee Seller Centre Automation Module (asyncio)
+Async counterpart of shopee_module.ShopeeAutomation on playwright.async_api
+"""
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from shopee_module import (
+    BROWSER_ARGS,
+    CHAT_BUTTON_SELECTORS,
+    CHAT_PANEL_SELECTOR,
+    CHAT_POLL_MS,
+    CHAT_READY_SELECTOR,
+    LOGIN_URL,
+    NEXT_PAGE_LOADED_JS,
+    NEXT_PAGE_SELECTORS,
+    ORDER_EXTRACT_JS,
+    ORDER_LINK_SELECTOR,
+    ORDER_NUMBER_PATTERN,
+    ORDER_SEARCH_URL,
+    ORDERS_RENDERED_JS,
+    ORDERS_TO_SHIP_URL,
+    SELLER_URL_PATTERN,
+    USER_AGENT,
+    CaptureProfile,
+    OrderListHarvester,
+    Screenshot,
+    write_screenshot,
+    WaitBudget,
+)
+
+
+async def ainput(prompt=''):
+    """input() that keeps the event loop (and pending uploads) running."""
+    return await asyncio.to_thread(input, prompt)
+
+
+class AsyncWaitBudget(WaitBudget):
+    """WaitBudget for playwright.async_api pages; the wait helpers return awaitables."""
+
+    async def _wait(self, step, action):
+        started = time.perf_counter()
+        try:
+            result = await action(self.timeout_ms(step))
+        except PlaywrightTimeout:
+            self.record(step, time.perf_counter() - started, False)
+            return None
+        self.record(step, time.perf_counter() - started, True)
+        return True if result is None else result
+
+
+class AsyncOrderListHarvester(OrderListHarvester):
+    """OrderListHarvester for async pages, where response.json() is a coroutine."""
+
+    async def handle_response(self, response):
+        """page.on('response') handler."""
+        if not self.matches(response):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        self.add_payload(payload)
+
+
+class AsyncShopeeAutomation:
+    def __init__(self, username, password, headless=False, chrome_profile="Default",
+                 unattended=False, capture_mode='visible', chat_timeout=15, wait_budgets=None,
+                 capture_profile=None, in_memory=False, interactive=True,
+                 user_data_dir='browser_data'):
+        """
+        Initialize Shopee automation
+
+        Args:
+            username: Shopee seller username/email/phone
+            password: Shopee seller password
+            headless: Run browser in headless mode (True/False)
+            chrome_profile: Chrome profile name (e.g., "Default", "Profile 1", "Profile 2")
+            unattended: Open each order's chat automatically instead of prompting
+            capture_mode: 'visible' (viewport) or 'full' (full page) for unattended capture
+            chat_timeout: Seconds to wait for the chat before falling back to manual navigation
+            wait_budgets: Dict of wait step -> budget in seconds (see DEFAULT_WAIT_BUDGETS)
+            capture_profile: CaptureProfile for screenshots (default: lossless PNG)
+            in_memory: Return Screenshot objects instead of writing files to output_folder
+            interactive: Prompt at the console when a step needs the user; when False
+                         (batch mode) such steps fail instead of waiting for an answer
+            user_data_dir: Persistent browser profile that keeps the Shopee login
+        """
+        self.username = username
+        self.password = password
+        self.headless = headless
+        self.chrome_profile = chrome_profile
+        self.unattended = unattended
+        self.capture_mode = capture_mode
+        self.chat_timeout = chat_timeout
+        chat_budgets = {'order_detail': chat_timeout, 'chat_button': chat_timeout, 'chat_ready': chat_timeout}
+        self.wait = AsyncWaitBudget({**chat_budgets, **(wait_budgets or {})})
+        self.capture_profile = capture_profile or CaptureProfile.from_name('lossless')
+        self.in_memory = in_memory
+        self.interactive = interactive
+        self.user_data_dir = user_data_dir
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.playwright = None
+        self.last_detection = []
+        self.page_timings = []
+        self.detected_orders = {}
+        self._prompt_lock = asyncio.Lock()
+
+    async def start_browser(self):
+        """Start the browser and create a new page"""
+        print("Starting browser...")
+        self.playwright = await async_playwright().start()
+
+        # Use persistent context to save login state
+        user_data_dir = os.path.abspath(self.user_data_dir)
+        os.makedirs(user_data_dir, exist_ok=True)
+
+        print(f"Using persistent browser session...")
+        print(f"Browser data: {user_data_dir}")
+
+        try:
+            self.browser = await self.playwright.chromium.launch_persistent_context(
+                user_data_dir=user_data_dir,
+                headless=self.headless,
+                args=BROWSER_ARGS,
+                viewport=None,  # None = responsive, bisa di-resize bebas
+                user_agent=USER_AGENT
+            )
+            self.page = self.browser.pages[0] if self.browser.pages else await self.browser.new_page()
+            print("✓ Browser started with saved session")
+        except Exception as e:
+            print(f"✗ Error starting browser: {e}")
+            raise
+
+        print("✓ Browser ready")
+
+    def _needs_user(self, reason):
+        """
+        Report a step that needs a person. Returns True in batch mode, where
+        the caller gives up on the step instead of prompting.
+        """
+        if self.interactive:
+            return False
+        print(f"✗ {reason} - tidak bisa dilakukan dalam batch mode")
+        print("  Jalankan sekali tanpa --batch untuk menyelesaikannya di browser.")
+        return True
+
+    async def login(self):
+        """Login to Shopee Seller Centre"""
+        print("\n" + "="*70)
+        print("LOGGING IN TO SHOPEE SELLER CENTRE")
+        print("="*70)
+
+        try:
+            print("Navigating to Shopee Seller Centre...")
+            await self.page.goto(LOGIN_URL, timeout=60000)
+            await self.wait.network_idle(self.page, 'login_page')
+
+            if 'verify/traffic' in self.page.url:
+                print("\n⚠ VERIFIKASI TRAFFIC DIPERLUKAN")
+                print("Silakan selesaikan verifikasi di browser (puzzle/CAPTCHA).")
+                if self._needs_user("Verifikasi traffic diperlukan"):
+                    return False
+                await ainput("\nTekan Enter setelah verifikasi selesai...")
+                await self.wait.network_idle(self.page, 'verification')
+
+            current_url = self.page.url
+            if 'portal' in current_url or 'seller.shopee.co.id' in current_url and 'login' not in current_url:
+                print("✓ Already logged in!")
+                return True
+
+            if self._needs_user("Login manual diperlukan (sesi browser_data/ belum login)"):
+                return False
+            print("\n⚠ MANUAL LOGIN REQUIRED")
+            print("="*70)
+            print("Silakan login secara manual di browser yang terbuka.")
+            print("Setelah berhasil login dan masuk ke dashboard, tekan Enter di sini.")
+            print("="*70)
+            await ainput("\nTekan Enter setelah Anda berhasil login...")
+            await self.wait.url(self.page, 'login_complete', SELLER_URL_PATTERN)
+
+            if 'verify/traffic' in self.page.url:
+                print("\n⚠ Verifikasi traffic muncul lagi setelah login.")
+                await ainput("Tekan Enter setelah verifikasi selesai...")
+                await self.wait.url(self.page, 'verification', SELLER_URL_PATTERN)
+
+            current_url = self.page.url
+            if 'seller.shopee.co.id' in current_url and '404' not in current_url and 'error' not in current_url:
+                print("✓ Login verified!")
+                return True
+            print(f"⚠ Current URL: {current_url}")
+            if self._needs_user("Login belum terverifikasi"):
+                return False
+            retry = (await ainput("Sudah login? (y/n): ")).strip().lower()
+            return retry == 'y'
+
+        except Exception as e:
+            print(f"✗ Login error: {e}")
+            if self._needs_user("Login gagal"):
+                return False
+            await ainput("Tekan Enter setelah login berhasil...")
+            return True
+
+    async def _find_next_button(self, page):
+        """Return the enabled 'next page' button, or None on the last page."""
+        for selector in NEXT_PAGE_SELECTORS:
+            button = await page.query_selector(selector)
+            if button and await button.is_visible() and await button.is_enabled():
+                return button
+        return None
+
+    async def _harvest_orders_from_network(self, harvester, max_pages=None):
+        """
+        Collect orders from the order-list XHR responses, following the pager.
+
+        Returns:
+            list: Order numbers in response order
+        """
+        if not harvester.responses:
+            response = await self.wait.response(self.page, 'order_list_response', harvester.matches)
+            if not response:
+                print("  ⚠ No order-list response captured")
+                return []
+            await harvester.handle_response(response)
+        # Next pages are read from their awaited responses (see ShopeeAutomation)
+        harvester.detach()
+        print(f"  📡 Page 1: {len(harvester.orders)} orders from network")
+
+        page_no = 1
+        while not max_pages or page_no < max_pages:
+            button = await self._find_next_button(self.page)
+            if not button:
+                break
+            known = len(harvester.orders)
+            try:
+                with self.wait.step('order_list_response') as timeout:
+                    async with self.page.expect_response(harvester.matches, timeout=timeout) as response_info:
+                        await button.click()
+                    response = await response_info.value
+                harvester.add_payload(await response.json())
+            except PlaywrightTimeout:
+                break
+            added = len(harvester.orders) - known
+            page_no += 1
+            print(f"  📡 Page {page_no}: {added} new orders from network")
+            if not added:
+                break
+        return harvester.order_numbers
+
+    async def _extract_order_candidates(self, page=None):
+        """Run ORDER_EXTRACT_JS in the page (see ShopeeAutomation._extract_order_candidates)."""
+        return await (page or self.page).evaluate(ORDER_EXTRACT_JS, ORDER_NUMBER_PATTERN)
+
+    async def iter_orders_to_ship(self, page=None, navigate=True, seen=None, watermark=None, max_pages=None):
+        """
+        Crawl every page of the 'Perlu Dikirim' list (async generator, see
+        ShopeeAutomation.iter_orders_to_ship).
+
+        Args:
+            page: Page to crawl on (default: a new tab in the same browser context)
+            navigate: Open ORDERS_TO_SHIP_URL first; False scans the page as it is
+            seen: Order numbers to skip (e.g. already processed)
+            watermark: Stop crawling when this order number is reached
+            max_pages: Maximum number of pages to visit (default: all)
+
+        Yields:
+            str: Order numbers in page order, each at most once
+        """
+        own_page = page is None
+        if own_page:
+            page = await self.browser.new_page()
+        skip = set(seen or ())
+        crawled = set()
+        self.last_detection = []
+        self.page_timings = []
+
+        try:
+            if navigate:
+                await page.goto(ORDERS_TO_SHIP_URL, timeout=30000, wait_until='domcontentloaded')
+                await self.wait.function(page, 'orders_rendered', ORDERS_RENDERED_JS, ORDER_NUMBER_PATTERN)
+            page_no = 1
+            page_started = time.perf_counter()
+            while True:
+                page_orders = []
+                for candidate in await self._extract_order_candidates(page):
+                    page_orders.append(candidate['order'])
+                    if candidate['order'] not in crawled:
+                        self.last_detection.append(candidate)
+
+                # Scroll to the bottom to trigger lazy loading, then rescan
+                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+                await self.wait.network_idle(page, 'lazy_load')
+                page_orders.extend(c['order'] for c in await self._extract_order_candidates(page))
+
+                new_orders = [o for o in dict.fromkeys(page_orders) if o not in crawled]
+                crawled.update(new_orders)
+                elapsed = time.perf_counter() - page_started
+                self.page_timings.append({'page': page_no, 'orders': len(new_orders), 'seconds': elapsed})
+                print(f"  📄 Page {page_no}: {len(new_orders)} orders ({elapsed:.2f}s)")
+
+                reached_watermark = False
+                for order in new_orders:
+                    if order == watermark:
+                        reached_watermark = True
+                        break
+                    if order not in skip:
+                        yield order
+
+                # Stop on the watermark, a page with nothing new, or the page limit
+                if reached_watermark or not new_orders or (max_pages and page_no >= max_pages):
+                    break
+                page_started = time.perf_counter()
+                button = await self._find_next_button(page)
+                if not button:
+                    break
+                await button.click()
+                if not await self.wait.function(page, 'next_page', NEXT_PAGE_LOADED_JS,
+                                                [ORDER_NUMBER_PATTERN, page_orders]):
+                    break
+                page_no += 1
+        finally:
+            if own_page:
+                await page.close()
+
+    async def get_orders_to_ship(self, auto_detect=True, detection_mode='network'):
+        """
+        Get list of orders with status 'Perlu Dikirim' (Ready to Ship)
+
+        Args:
+            auto_detect: Try to automatically extract order numbers from page (default: True)
+            detection_mode: 'network' reads the order-list XHR responses,
+                            'dom' scans the rendered page (default: 'network')
+
+        Returns:
+            list: List of order numbers
+        """
+        print("\n" + "="*70)
+        print("GETTING ORDERS WITH STATUS 'PERLU DIKIRIM'")
+        print("="*70)
+
+        harvester = None
+        order_numbers = []
+        try:
+            if auto_detect and detection_mode == 'network':
+                harvester = AsyncOrderListHarvester()
+                harvester.attach(self.page)
+
+            print(f"Navigating to orders page...")
+            await self.page.goto(ORDERS_TO_SHIP_URL, timeout=30000, wait_until='domcontentloaded')
+            if not harvester:
+                await self.wait.network_idle(self.page, 'orders_page')
+
+            if auto_detect:
+                print("\n🔍 Attempting to auto-detect order numbers from page...")
+                if harvester:
+                    order_numbers = await self._harvest_orders_from_network(harvester)
+                    self.detected_orders = harvester.orders
+                if not order_numbers:
+                    self.last_detection = []
+                    order_numbers = [o async for o in self.iter_orders_to_ship(page=self.page, navigate=False)]
+
+                if order_numbers:
+                    print(f"\n✅ Successfully auto-detected {len(order_numbers)} pesanan:")
+                    for i, order in enumerate(order_numbers[:10], 1):
+                        print(f"  {i}. {order}")
+                    if len(order_numbers) > 10:
+                        print(f"  ... and {len(order_numbers) - 10} more orders")
+                    if not self.interactive:
+                        return order_numbers
+                    confirm = (await ainput("✓ Use detected orders? (y/n) [default: y]: ")).strip().lower() or 'y'
+                    if confirm == 'y':
+                        return order_numbers
+                    order_numbers = []
+                else:
+                    print("⚠ Auto-detection failed or no orders found.")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+        finally:
+            if harvester:
+                harvester.detach()
+
+        # Manual input fallback
+        if not self.interactive:
+            return order_numbers
+        print("\nSilakan input nomor pesanan secara manual (Enter kosong untuk selesai):")
+        while True:
+            order = (await ainput("Nomor pesanan: ")).strip()
+            if not order:
+                break
+            order_numbers.append(order)
+        return order_numbers
+
+    async def _open_order_chat(self, page, order_number):
+        """
+        Open the buyer chat for an order without user interaction, within one
+        CHAT_TIMEOUT deadline (see ShopeeAutomation._open_order_chat).
+
+        Returns:
+            Page showing the chat (a new tab if the chat button opened one)
+
+        Raises:
+            PlaywrightTimeout: If the chat isn't ready before the deadline
+        """
+        deadline = time.monotonic() + self.chat_timeout
+
+        def remaining(budget_ms):
+            left_ms = int((deadline - time.monotonic()) * 1000)
+            if left_ms <= 0:
+                raise PlaywrightTimeout(f"Chat for {order_number} did not open within {self.chat_timeout}s")
+            return min(budget_ms, left_ms)
+
+        await page.goto(ORDER_SEARCH_URL.format(order_number=order_number), timeout=remaining(30000),
+                        wait_until='domcontentloaded')
+        with self.wait.step('order_detail') as timeout:
+            await page.locator(ORDER_LINK_SELECTOR, has_text=order_number).first.click(timeout=remaining(timeout))
+
+        opened = []
+        on_popup = opened.append
+        page.on('popup', on_popup)
+        try:
+            with self.wait.step('chat_button') as timeout:
+                await page.locator(', '.join(CHAT_BUTTON_SELECTORS)).first.click(timeout=remaining(timeout))
+            with self.wait.step('chat_ready') as timeout:
+                deadline = min(deadline, time.monotonic() + timeout / 1000)
+                while True:
+                    chat_page = opened[-1] if opened else page
+                    poll_ms = remaining(CHAT_POLL_MS)
+                    try:
+                        await chat_page.wait_for_selector(CHAT_READY_SELECTOR, state='visible', timeout=poll_ms)
+                        return chat_page
+                    except PlaywrightTimeout:
+                        continue
+        except BaseException:
+            for tab in opened:
+                await tab.close()
+            raise
+        finally:
+            page.remove_listener('popup', on_popup)
+
+    def _screenshot_name(self, order_number):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{order_number}_{timestamp}{self.capture_profile.extension}"
+
+    async def _capture(self, page, full_page=False):
+        """
+        Take a screenshot with the capture profile.
+
+        Returns:
+            bytes: Encoded image
+        """
+        profile = self.capture_profile
+        kwargs = profile.screenshot_kwargs(full_page)
+        panel = page.locator(CHAT_PANEL_SELECTOR).first if profile.clip and not full_page else None
+        if panel is not None and await panel.count() and await panel.is_visible():
+            kwargs.pop('full_page', None)
+            data = await panel.screenshot(**kwargs)
+        else:
+            data = await page.screenshot(**kwargs)
+        return profile.encode(data)
+
+    async def _store(self, order_number, data, output_folder):
+        """
+        Returns:
+            Screenshot in in-memory mode, otherwise the path of the written file
+        """
+        name = self._screenshot_name(order_number)
+        if self.in_memory:
+            return Screenshot(order_number, name, data, self.capture_profile.mime_type)
+        return await asyncio.to_thread(write_screenshot, os.path.join(output_folder, name), data)
+
+    async def take_chat_screenshot(self, order_number, output_folder='screenshots', page=None):
+        """
+        Navigate to order chat and take screenshot.
+        When unattended capture is enabled the chat is opened automatically;
+        the manual prompts are only used if that times out.
+
+        Args:
+            order_number: Order number to screenshot
+            output_folder: Folder to save screenshots (unused in in-memory mode)
+            page: Tab to capture (default: self.page)
+
+        Returns:
+            str: Path to screenshot file (Screenshot in in-memory mode), or None if failed
+        """
+        page = page or self.page
+        try:
+            if not self.in_memory:
+                os.makedirs(output_folder, exist_ok=True)
+
+            if self.unattended:
+                try:
+                    chat_page = await self._open_order_chat(page, order_number)
+                    try:
+                        data = await self._capture(chat_page, full_page=(self.capture_mode == 'full'))
+                    finally:
+                        if chat_page is not page:
+                            await chat_page.close()
+                    screenshot = await self._store(order_number, data, output_folder)
+                    print(f"  ✓ {order_number}: screenshot captured ({os.path.basename(str(screenshot))}, {len(data) / 1024:.0f} KB)")
+                    return screenshot
+                except PlaywrightTimeout:
+                    print(f"  ⚠ {order_number}: chat did not open within {self.chat_timeout}s, switching to manual navigation")
+
+            if self._needs_user(f"Chat pesanan {order_number} harus dibuka manual"):
+                return None
+
+            # Only one tab talks to the user at a time
+            async with self._prompt_lock:
+                await page.bring_to_front()
+                print(f"\nProcessing order: {order_number}")
+                print(f"\n" + "="*50)
+                print(f"MANUAL NAVIGATION REQUIRED")
+                print("="*50)
+                print(f"1. Cari pesanan dengan nomor: {order_number}")
+                print(f"2. Buka detail pesanan dan klik 'Chat'")
+                print(f"3. Scroll ke bagian chat yang menunjukkan konfirmasi pembeli")
+                print(f"4. Tekan Enter di sini untuk mengambil screenshot")
+                print("="*50)
+
+                await ainput("\nTekan Enter setelah chat terbuka dan siap di-screenshot...")
+
+                print("\nPilih tipe screenshot:")
+                print("1. Full page (seluruh halaman)")
+                print("2. Visible area only (hanya area yang terlihat - RECOMMENDED)")
+                choice = (await ainput("Pilih (1/2) [default: 2]: ")).strip() or "2"
+
+            print(f"  → Taking screenshot...")
+            data = await self._capture(page, full_page=(choice == "1"))
+            screenshot = await self._store(order_number, data, output_folder)
+            print(f"  ✓ Screenshot captured: {os.path.basename(str(screenshot))} ({len(data) / 1024:.0f} KB)")
+
+            return screenshot
+
+        except Exception as e:
+            print(f"  ✗ Error taking screenshot for {order_number}: {e}")
+            return None
+
+    async def capture_pool(self, order_numbers, output_folder='screenshots', concurrency=3, on_captured=None):
+        """
+        Capture chats for many orders using several tabs of the persistent context.
+        Tabs share the login cookies; each tab takes the next order from a shared
+        queue. A failing order or a crashed tab only affects that order: the tab
+        is replaced and keeps working.
+
+        Args:
+            order_numbers: Orders to capture
+            output_folder: Folder to save screenshots
+            concurrency: Number of tabs working at the same time
+            on_captured: Optional callback(order_number, screenshot) called as soon
+                         as each capture finishes (screenshot is None on failure)
+
+        Returns:
+            dict: order_number -> screenshot path or Screenshot (None if the capture failed)
+        """
+        queue = asyncio.Queue()
+        for order_number in order_numbers:
+            queue.put_nowait(order_number)
+        results = {}
+
+        async def worker(tab_no):
+            page = self.page if tab_no == 0 else await self.browser.new_page()
+            try:
+                while True:
+                    try:
+                        order_number = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        if page.is_closed():
+                            print(f"  ⚠ Tab {tab_no + 1} was closed, opening a new one")
+                            page = await self.browser.new_page()
+                        screenshot = await self.take_chat_screenshot(order_number, output_folder, page=page)
+                    except Exception as e:
+                        print(f"  ✗ Tab {tab_no + 1} failed on {order_number}: {e}")
+                        screenshot = None
+                    results[order_number] = screenshot
+                    if on_captured:
+                        on_captured(order_number, screenshot)
+            finally:
+                if tab_no and not page.is_closed():
+                    await page.close()
+
+        tabs = max(1, min(concurrency, len(order_numbers)))
+        print(f"ℹ Capturing {len(order_numbers)} orders with {tabs} tab(s)")
+        await asyncio.gather(*(worker(tab_no) for tab_no in range(tabs)))
+        return results
+
+    async def close_browser(self):
+        """Close the browser"""
+        try:
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+            print("\n✓ Browser closed")
+        except Exception:
+            # Browser might already be closed manually
+            print("\n✓ Browser already closed")
+            if self.playwright:
+                try:
+                    await self.playwright.stop()
+                except Exception:
+                    pass
@@ -1,23 +1,58 @@
 import os.path
 import configparser
+import io
+import itertools
 import json
+import queue
 import re
+import sys
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-import openpyxl
-from openpyxl import Workbook
-from shopee_module import ShopeeAutomation
+# Playwright, the Google API clients, aiohttp and openpyxl are imported inside
+# the functions that use them, so importing this module stays cheap (see
+# check_import_time.py)
+from screenshots import CAPTURE_PROFILES, CaptureProfile, Screenshot, image_mime_type, write_screenshot
+from checkpoint_store import CheckpointJournal
+from drive_retry import AdaptiveConcurrency, RetryEngine, classify_error, skip_latency_sample
+from excel_report import OrderIndex, ReportWriter
+from job_store import CAPTURED, SHARED, UPLOADED, JobStore
+from run_summary import (EXIT_CONFIG, EXIT_DRIVE, EXIT_ERROR, EXIT_INTERRUPTED, EXIT_LOGIN, EXIT_OK,
+                         EXIT_ORDERS_FAILED, EXIT_USAGE, RunSummary)
+from upload_cache import UploadCache, content_digest
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/drive"]
-CHECKPOINT_FILE = 'processed_orders.json'
+CHECKPOINT_FILE = 'processed_orders.jsonl'
+# Shareable-link grant applied to every uploaded screenshot
+ANYONE_READER_PERMISSION = {'type': 'anyone', 'role': 'reader'}
+# Maximum number of sub-requests Drive accepts in one batch request
+DRIVE_BATCH_LIMIT = 100
+# Files up to this size go in one multipart request; larger ones use resumable sessions
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+# Resumable chunk size (must be a multiple of 256 KB)
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+# Pre-journal checkpoint format, migrated automatically on first load
+LEGACY_CHECKPOINT_FILE = 'processed_orders.json'
+UPLOAD_CACHE_FILE = 'upload_cache.json'
+JOB_STORE_FILE = 'jobs.db'
+_checkpoint_journal = None
+_order_indexes = {}
+# Content-hash cache of uploaded screenshots, enabled by enable_upload_cache()
+_upload_cache = None
+# Per-order stage tracking in SQLite, enabled by enable_job_store()
+_job_store = None
+# Rate limit and retry policy shared by every Drive call, see configure_drive_retry()
+_drive_retry = RetryEngine()
+# Upload concurrency limit of the current run, see configure_upload_concurrency()
+_upload_concurrency = None
+# Answers to the run's yes/no prompts: (key, [AUTOMATION] option, choices, answer used in batch mode for 'ask')
+RUN_POLICIES = (
+    ('resume', 'RESUME_POLICY', ('ask', 'resume', 'fresh'), 'resume'),
+    ('duplicates', 'DUPLICATE_POLICY', ('ask', 'skip', 'process'), 'skip'),
+    ('invalid_orders', 'INVALID_ORDER_POLICY', ('ask', 'keep', 'drop'), 'keep')
+)
 
 def validate_order_number(order_number):
     """
@@ -34,25 +69,32 @@ def validate_order_number(order_number):
     pattern = r'^\d{6}[A-Z0-9]+$'
     return bool(re.match(pattern, order_number.upper()))
 
-def get_batch_orders():
+def get_batch_orders(orders_file=None, invalid_policy='ask'):
     """
     Get order numbers from user with multiple input methods:
     1. Comma-separated list
     2. Newline-separated (traditional)
     3. From text file
     
+    Args:
+        orders_file: Read this file (one order per line) without asking for a method
+        invalid_policy: What to do with suspicious order numbers: 'ask', 'keep' or 'drop'
+    
     Returns:
         list: List of order numbers
     """
     print("\n" + "="*70)
     print("INPUT NOMOR PESANAN")
     print("="*70)
-    print("\nPilih metode input:")
-    print("1. Paste comma-separated (2504226A23B55PX, 2504226A34BUBPFX, ...)")
-    print("2. Input satu per satu (tekan Enter dua kali untuk selesai)")
-    print("3. Import dari file txt (orders.txt)")
-    
-    choice = input("\nPilih metode (1/2/3) [default: 2]: ").strip() or "2"
+    if orders_file:
+        choice = "3"
+    else:
+        print("\nPilih metode input:")
+        print("1. Paste comma-separated (2504226A23B55PX, 2504226A34BUBPFX, ...)")
+        print("2. Input satu per satu (tekan Enter dua kali untuk selesai)")
+        print("3. Import dari file txt (orders.txt)")
+        
+        choice = input("\nPilih metode (1/2/3) [default: 2]: ").strip() or "2"
     
     order_numbers = []
     
@@ -65,7 +107,7 @@ def get_batch_orders():
         
     elif choice == "3":
         # Read from file
-        file_path = input("\nNama file [default: orders.txt]: ").strip() or "orders.txt"
+        file_path = orders_file or input("\nNama file [default: orders.txt]: ").strip() or "orders.txt"
         try:
             with open(file_path, 'r') as f:
                 order_numbers = [line.strip() for line in f if line.strip()]
@@ -105,7 +147,11 @@ def get_batch_orders():
             for order in invalid_orders:
                 print(f"  - {order}")
             
-            confirm = input("\nLanjutkan dengan semua pesanan? (y/n) [default: y]: ").strip().lower() or 'y'
+            if invalid_policy == 'ask':
+                confirm = input("\nLanjutkan dengan semua pesanan? (y/n) [default: y]: ").strip().lower() or 'y'
+            else:
+                confirm = 'y' if invalid_policy == 'keep' else 'n'
+                print(f"\nINVALID_ORDER_POLICY={invalid_policy}")
             if confirm != 'y':
                 print("Hanya pesanan valid yang akan diproses.")
                 return valid_orders
@@ -116,70 +162,372 @@ def get_batch_orders():
         print("\n⚠ Tidak ada nomor pesanan yang diinput")
         return []
 
+def _get_checkpoint_journal():
+    """Return the journal for CHECKPOINT_FILE, creating it on first use."""
+    global _checkpoint_journal
+    if _checkpoint_journal is None or _checkpoint_journal.path != CHECKPOINT_FILE:
+        if _checkpoint_journal is not None:
+            _checkpoint_journal.flush()
+        _checkpoint_journal = CheckpointJournal(CHECKPOINT_FILE, legacy_path=LEGACY_CHECKPOINT_FILE)
+    return _checkpoint_journal
+
 def save_checkpoint(order_number, gdrive_link):
     """
     Save processed order to checkpoint file for resume capability.
+    The entry is appended to a JSONL journal, so the file is never rewritten.
     
     Args:
         order_number: Order number that was processed
         gdrive_link: Google Drive link for the screenshot
     """
     try:
-        # Load existing checkpoint or create new
-        if os.path.exists(CHECKPOINT_FILE):
-            with open(CHECKPOINT_FILE, 'r') as f:
-                checkpoint = json.load(f)
-        else:
-            checkpoint = {'processed_orders': [], 'timestamp': None}
-        
-        # Add new order
-        checkpoint['processed_orders'].append({
-            'order_number': order_number,
-            'gdrive_link': gdrive_link,
-            'timestamp': datetime.now().isoformat()
-        })
-        checkpoint['timestamp'] = datetime.now().isoformat()
-        
-        # Save checkpoint
-        with open(CHECKPOINT_FILE, 'w') as f:
-            json.dump(checkpoint, f, indent=2)
+        _get_checkpoint_journal().append(order_number, gdrive_link)
     except Exception as e:
         print(f"    ⚠ Warning: Could not save checkpoint: {e}")
+    track_job(order_number, SHARED, gdrive_link=gdrive_link)
 
 def load_checkpoint():
     """
     Load checkpoint to resume interrupted session.
     
     Returns:
-        dict: Dictionary with 'processed_orders' list or empty dict
+        dict: Dictionary with 'processed_orders' list and 'order_numbers' set
     """
     try:
-        if os.path.exists(CHECKPOINT_FILE):
-            with open(CHECKPOINT_FILE, 'r') as f:
-                return json.load(f)
+        return _get_checkpoint_journal().load()
     except Exception as e:
         print(f"⚠ Warning: Could not load checkpoint: {e}")
-    return {'processed_orders': []}
+    return {'processed_orders': [], 'order_numbers': set()}
+
+def flush_checkpoint():
+    """Force pending checkpoint entries to disk."""
+    try:
+        _get_checkpoint_journal().flush()
+    except Exception as e:
+        print(f"⚠ Warning: Could not flush checkpoint: {e}")
+
+def clear_checkpoint():
+    """Delete the checkpoint so the next run starts from scratch."""
+    _get_checkpoint_journal().clear()
+
+def merge_checkpoint_journal(path):
+    """
+    Append the records of another checkpoint journal (a shard worker's) to
+    CHECKPOINT_FILE, then delete it.
+    
+    Returns:
+        int: Number of processed orders merged
+    """
+    if not os.path.exists(path):
+        return 0
+    other = CheckpointJournal(path).load()
+    journal = _get_checkpoint_journal()
+    # Unfinished uploads first, so an order's final record always comes last
+    for record in list(other['upload_sessions'].values()) + other['processed_orders']:
+        extra = {k: v for k, v in record.items() if k not in ('order_number', 'gdrive_link', 'timestamp')}
+        journal.append(record['order_number'], record.get('gdrive_link'), **extra)
+    journal.flush()
+    os.remove(path)
+    return len(other['processed_orders'])
+
+def enable_upload_cache(config):
+    """
+    Turn on the content-hash upload cache if UPLOAD_CACHE is enabled.
+    
+    Returns:
+        UploadCache, or None when disabled
+    """
+    global _upload_cache
+    if config.getboolean('AUTOMATION', 'UPLOAD_CACHE', fallback=True):
+        max_entries = config.getint('AUTOMATION', 'UPLOAD_CACHE_SIZE', fallback=5000)
+        _upload_cache = UploadCache(UPLOAD_CACHE_FILE, max_entries=max_entries)
+    else:
+        _upload_cache = None
+    return _upload_cache
+
+def enable_job_store(config, release_claims=True):
+    """
+    Open the SQLite job store if JOB_STORE is enabled.
+    
+    Args:
+        config: Settings from load_config()
+        release_claims: Drop claims left by earlier (crashed) runs; only safe
+                        when no other worker uses the same database
+    
+    Returns:
+        JobStore, or None when disabled
+    """
+    global _job_store
+    if _job_store is not None:
+        _job_store.close()
+        _job_store = None
+    if config.getboolean('AUTOMATION', 'JOB_STORE', fallback=True):
+        _job_store = JobStore(
+            config.get('AUTOMATION', 'JOB_STORE_FILE', fallback=JOB_STORE_FILE),
+            max_attempts=config.getint('AUTOMATION', 'JOB_MAX_ATTEMPTS', fallback=3),
+            lease_seconds=config.getint('AUTOMATION', 'JOB_LEASE_SECONDS', fallback=600)
+        )
+        if release_claims:
+            _job_store.release(all_workers=True)
+    return _job_store
+
+def track_job(order_number, state, **fields):
+    """Record that an order reached a stage in the job store (if enabled)."""
+    if _job_store is None:
+        return
+    try:
+        _job_store.advance(order_number, state, **fields)
+    except Exception as e:
+        print(f"    ⚠ Warning: Could not update job store: {e}")
+
+def claim_job(order_number):
+    """
+    Claim an order in the job store before working on it.
+    
+    Returns:
+        bool: False if another worker is processing it (always True without a store)
+    """
+    if _job_store is None or _job_store.claim(order_number):
+        return True
+    print(f"  ⏭ {order_number} sedang diproses worker lain, dilewati")
+    return False
+
+def queue_orders(order_numbers):
+    """
+    Add orders to the job store and append the orders earlier runs failed
+    (with attempts left) or didn't finish.
+    
+    Call it with the orders left after filter_orders(): an order queued and
+    then skipped would stay 'detected' and come back on every run.
+    
+    Returns:
+        list: order_numbers followed by the re-queued orders
+    """
+    if _job_store is None:
+        return order_numbers
+    _job_store.add(order_numbers)
+    queued = set(order_numbers)
+    requeued = [o for o in _job_store.requeue() if o not in queued]
+    if requeued:
+        print(f"↻ {len(requeued)} pesanan dari run sebelumnya (gagal/belum selesai) diproses ulang")
+    return list(order_numbers) + requeued
+
+def record_failures(failed_orders):
+    """Mark failed orders (dicts with 'order' and 'reason') in the job store."""
+    if _job_store is None:
+        return
+    for fail in failed_orders:
+        _job_store.fail(fail['order'], fail['reason'])
+
+def save_upload_cache():
+    """Write the upload cache to disk (if enabled)."""
+    if _upload_cache is not None:
+        _upload_cache.save()
+
+def merge_upload_cache(path):
+    """
+    Add the entries of another upload cache file (a shard worker's) to the
+    upload cache, then delete it.
+    
+    Returns:
+        int: Number of entries added or updated
+    """
+    if not os.path.exists(path):
+        return 0
+    merged = _upload_cache.merge(UploadCache(path)) if _upload_cache is not None else 0
+    os.remove(path)
+    return merged
+
+def _read_content(file_path):
+    if isinstance(file_path, Screenshot):
+        return file_path.data
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+def configure_drive_retry(config):
+    """
+    Set up the shared Drive rate limiter and retry policy from [AUTOMATION].
+    
+    Returns:
+        RetryEngine: The engine used by all Drive calls from now on
+    """
+    global _drive_retry
+    _drive_retry = RetryEngine(
+        requests_per_second=config.getfloat('AUTOMATION', 'DRIVE_REQUESTS_PER_SECOND', fallback=10),
+        max_retries=config.getint('AUTOMATION', 'DRIVE_MAX_RETRIES', fallback=5),
+        breaker_threshold=config.getint('AUTOMATION', 'DRIVE_BREAKER_THRESHOLD', fallback=5),
+        breaker_cooldown=config.getint('AUTOMATION', 'DRIVE_BREAKER_COOLDOWN', fallback=30)
+    )
+    return _drive_retry
+
+def configure_upload_concurrency(config):
+    """
+    Set up the upload concurrency limit from [AUTOMATION].
+    
+    With ADAPTIVE_UPLOADS the limit starts at UPLOAD_WORKERS and is tuned
+    between MIN_UPLOAD_WORKERS and MAX_UPLOAD_WORKERS from upload latency and
+    Drive rate-limit responses; otherwise it stays at UPLOAD_WORKERS. Call
+    after configure_drive_retry().
+    
+    Returns:
+        AdaptiveConcurrency: Limit to run uploads through (its maximum is the
+                             number of worker threads to start)
+    """
+    global _upload_concurrency
+    workers = max(1, config.getint('AUTOMATION', 'UPLOAD_WORKERS', fallback=3))
+    if config.getboolean('AUTOMATION', 'ADAPTIVE_UPLOADS', fallback=True):
+        _upload_concurrency = AdaptiveConcurrency(
+            initial=workers,
+            minimum=config.getint('AUTOMATION', 'MIN_UPLOAD_WORKERS', fallback=1),
+            maximum=config.getint('AUTOMATION', 'MAX_UPLOAD_WORKERS', fallback=8)
+        )
+        _drive_retry.on_rate_limited = _upload_concurrency.throttled
+    else:
+        _upload_concurrency = AdaptiveConcurrency(initial=workers, minimum=workers, maximum=workers)
+    return _upload_concurrency
+
+def save_upload_session(order_number, session_uri, file_path):
+    """
+    Record an open resumable upload session so an interrupted upload of the
+    same file can continue in a later run.
+    """
+    in_memory = isinstance(file_path, Screenshot)
+    try:
+        _get_checkpoint_journal().append(
+            order_number, None,
+            upload_session=session_uri,
+            upload_source=file_path.name if in_memory else os.path.abspath(file_path),
+            upload_size=len(file_path) if in_memory else os.path.getsize(file_path)
+        )
+    except Exception as e:
+        print(f"    ⚠ Warning: Could not save upload session: {e}")
+
+def _matching_session(order_number, file_path):
+    """Return the saved session URI for order_number if it was for this exact file."""
+    try:
+        record = _get_checkpoint_journal().upload_session(order_number)
+    except Exception:
+        return None
+    if not record:
+        return None
+    in_memory = isinstance(file_path, Screenshot)
+    source = file_path.name if in_memory else os.path.abspath(file_path)
+    size = len(file_path) if in_memory else os.path.getsize(file_path)
+    if os.path.basename(record.get('upload_source', '')) == os.path.basename(source) and record.get('upload_size') == size:
+        return record['upload_session']
+    return None
+
+def pending_upload_file(order_number, screenshots_folder='screenshots'):
+    """
+    Find the local screenshot of an upload that was interrupted in an earlier
+    run, so it can be resumed instead of captured again.
+    
+    Returns:
+        str: Path to the file, or None
+    """
+    try:
+        record = _get_checkpoint_journal().upload_session(order_number)
+    except Exception:
+        return None
+    if not record or not record.get('upload_source'):
+        return None
+    source = record['upload_source']
+    for path in (source, os.path.join(screenshots_folder, os.path.basename(source))):
+        if os.path.isfile(path) and os.path.getsize(path) == record.get('upload_size'):
+            return path
+    return None
+
+def upload_and_checkpoint(service, order_number, file_path, folder_id, permissions=None):
+    """
+    Upload one screenshot and record it in the checkpoint.
+    
+    With a PermissionBatcher the link grant is deferred to the batcher, which
+    writes the checkpoint once the file is actually shared. Resumable upload
+    sessions are checkpointed as they open and resumed when the same file is
+    uploaded again.
+    
+    Returns:
+        str: Shareable link, or None if the upload failed
+    """
+    upload_options = {
+        'resume_uri': _matching_session(order_number, file_path),
+        'on_session': lambda session_uri: save_upload_session(order_number, session_uri, file_path)
+    }
+    try:
+        file = create_gdrive_file(service, file_path, folder_id, share=permissions is None, **upload_options)
+        gdrive_link = file.get('webViewLink') if file else None
+    except Exception as e:
+        print(f"    ✗ Exception uploading {file_path}: {e}")
+        gdrive_link = None
+    if gdrive_link:
+        track_job(order_number, UPLOADED, gdrive_link=gdrive_link, file_id=file['id'])
+    if gdrive_link and permissions is not None and not file.get('shared'):
+        permissions.add(order_number, file['id'], gdrive_link)
+    elif gdrive_link:
+        save_checkpoint(order_number, gdrive_link)
+    return gdrive_link
 
-def upload_to_gdrive_batch(service, file_paths, folder_id, max_workers=3):
+async def upload_and_checkpoint_async(uploader, order_number, file_path, folder_id, permissions=None):
+    """
+    upload_and_checkpoint() for the asyncio uploader.
+    
+    Args:
+        uploader: AsyncDriveUploader
+        order_number: Order the screenshot belongs to
+        file_path: Path to the screenshot, or an in-memory Screenshot
+        folder_id: Google Drive folder ID
+        permissions: Optional PermissionBatcher for deferred link grants
+    
+    Returns:
+        str: Shareable link, or None if the upload failed
+    """
+    upload_options = {
+        'resume_uri': _matching_session(order_number, file_path),
+        'on_session': lambda session_uri: save_upload_session(order_number, session_uri, file_path)
+    }
+    try:
+        file = await create_gdrive_file_async(uploader, file_path, folder_id, share=permissions is None,
+                                              **upload_options)
+        gdrive_link = file.get('webViewLink') if file else None
+    except Exception as e:
+        print(f"    ✗ Exception uploading {file_path}: {e}")
+        gdrive_link = None
+    if gdrive_link:
+        track_job(order_number, UPLOADED, gdrive_link=gdrive_link, file_id=file['id'])
+    if gdrive_link and permissions is not None and not file.get('shared'):
+        import asyncio
+        # A full batch is sent by add(), which blocks
+        await asyncio.to_thread(permissions.add, order_number, file['id'], gdrive_link)
+    elif gdrive_link:
+        save_checkpoint(order_number, gdrive_link)
+    return gdrive_link
+
+def upload_to_gdrive_batch(service, file_paths, folder_id, max_workers=3, concurrency=None):
     """
     Upload multiple files to Google Drive in parallel.
+    Files are shared afterwards with batched permission requests.
     
     Args:
-        service: Google Drive API service object
+        service: DriveClientPool from get_gdrive_service() (a plain service
+                 object is only safe with max_workers=1)
         file_paths: List of file paths to upload
         folder_id: Google Drive folder ID
         max_workers: Maximum number of parallel uploads (default: 3)
+        concurrency: Optional AdaptiveConcurrency; uploads then run through
+                     it with up to its maximum in parallel
     
     Returns:
         dict: Dictionary mapping file paths to their Google Drive links
     """
     results = {}
+    uploaded = {}
+    if concurrency is None:
+        concurrency = AdaptiveConcurrency(initial=max_workers, minimum=max_workers, maximum=max_workers)
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ThreadPoolExecutor(max_workers=concurrency.maximum) as executor:
         # Submit all upload tasks
         future_to_path = {
-            executor.submit(upload_to_gdrive, service, path, folder_id): path 
+            executor.submit(concurrency.run, create_gdrive_file, service, path, folder_id, share=False): path
             for path in file_paths
         }
         
@@ -187,14 +535,358 @@ def upload_to_gdrive_batch(service, file_paths, folder_id, max_workers=3):
         for future in as_completed(future_to_path):
             file_path = future_to_path[future]
             try:
-                gdrive_link = future.result()
-                results[file_path] = gdrive_link
+                uploaded[file_path] = future.result()
             except Exception as e:
                 print(f"    ✗ Exception uploading {file_path}: {e}")
-                results[file_path] = None
+                uploaded[file_path] = None
     
+    permissions = PermissionBatcher(service)
+    for file_path, file in uploaded.items():
+        results[file_path] = None
+        if file:
+            permissions.add(file_path, file['id'], file['webViewLink'])
+    permissions.close()
+    results.update(permissions.granted)
     return results
 
+class PermissionBatcher:
+    """
+    Applies the anyone-with-the-link grant to uploaded files in Drive batch
+    requests (up to DRIVE_BATCH_LIMIT sub-requests each) instead of one
+    permissions().create round trip per file.
+    
+    Each sub-request is mapped back to its order: granted orders are passed to
+    on_granted, transient failures are queued again on their own until
+    max_retries and permanent ones are reported right away. Upload workers may
+    add() concurrently; a full batch is sent by the worker that filled it.
+    Every sub-request counts against the shared Drive rate limit.
+    """
+    
+    def __init__(self, service, batch_size=DRIVE_BATCH_LIMIT, max_retries=3, on_granted=None, retry=None):
+        """
+        Args:
+            service: Google Drive API service object
+            batch_size: Grants per batch request (capped at DRIVE_BATCH_LIMIT)
+            max_retries: Attempts per order before it is reported as failed
+            on_granted: Optional callback(order_number, gdrive_link) after a grant succeeds
+            retry: RetryEngine to rate limit and back off with (default: the shared one)
+        """
+        self.service = service
+        self.retry = retry or _drive_retry
+        self.batch_size = max(1, min(batch_size, DRIVE_BATCH_LIMIT))
+        self.max_retries = max_retries
+        self.on_granted = on_granted
+        self.pending = []
+        self.attempts = {}
+        self.granted = {}
+        self.failed = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+    
+    def add(self, order_number, file_id, gdrive_link):
+        """Queue a grant; a full batch is sent right away."""
+        with self._lock:
+            self.pending.append((order_number, file_id, gdrive_link))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Send all queued grants. Failed items are queued again for the next flush."""
+        with self._lock:
+            items, self.pending = self.pending, []
+        for start in range(0, len(items), self.batch_size):
+            self._execute(items[start:start + self.batch_size])
+    
+    def _execute(self, items):
+        requests = {str(i): item for i, item in enumerate(items)}
+        handled = set()
+        
+        def callback(request_id, response, exception):
+            handled.add(request_id)
+            order_number, _, gdrive_link = requests[request_id]
+            if exception is None:
+                with self._lock:
+                    self.granted[order_number] = gdrive_link
+                if self.on_granted:
+                    self.on_granted(order_number, gdrive_link)
+            else:
+                self._retry_or_fail(requests[request_id], exception)
+        
+        batch = self.service.new_batch_http_request(callback=callback)
+        for request_id, (_, file_id, _) in requests.items():
+            batch.add(
+                self.service.permissions().create(fileId=file_id, body=ANYONE_READER_PERMISSION, fields='id'),
+                request_id=request_id
+            )
+        try:
+            self.retry.acquire(len(requests))
+            batch.execute()
+        except Exception as e:
+            # The whole batch failed (e.g. network error): retry what wasn't answered
+            for request_id, item in requests.items():
+                if request_id not in handled:
+                    self._retry_or_fail(item, e)
+        with self._lock:
+            self.batches += 1
+    
+    def _retry_or_fail(self, item, error):
+        order_number = item[0]
+        reason = classify_error(error)
+        if reason:
+            self.retry.record(error, reason)
+        with self._lock:
+            self.attempts[order_number] = self.attempts.get(order_number, 0) + 1
+            if reason and self.attempts[order_number] < self.max_retries:
+                self.pending.append(item)
+                return
+            self.failed[order_number] = str(error)
+        print(f"    ✗ Could not share {order_number} after {self.attempts[order_number]} attempt(s): {error}")
+    
+    def close(self):
+        """
+        Send everything still queued, retrying failed items with backoff.
+        
+        Returns:
+            dict: order_number -> error message for grants that failed for good
+        """
+        wait_time = self.retry.base_delay
+        while self.pending:
+            self.flush()
+            if self.pending:
+                wait_time = self.retry.jitter(wait_time)
+                print(f"    ⚠ {len(self.pending)} permission grant(s) failed, retrying in {wait_time:.1f}s...")
+                self.retry.sleep(wait_time)
+        return dict(self.failed)
+
+class UploadPipeline:
+    """
+    Bounded background upload queue that overlaps screenshot capture with
+    Google Drive uploads.
+
+    The capture loop submits screenshots as soon as they are taken and moves
+    on to the next order while worker threads upload and checkpoint the
+    previous ones. When the queue is full, submit() blocks, so the number of
+    screenshots waiting for upload never exceeds max_pending.
+    """
+
+    def __init__(self, service, folder_id, max_pending=5, permissions=None, workers=1, concurrency=None):
+        """
+        Args:
+            service: Google Drive API service object (a DriveClientPool when workers > 1)
+            folder_id: Google Drive folder ID
+            max_pending: Maximum number of screenshots waiting for upload
+            permissions: Optional PermissionBatcher for deferred link grants
+            workers: Number of upload threads (ignored with concurrency)
+            concurrency: Optional AdaptiveConcurrency deciding how many of its
+                         maximum worker threads upload at once
+        """
+        self.service = service
+        self.folder_id = folder_id
+        self.permissions = permissions
+        if concurrency is None:
+            concurrency = AdaptiveConcurrency(initial=workers, minimum=workers, maximum=workers)
+        self.concurrency = concurrency
+        self.queue = queue.Queue(maxsize=max(1, max_pending))
+        self.results = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._run, name=f'gdrive-upload-{i + 1}', daemon=True)
+            for i in range(concurrency.maximum)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, order_number, file_path):
+        """Queue a screenshot for upload (blocks while the queue is full)."""
+        self.queue.put((order_number, file_path))
+
+    @property
+    def pending(self):
+        """Number of screenshots waiting for an upload worker."""
+        return self.queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            order_number, file_path = item
+            gdrive_link = self.concurrency.run(upload_and_checkpoint, self.service, order_number, file_path,
+                                               self.folder_id, self.permissions)
+            with self._lock:
+                self.results.append((order_number, gdrive_link))
+            self.queue.task_done()
+
+    def close(self):
+        """
+        Wait for all queued uploads to finish and stop the workers.
+
+        Returns:
+            list: (order_number, gdrive_link) tuples in completion order,
+                  gdrive_link is None for failed uploads
+        """
+        if not self._closed:
+            self._closed = True
+            for _ in self._workers:
+                self.queue.put(None)
+            for worker in self._workers:
+                worker.join()
+        with self._lock:
+            return list(self.results)
+
+class AsyncUploadPipeline:
+    """
+    UploadPipeline on the asyncio Drive uploader.
+
+    Uploads run as coroutines on an event loop in a background thread, so
+    dozens can be in flight over a few pooled connections instead of one
+    thread each. submit() blocks while max_pending screenshots are waiting
+    for an upload slot.
+    """
+
+    def __init__(self, uploader, folder_id, max_pending=5, permissions=None, concurrency=None):
+        """
+        Args:
+            uploader: AsyncDriveUploader
+            folder_id: Google Drive folder ID
+            max_pending: Maximum number of screenshots waiting for an upload slot
+            permissions: Optional PermissionBatcher for deferred link grants
+            concurrency: Optional AdaptiveConcurrency limiting uploads in flight
+                         (default: uploader.max_connections)
+        """
+        self.uploader = uploader
+        self.folder_id = folder_id
+        self.permissions = permissions
+        if concurrency is None:
+            concurrency = AdaptiveConcurrency(initial=uploader.max_connections, minimum=uploader.max_connections,
+                                              maximum=uploader.max_connections)
+        self.concurrency = concurrency
+        self.results = []
+        self._futures = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_pending) + concurrency.maximum)
+        self._closed = False
+        import asyncio
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='gdrive-async-upload', daemon=True)
+        self._thread.start()
+
+    def submit(self, order_number, file_path):
+        """Start uploading a screenshot (blocks while max_pending are waiting)."""
+        import asyncio
+        self._slots.acquire()
+        future = asyncio.run_coroutine_threadsafe(self._upload(order_number, file_path), self._loop)
+        with self._lock:
+            self._futures.append(future)
+
+    @property
+    def pending(self):
+        """Number of screenshots not uploaded yet (in flight or waiting)."""
+        with self._lock:
+            return sum(not future.done() for future in self._futures)
+
+    async def _upload(self, order_number, file_path):
+        try:
+            gdrive_link = await self.concurrency.run_async(upload_and_checkpoint_async, self.uploader, order_number,
+                                                           file_path, self.folder_id, self.permissions)
+        finally:
+            self._slots.release()
+        with self._lock:
+            self.results.append((order_number, gdrive_link))
+
+    def close(self):
+        """
+        Wait for all started uploads to finish, close the connections and
+        stop the event loop.
+
+        Returns:
+            list: (order_number, gdrive_link) tuples in completion order,
+                  gdrive_link is None for failed uploads
+        """
+        import asyncio
+        if not self._closed:
+            self._closed = True
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"    ✗ Background upload error: {e}")
+            asyncio.run_coroutine_threadsafe(self.uploader.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        with self._lock:
+            return list(self.results)
+
+class ScreenshotArchive:
+    """
+    Optional local copy of in-memory screenshots.
+
+    Files are written by a background thread, so archiving never delays
+    capture or upload. Pending screenshots are only held until written.
+    """
+
+    def __init__(self, folder='screenshots'):
+        """
+        Args:
+            folder: Folder to write the archive copies to
+        """
+        self.folder = folder
+        self.saved = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot-archive')
+
+    def save(self, screenshot):
+        """Queue a Screenshot for writing (returns immediately)."""
+        self._executor.submit(self._write, screenshot)
+
+    def _write(self, screenshot):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            write_screenshot(os.path.join(self.folder, screenshot.name), screenshot.data)
+            self.saved += 1
+        except OSError as e:
+            print(f"    ⚠ Could not archive {screenshot.name}: {e}")
+
+    def close(self):
+        """
+        Wait for queued writes to finish.
+
+        Returns:
+            int: Number of screenshots written
+        """
+        self._executor.shutdown(wait=True)
+        return self.saved
+
+def _get_order_index(excel_file):
+    """Return the cached order-number index for an Excel report."""
+    path = os.path.abspath(excel_file)
+    if path not in _order_indexes:
+        _order_indexes[path] = OrderIndex(excel_file)
+    return _order_indexes[path]
+
+def find_duplicates(order_numbers, excel_file='shopee_report.xlsx'):
+    """
+    Find which order numbers already exist in the Excel report.
+    The workbook is read at most once (and not at all when the index is fresh).
+    
+    Args:
+        order_numbers: Order numbers to check
+        excel_file: Path to Excel file
+    
+    Returns:
+        set: Order numbers that are already in the report
+    """
+    try:
+        return _get_order_index(excel_file).find_duplicates(order_numbers)
+    except Exception as e:
+        print(f"⚠ Warning: Could not check duplicates in {excel_file}: {e}")
+        return set()
+
 def check_duplicate_in_excel(order_number, excel_file='shopee_report.xlsx'):
     """
     Check if order number already exists in Excel report.
@@ -206,26 +898,30 @@ def check_duplicate_in_excel(order_number, excel_file='shopee_report.xlsx'):
     Returns:
         bool: True if duplicate found, False otherwise
     """
-    try:
-        if not os.path.exists(excel_file):
-            return False
-        
-        wb = openpyxl.load_workbook(excel_file)
-        ws = wb.active
-        
-        # Check column B (OrderSN) starting from row 2
-        for row in range(2, ws.max_row + 1):
-            if ws[f'B{row}'].value == order_number:
-                return True
-        
-        return False
-    except Exception:
-        return False
+    return bool(find_duplicates([order_number], excel_file))
 
-def get_gdrive_service():
+def _save_token(creds):
+    # Written atomically: sharded workers may refresh the token at the same time
+    tmp_path = f"token.json.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as token:
+        token.write(creds.to_json())
+    os.replace(tmp_path, "token.json")
+
+def get_gdrive_service(interactive=True):
     """
-    Authenticates with the Google Drive API and returns a service object.
+    Authenticates with the Google Drive API and returns a DriveClientPool.
+    The pool can be used like a service object from any number of threads;
+    refreshed tokens are saved back to token.json. No network request is
+    made here unless the user has to authorize the app.
+    
+    Args:
+        interactive: Ask for an authorization code when token.json is missing
+                     or unusable; when False (batch mode) return None instead
     """
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.errors import HttpError
+    from drive_client import DriveClientPool
+    
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -233,34 +929,38 @@ def get_gdrive_service():
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
     
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            # Make sure you have the credentials.json file from Google Cloud Console
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "credentials.json", SCOPES, redirect_uri='urn:ietf:wg:oauth:2.0:oob'
-            )
-            # Use manual authorization flow
-            auth_url, _ = flow.authorization_url(prompt='consent')
-            
-            print("\n" + "="*70)
-            print("AUTHORIZATION REQUIRED")
-            print("="*70)
-            print("\nPlease visit this URL to authorize this application:")
-            print("\n" + auth_url + "\n")
-            print("After authorization, you will get a code.")
-            code = input("Enter the authorization code here: ").strip()
-            flow.fetch_token(code=code)
-            creds = flow.credentials
+    # If there are no usable credentials available, let the user log in.
+    # Expired credentials with a refresh token are refreshed on the first
+    # Drive request instead (and saved back to token.json), so startup
+    # doesn't wait on a token round trip.
+    if not creds or not (creds.valid or creds.refresh_token):
+        if not interactive:
+            print("✗ Google Drive authorization required - run once without --batch to create token.json")
+            return None
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        # Make sure you have the credentials.json file from Google Cloud Console
+        flow = InstalledAppFlow.from_client_secrets_file(
+            "credentials.json", SCOPES, redirect_uri='urn:ietf:wg:oauth:2.0:oob'
+        )
+        # Use manual authorization flow
+        auth_url, _ = flow.authorization_url(prompt='consent')
+        
+        print("\n" + "="*70)
+        print("AUTHORIZATION REQUIRED")
+        print("="*70)
+        print("\nPlease visit this URL to authorize this application:")
+        print("\n" + auth_url + "\n")
+        print("After authorization, you will get a code.")
+        code = input("Enter the authorization code here: ").strip()
+        flow.fetch_token(code=code)
+        creds = flow.credentials
         
         # Save the credentials for the next run
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+        _save_token(creds)
 
     try:
-        service = build("drive", "v3", credentials=creds)
+        service = DriveClientPool(creds, on_refresh=_save_token)
+        service.get()
         print("Successfully connected to Google Drive API.")
         return service
     except HttpError as error:
@@ -273,64 +973,292 @@ def load_config():
     config.read('config.ini')
     return config
 
-def upload_to_gdrive(service, file_path, folder_id, max_retries=3):
+def load_capture_options(config):
+    """
+    Read the browser capture settings from config.ini.
+    
+    Returns:
+        dict: Keyword arguments for ShopeeAutomation / AsyncShopeeAutomation
+    """
+    wait_budgets = {}
+    if config.has_section('WAIT_BUDGETS'):
+        for step, seconds in config.items('WAIT_BUDGETS'):
+            wait_budgets[step] = float(seconds)
+    capture_profile = CaptureProfile.from_name(
+        config.get('AUTOMATION', 'CAPTURE_PROFILE', fallback='compact'),
+        image_type=config.get('AUTOMATION', 'IMAGE_TYPE', fallback=None) or None,
+        quality=config.getint('AUTOMATION', 'IMAGE_QUALITY', fallback=None),
+        clip=config.getboolean('AUTOMATION', 'CLIP_TO_CHAT', fallback=None),
+        scale=config.get('AUTOMATION', 'CAPTURE_SCALE', fallback=None) or None
+    )
+    return {
+        'unattended': config.getboolean('AUTOMATION', 'UNATTENDED_CAPTURE', fallback=False),
+        'capture_mode': config.get('AUTOMATION', 'CAPTURE_MODE', fallback='visible'),
+        'chat_timeout': config.getint('AUTOMATION', 'CHAT_TIMEOUT', fallback=15),
+        'wait_budgets': wait_budgets,
+        'capture_profile': capture_profile,
+        'in_memory': config.getboolean('AUTOMATION', 'IN_MEMORY_CAPTURE', fallback=True),
+        'headless': config.getboolean('AUTOMATION', 'HEADLESS', fallback=False),
+        'interactive': not config.getboolean('AUTOMATION', 'BATCH_MODE', fallback=False),
+        'user_data_dir': config.get('AUTOMATION', 'BROWSER_DATA_DIR', fallback='browser_data')
+    }
+
+def upload_to_gdrive(service, file_path, folder_id, max_retries=None):
     """
     Uploads a file to Google Drive with retry mechanism and returns the shareable link.
     
     Args:
         service: Google Drive API service object
-        file_path: Path to the file to upload
+        file_path: Path to the file to upload, or an in-memory Screenshot
         folder_id: ID of the Google Drive folder to upload to
-        max_retries: Maximum number of retry attempts (default: 3)
+        max_retries: Maximum number of attempts (default: DRIVE_MAX_RETRIES)
     
     Returns:
         str: Shareable link to the uploaded file, or None if upload fails
     """
-    file_name = os.path.basename(file_path)
+    file = create_gdrive_file(service, file_path, folder_id, max_retries, share=True)
+    return file.get('webViewLink') if file else None
+
+def create_gdrive_file(service, file_path, folder_id, max_retries=None, share=True,
+                       resume_uri=None, on_session=None):
+    """
+    Uploads a file to Google Drive with retry mechanism.
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            file_metadata = {
-                'name': file_name,
-                'parents': [folder_id]
-            }
-            
-            media = MediaFileUpload(file_path, resumable=True)
-            file = service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, webViewLink'
-            ).execute()
-            
+    Requests go through the shared RetryEngine: they are rate limited across
+    all workers, and only rate-limit, 5xx and network errors are retried.
+    Files up to SIMPLE_UPLOAD_LIMIT bytes are sent in one multipart request.
+    Larger files use a chunked resumable upload whose session is kept across
+    retries, so a retry continues from the last acknowledged chunk. When the
+    upload cache is enabled, bytes that are already in the folder are not
+    uploaded again.
+    
+    Args:
+        service: Google Drive API service object
+        file_path: Path to the file to upload, or an in-memory Screenshot
+        folder_id: ID of the Google Drive folder to upload to
+        max_retries: Maximum number of attempts (default: DRIVE_MAX_RETRIES)
+        share: Grant anyone-with-the-link access right away; pass False when
+               the grant is applied later by a PermissionBatcher
+        resume_uri: Session URI of an earlier, interrupted resumable upload of the same file
+        on_session: Optional callback(session_uri) when a resumable session is opened
+    
+    Returns:
+        dict: 'id', 'webViewLink' and 'shared' of the uploaded file ('cached'
+              is True on an upload cache hit), or None if upload fails
+    """
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+    
+    in_memory = isinstance(file_path, Screenshot)
+    file_name = file_path.name if in_memory else os.path.basename(file_path)
+    
+    digest = None
+    if _upload_cache is not None:
+        digest = content_digest(_read_content(file_path))
+        cached = _upload_cache.get(digest, folder_id)
+        if cached:
+            try:
+                if share and not cached['shared']:
+                    _drive_retry.execute(
+                        service.permissions().create(fileId=cached['file_id'], body=ANYONE_READER_PERMISSION),
+                        max_retries=max_retries, description="Share"
+                    )
+                    _upload_cache.mark_shared(cached['gdrive_link'])
+                    cached['shared'] = True
+                # No upload happened, so the call says nothing about Drive's latency
+                skip_latency_sample()
+                print(f"    ⚡ Already on Drive: {file_name} (upload cache)")
+                return {'id': cached['file_id'], 'webViewLink': cached['gdrive_link'],
+                        'shared': cached['shared'], 'cached': True}
+            except (HttpError, OSError) as error:
+                print(f"    ⚠ Cached file not usable ({error}), uploading again")
+    
+    size = len(file_path) if in_memory else os.path.getsize(file_path)
+    resumable = size > SIMPLE_UPLOAD_LIMIT
+    session = {'uri': resume_uri if resumable else None}
+    
+    def upload_once():
+        file_metadata = {
+            'name': file_name,
+            'parents': [folder_id]
+        }
+        
+        chunk_size = RESUMABLE_CHUNK_SIZE if resumable else -1
+        if in_memory:
+            # Straight from the capture buffer, no temporary file
+            media = MediaIoBaseUpload(io.BytesIO(file_path.data), mimetype=file_path.mime_type,
+                                      chunksize=chunk_size, resumable=resumable)
+        else:
+            media = MediaFileUpload(file_path, mimetype=image_mime_type(file_path),
+                                    chunksize=chunk_size, resumable=resumable)
+        request = service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, webViewLink'
+        )
+        if resumable:
+            # A retry continues the same session from the last acknowledged chunk
+            return _upload_resumable(request, session, on_session)
+        return request.execute()
+    
+    try:
+        file = _drive_retry.call(upload_once, max_retries=max_retries, description="Upload")
+        if share:
             # Make the file accessible to anyone with the link
-            permission = {
-                'type': 'anyone',
-                'role': 'reader'
-            }
-            service.permissions().create(
-                fileId=file.get('id'),
-                body=permission
-            ).execute()
-            
-            print(f"    ✓ Uploaded: {file_name}")
-            return file.get('webViewLink')
-            
-        except HttpError as error:
-            if attempt < max_retries:
-                wait_time = 2 ** attempt  # Exponential backoff: 2, 4, 8 seconds
-                print(f"    ⚠ Upload attempt {attempt} failed, retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"    ✗ Upload failed after {max_retries} attempts: {error}")
-                return None
+            _drive_retry.execute(
+                service.permissions().create(fileId=file.get('id'), body=ANYONE_READER_PERMISSION),
+                max_retries=max_retries, description="Share"
+            )
+    except (HttpError, OSError) as error:
+        print(f"    ✗ Upload failed: {error}")
+        return None
     
-    return None
+    file['shared'] = share
+    if digest:
+        _upload_cache.put(digest, folder_id, file['id'], file['webViewLink'], shared=share)
+    
+    print(f"    ✓ Uploaded: {file_name}")
+    return file
+
+def _upload_resumable(request, session, on_session=None):
+    """
+    Send a resumable upload chunk by chunk.
+    
+    Args:
+        request: files().create request with a resumable media body
+        session: Dict whose 'uri' is the session to continue (updated in place)
+        on_session: Optional callback(session_uri) when a new session is opened
+    
+    Returns:
+        dict: The created file's metadata
+    """
+    if session.get('uri'):
+        done, file = _resume_session(request, session['uri'])
+        if done:
+            return file
+        if request.resumable_uri is None:
+            print(f"    ⚠ Upload session expired, starting a new one")
+            session['uri'] = None
+        else:
+            print(f"    ↻ Resuming upload at {request.resumable_progress / 1048576:.1f} MB")
+    
+    response = None
+    while response is None:
+        _, response = request.next_chunk()
+        if request.resumable_uri and request.resumable_uri != session.get('uri'):
+            session['uri'] = request.resumable_uri
+            if on_session:
+                on_session(session['uri'])
+    return response
+
+def _resume_session(request, session_uri):
+    """
+    Ask Drive how much of an interrupted upload it already has.
+    
+    Returns:
+        tuple: (True, file metadata) if the upload had completed, otherwise
+               (False, None) with the request positioned to continue (or with
+               resumable_uri None when the session no longer exists)
+    """
+    size = request.resumable.size()
+    response, content = request.http.request(
+        session_uri, 'PUT', body='', headers={'Content-Range': f'bytes */{size}', 'Content-Length': '0'}
+    )
+    if response.status in (200, 201):
+        return True, json.loads(content)
+    if response.status == 308:
+        request.resumable_uri = session_uri
+        received = response.get('range')
+        request.resumable_progress = int(received.rsplit('-', 1)[1]) + 1 if received else 0
+        return False, None
+    # 404/410: the session expired, upload again from the start
+    request.resumable_uri = None
+    return False, None
+
+async def create_gdrive_file_async(uploader, file_path, folder_id, max_retries=None, share=True,
+                                   resume_uri=None, on_session=None):
+    """
+    create_gdrive_file() for the asyncio uploader: same upload cache, size
+    rules and return value, without blocking the event loop.
+    
+    Args:
+        uploader: AsyncDriveUploader
+        file_path: Path to the file to upload, or an in-memory Screenshot
+        folder_id: ID of the Google Drive folder to upload to
+        max_retries: Maximum number of attempts (default: DRIVE_MAX_RETRIES)
+        share: Grant anyone-with-the-link access right away
+        resume_uri: Session URI of an earlier, interrupted resumable upload of the same file
+        on_session: Optional callback(session_uri) when a resumable session is opened
+    
+    Returns:
+        dict: 'id', 'webViewLink' and 'shared' of the uploaded file ('cached'
+              is True on an upload cache hit), or None if upload fails
+    """
+    import asyncio
+    from googleapiclient.errors import HttpError
+    
+    if isinstance(file_path, Screenshot):
+        file_name, data, mime_type = file_path.name, file_path.data, file_path.mime_type
+    else:
+        file_name, mime_type = os.path.basename(file_path), image_mime_type(file_path)
+        data = await asyncio.to_thread(_read_content, file_path)
+    
+    digest = None
+    if _upload_cache is not None:
+        digest = content_digest(data)
+        cached = _upload_cache.get(digest, folder_id)
+        if cached:
+            try:
+                if share and not cached['shared']:
+                    await uploader.share(cached['file_id'], ANYONE_READER_PERMISSION, max_retries=max_retries)
+                    _upload_cache.mark_shared(cached['gdrive_link'])
+                    cached['shared'] = True
+                # No upload happened, so the call says nothing about Drive's latency
+                skip_latency_sample()
+                print(f"    ⚡ Already on Drive: {file_name} (upload cache)")
+                return {'id': cached['file_id'], 'webViewLink': cached['gdrive_link'],
+                        'shared': cached['shared'], 'cached': True}
+            except (HttpError, OSError) as error:
+                print(f"    ⚠ Cached file not usable ({error}), uploading again")
+    
+    try:
+        file = await uploader.upload(file_name, data, mime_type, folder_id, resume_uri=resume_uri,
+                                     on_session=on_session, max_retries=max_retries)
+        if share:
+            await uploader.share(file['id'], ANYONE_READER_PERMISSION, max_retries=max_retries)
+    except (HttpError, OSError) as error:
+        print(f"    ✗ Upload failed: {error}")
+        return None
+    
+    file['shared'] = share
+    if digest:
+        _upload_cache.put(digest, folder_id, file['id'], file['webViewLink'], shared=share)
+    
+    print(f"    ✓ Uploaded: {file_name}")
+    return file
+
+def create_async_uploader(config, gdrive_service, concurrency):
+    """
+    Return an AsyncDriveUploader when DRIVE_UPLOADER=asyncio, otherwise None.
+    
+    The uploader reuses the pool's shared credentials and RetryEngine and
+    keeps one pooled connection per upload slot.
+    """
+    if config.get('AUTOMATION', 'DRIVE_UPLOADER', fallback='threads') != 'asyncio':
+        return None
+    from drive_async import AsyncDriveUploader
+    return AsyncDriveUploader(gdrive_service.credentials, max_connections=concurrency.maximum,
+                              retry=_drive_retry, simple_upload_limit=SIMPLE_UPLOAD_LIMIT,
+                              chunk_size=RESUMABLE_CHUNK_SIZE)
 
 def create_excel_report(order_data, output_file='shopee_report.xlsx'):
     """
     Creates an Excel report with order numbers and Google Drive links.
     Format follows Shopee CS template with 3 columns: No, OrderSN, Bukti
     If the file exists, it will append new data. Otherwise, create new file.
+    Rows are streamed in write-only mode from the report's row ledger, so the
+    existing workbook is not re-parsed on every run; a report edited by hand
+    is appended to in place instead, keeping its extra columns and formatting.
     
     Args:
         order_data: List of dictionaries with 'order_number' and 'gdrive_link'
@@ -339,237 +1267,619 @@ def create_excel_report(order_data, output_file='shopee_report.xlsx'):
     Returns:
         str: Path to the created Excel file
     """
-    # Check if file already exists
     if os.path.exists(output_file):
         print(f"File '{output_file}' sudah ada, akan menambahkan data baru...")
-        wb = openpyxl.load_workbook(output_file)
-        ws = wb.active
-        
-        # Find the next empty row (skip header row)
-        next_row = ws.max_row + 1
-        
-        # Get current number for sequential numbering
-        current_no = next_row - 1  # Assuming row 1 is header
-        
-        # Add new data
-        for data in order_data:
-            ws[f'A{next_row}'] = current_no  # Sequential number
-            ws[f'B{next_row}'] = data['order_number']
-            ws[f'C{next_row}'] = data['gdrive_link']
-            
-            # Set alignment for new data rows
-            ws[f'A{next_row}'].alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center')
-            ws[f'B{next_row}'].alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center')
-            ws[f'C{next_row}'].alignment = openpyxl.styles.Alignment(wrap_text=True, vertical='top')
-            
-            # Set row height for better visibility
-            ws.row_dimensions[next_row].height = 30
-            
-            next_row += 1
-            current_no += 1
-        
-        print(f"✓ Menambahkan {len(order_data)} data baru ke file existing")
     else:
         print(f"Membuat file Excel baru: {output_file}")
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Sheet1"
-        
-        # Add headers (Row 1) - matching Shopee template
-        ws['A1'] = "No"
-        ws['B1'] = "OrderSN/ Nomor Pesanan"
-        ws['C1'] = "Bukti pembeli sudah menerima pesanan\n- Screenshot yang menunjukkan pembeli sudah mengonfirmasi menerima produk non fisik. Screenshot harus dari Chat di Shopee, screenshot dari platform lain (cth Whatsapp) tidak akan diproses\n- Masukkan foto kedalam google drive dan salin ulang link kedalam kolom dibawah ini\n- Pastikan google drive tidak terkunci sehingga dapat diakses oleh Tim Shopee"
-        
-        # Make headers bold and wrap text
-        for cell in ['A1', 'B1', 'C1']:
-            ws[cell].font = openpyxl.styles.Font(bold=True)
-            ws[cell].alignment = openpyxl.styles.Alignment(wrap_text=True, vertical='top')
-        
-        # Add data starting from row 2
-        for idx, data in enumerate(order_data, start=2):
-            ws[f'A{idx}'] = idx - 1  # Sequential number starting from 1
-            ws[f'B{idx}'] = data['order_number']
-            ws[f'C{idx}'] = data['gdrive_link']
-            
-            # Set alignment for data rows
-            ws[f'A{idx}'].alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center')
-            ws[f'B{idx}'].alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center')
-            ws[f'C{idx}'].alignment = openpyxl.styles.Alignment(wrap_text=True, vertical='top')
-        
-        # Adjust column widths for better visibility
-        ws.column_dimensions['A'].width = 6
-        ws.column_dimensions['B'].width = 25
-        ws.column_dimensions['C'].width = 120
-        
-        # Set row height for header (taller for long instruction text)
-        ws.row_dimensions[1].height = 100
-        
-        # Set row height for data rows
-        for row_num in range(2, len(order_data) + 2):
-            ws.row_dimensions[row_num].height = 30
     
-    wb.save(output_file)
+    writer = ReportWriter(output_file, index=_get_order_index(output_file))
+    total_rows = writer.append(order_data)
+    
+    print(f"✓ Menambahkan {len(order_data)} data baru ({total_rows} total)")
     print(f"✓ Excel report created/updated: {output_file}")
     return output_file
 
-def main():
-    """Main function to run the full automation workflow."""
+def prepare_resume(policy='ask'):
+    """
+    Ask whether to resume from the checkpoint.
+    
+    Args:
+        policy: 'ask', 'resume' or 'fresh' (clear the checkpoint without asking)
+    
+    Returns:
+        set: Order numbers to skip (empty when starting fresh)
+    """
+    checkpoint = load_checkpoint()
+    if checkpoint.get('processed_orders'):
+        print(f"\n📌 Found checkpoint with {len(checkpoint['processed_orders'])} processed orders")
+        if policy == 'ask':
+            resume = input("Resume from checkpoint? (y/n) [default: n]: ").strip().lower()
+        else:
+            resume = 'y' if policy == 'resume' else 'n'
+            print(f"RESUME_POLICY={policy}")
+        if resume == 'y':
+            processed_order_numbers = checkpoint['order_numbers']
+            print(f"✓ Will skip {len(processed_order_numbers)} already processed orders")
+            return processed_order_numbers
+        # Clear checkpoint
+        clear_checkpoint()
+    return set()
+
+def filter_orders(order_numbers, processed_order_numbers, duplicate_policy='ask'):
+    """
+    Drop already processed orders and (after confirmation) orders that are
+    already in the Excel report.
+    
+    Args:
+        order_numbers: Candidate order numbers
+        processed_order_numbers: Set of order numbers from the checkpoint
+        duplicate_policy: 'ask', 'skip' or 'process' orders already in the report
+    
+    Returns:
+        list: Order numbers to process (may be empty)
+    """
+    # Filter out already processed orders
+    if processed_order_numbers:
+        original_count = len(order_numbers)
+        order_numbers = [o for o in order_numbers if o not in processed_order_numbers]
+        skipped = original_count - len(order_numbers)
+        if skipped > 0:
+            print(f"⏭ Skipping {skipped} already processed orders")
+    
+    if not order_numbers:
+        print("All orders already processed!")
+        return []
+    
+    # Check for duplicates in Excel
+    print("\n🔍 Checking for duplicates in existing Excel...")
+    duplicate_set = find_duplicates(order_numbers)
+    duplicates = [o for o in order_numbers if o in duplicate_set]
+    
+    if duplicates:
+        print(f"\n⚠ WARNING: {len(duplicates)} order(s) already in Excel report:")
+        for dup in duplicates[:5]:  # Show first 5
+            print(f"  - {dup}")
+        if len(duplicates) > 5:
+            print(f"  ... and {len(duplicates) - 5} more")
+        
+        if duplicate_policy == 'ask':
+            confirm = input("\nProcess anyway? (y/n) [default: n]: ").strip().lower()
+        else:
+            confirm = 'y' if duplicate_policy == 'process' else 'n'
+            print(f"\nDUPLICATE_POLICY={duplicate_policy}")
+        if confirm != 'y':
+            # Remove duplicates
+            order_numbers = [o for o in order_numbers if o not in duplicate_set]
+            print(f"✓ Removed {len(duplicates)} duplicates, {len(order_numbers)} orders remaining")
+            
+            if not order_numbers:
+                print("No orders to process. Exiting.")
+    
+    return order_numbers
+
+class OrderStreamFilter:
+    """
+    filter_orders() and queue_orders() for orders that arrive one at a time
+    (from iter_orders_to_ship()), so each order can be captured as soon as it
+    is detected. The duplicate question is asked once, at the first order
+    that is already in the Excel report.
+    """
+    
+    def __init__(self, processed_order_numbers, duplicate_policy='ask', summary=None, queue=True):
+        """
+        Args:
+            processed_order_numbers: Set of order numbers from the checkpoint
+            duplicate_policy: 'ask', 'skip' or 'process' orders already in the report
+            summary: RunSummary whose requested/to_process counts are kept up to date
+            queue: Add accepted orders to the job store (False for shard workers)
+        """
+        self.processed = processed_order_numbers or set()
+        self.duplicate_policy = duplicate_policy
+        self.summary = summary or RunSummary()
+        self.queue = queue
+        self.accepted = set()
+    
+    def accept(self, order_number):
+        """
+        Returns:
+            bool: True if the order should be processed (it is then queued)
+        """
+        self.summary.requested += 1
+        if order_number in self.processed:
+            print(f"  ⏭ {order_number} already processed, skipped")
+            return False
+        if find_duplicates([order_number]):
+            if self.duplicate_policy == 'ask':
+                print(f"\n⚠ WARNING: {order_number} already in Excel report")
+                confirm = input("Process orders already in the report anyway? (y/n) [default: n]: ").strip().lower()
+                self.duplicate_policy = 'process' if confirm == 'y' else 'skip'
+                print(f"DUPLICATE_POLICY={self.duplicate_policy} for the rest of this run")
+            if self.duplicate_policy != 'process':
+                print(f"  ⏭ {order_number} already in Excel report, skipped")
+                return False
+        if self.queue and _job_store is not None:
+            _job_store.add([order_number])
+        self.accepted.add(order_number)
+        self.summary.to_process += 1
+        return True
+    
+    def requeued(self):
+        """
+        Returns:
+            list: Orders earlier runs failed or didn't finish (see queue_orders),
+                  counted as requested and to process
+        """
+        if not self.queue or _job_store is None:
+            return []
+        requeued = [o for o in _job_store.requeue() if o not in self.accepted]
+        if requeued:
+            print(f"↻ {len(requeued)} pesanan dari run sebelumnya (gagal/belum selesai) diproses ulang")
+        self.summary.requested += len(requeued)
+        self.summary.to_process += len(requeued)
+        return requeued
+
+def stream_orders(order_numbers, processed_order_numbers, duplicate_policy='ask', summary=None, queue=True):
+    """
+    Filter and queue orders as they arrive, then add the re-queued orders of
+    earlier runs (see OrderStreamFilter).
+    
+    Args:
+        order_numbers: Iterable of candidate order numbers (e.g. iter_orders_to_ship())
+    
+    Yields:
+        str: Order numbers to process
+    """
+    order_filter = OrderStreamFilter(processed_order_numbers, duplicate_policy, summary, queue)
+    for order_number in order_numbers:
+        if order_filter.accept(order_number):
+            yield order_number
+    yield from order_filter.requeued()
+
+async def stream_orders_async(order_numbers, processed_order_numbers, duplicate_policy='ask', summary=None,
+                              queue=True):
+    """stream_orders() for an async iterable; the duplicate question is read in a thread."""
+    import asyncio
+    order_filter = OrderStreamFilter(processed_order_numbers, duplicate_policy, summary, queue)
+    async for order_number in order_numbers:
+        if await asyncio.to_thread(order_filter.accept, order_number):
+            yield order_number
+    for order_number in order_filter.requeued():
+        yield order_number
+
+def peek_orders(order_numbers):
+    """
+    Read the first order of a lazy order source (for a crawler: its first page).
+    
+    Returns:
+        iterator: All orders, the first one included, or None if there are none
+    """
+    order_numbers = iter(order_numbers)
+    first = next(order_numbers, None)
+    return None if first is None else itertools.chain([first], order_numbers)
+
+async def peek_orders_async(order_numbers):
+    """peek_orders() for an async iterator."""
+    try:
+        first = await order_numbers.__anext__()
+    except StopAsyncIteration:
+        return None
+    
+    async def chained():
+        yield first
+        async for order_number in order_numbers:
+            yield order_number
+    return chained()
+
+def print_progress(i, total_orders, start_time, order_number):
+    """
+    Print the per-order progress header with ETA (total_orders is None while
+    orders are still being detected, and no ETA can be given).
+    """
+    if total_orders is None:
+        print(f"\n{'─'*70}")
+        print(f"[{i}/?] | ETA: more orders still loading...")
+        print(f"Order: {order_number}")
+        print(f"{'─'*70}")
+        return
+    progress_pct = (i / total_orders) * 100
+    elapsed = time.time() - start_time
+    if i > 1:
+        avg_time_per_order = elapsed / (i - 1)
+        remaining_orders = total_orders - i
+        eta_seconds = avg_time_per_order * remaining_orders
+        eta_minutes = int(eta_seconds // 60)
+        eta_seconds_remainder = int(eta_seconds % 60)
+        eta_str = f"ETA: {eta_minutes}m {eta_seconds_remainder}s"
+    else:
+        eta_str = "ETA: calculating..."
+    
+    print(f"\n{'─'*70}")
+    print(f"[{i}/{total_orders}] ({progress_pct:.0f}%) | {eta_str}")
+    print(f"Order: {order_number}")
+    print(f"{'─'*70}")
+
+def collect_upload_results(order_numbers, uploaded, order_data, failed_orders):
+    """
+    Merge background upload results into order_data/failed_orders in capture order.
+    
+    Args:
+        order_numbers: Orders in capture order
+        uploaded: Dict of order_number -> gdrive_link (None if the upload failed)
+        order_data: List to append successful orders to
+        failed_orders: List to append failed uploads to
+    """
+    for order_number in order_numbers:
+        if order_number not in uploaded:
+            continue
+        if uploaded[order_number]:
+            order_data.append({
+                'order_number': order_number,
+                'gdrive_link': uploaded[order_number]
+            })
+        else:
+            failed_orders.append({'order': order_number, 'reason': 'Upload failed'})
+
+def create_permission_batcher(config, service):
+    """
+    Returns:
+        PermissionBatcher that checkpoints each shared order, or None when
+        BATCH_PERMISSIONS is disabled (files are then shared one by one)
+    """
+    if not config.getboolean('AUTOMATION', 'BATCH_PERMISSIONS', fallback=True):
+        return None
+    batch_size = config.getint('AUTOMATION', 'PERMISSION_BATCH_SIZE', fallback=DRIVE_BATCH_LIMIT)
+    print(f"ℹ Batched sharing enabled ({min(batch_size, DRIVE_BATCH_LIMIT)} files per request)")
+    def on_granted(order_number, gdrive_link):
+        save_checkpoint(order_number, gdrive_link)
+        if _upload_cache is not None:
+            _upload_cache.mark_shared(gdrive_link)
+    
+    return PermissionBatcher(service, batch_size=batch_size, on_granted=on_granted)
+
+def apply_permission_failures(failures, order_data, failed_orders):
+    """
+    Move orders whose file could not be shared from order_data to failed_orders.
+    
+    Args:
+        failures: Dict of order_number -> error from PermissionBatcher.close()
+        order_data: List of successful orders (modified in place)
+        failed_orders: List of failed orders (appended to)
+    """
+    if not failures:
+        return
+    order_data[:] = [data for data in order_data if data['order_number'] not in failures]
+    for order_number, error in failures.items():
+        failed_orders.append({'order': order_number, 'reason': f'Sharing failed: {error}'})
+
+def report_results(order_data, failed_orders, total_orders, start_time):
+    """
+    Generate the Excel report and print the final summary (step 5).
+    With the job store the report rows and failed orders are queried from it,
+    so orders an earlier run shared but never reported are added as well.
+    
+    Returns:
+        str: Path of the Excel report, or None when no order succeeded
+    """
+    print(f"\n{'='*70}")
+    print("[5/5] 📊 Generating Excel report...")
+    print(f"{'='*70}")
+    
+    record_failures(failed_orders)
+    report_rows = _job_store.unreported() if _job_store is not None else order_data
+    if not report_rows:
+        print("\n⚠ No orders were successfully processed.")
+        return None
+    
+    excel_file = create_excel_report(report_rows, 'shopee_report.xlsx')
+    if _job_store is not None:
+        _job_store.mark_reported([row['order_number'] for row in report_rows])
+        if len(report_rows) > len(order_data):
+            print(f"✓ Termasuk {len(report_rows) - len(order_data)} pesanan dari run sebelumnya yang belum dilaporkan")
+    
+    # Final summary
+    total_time = time.time() - start_time
+    minutes = int(total_time // 60)
+    seconds = int(total_time % 60)
+    
+    print(f"\n{'='*70}")
+    print("✅ AUTOMATION COMPLETED!")
+    print(f"{'='*70}")
+    print(f"\n📊 SUMMARY:")
+    print(f"  ✓ Total processed: {len(order_data)}/{total_orders}")
+    print(f"  ✓ Successful: {len(order_data)}")
+    print(f"  ✗ Failed: {len(failed_orders)}")
+    print(f"  ⏱ Total time: {minutes}m {seconds}s")
+    if _upload_cache is not None:
+        print(f"  ⚡ Upload cache: {_upload_cache.hits} hit(s), {_upload_cache.misses} miss(es)")
+    if _upload_concurrency is not None and _upload_concurrency.decisions:
+        stats = _upload_concurrency.summary()
+        changes = [new for _, old, new, _ in stats['decisions'] if new != old]
+        trail = " → ".join(str(limit) for limit in [stats['decisions'][0][1]] + changes)
+        print(f"  🎚 Upload workers: {trail} (range {stats['minimum']}-{stats['maximum']}, peak {stats['peak']})")
+        for seconds, old, new, reason in stats['decisions'][-5:]:
+            print(f"      {seconds:6.0f}s  {old} → {new}  {reason}")
+    drive_stats = _drive_retry.summary()
+    if drive_stats['retries'] or drive_stats['breaker_opens']:
+        retries = ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in drive_stats['retries'].items())
+        print(f"  🔁 Drive retries: {retries or 'none'} (paused {drive_stats['breaker_opens']}x on 5xx, "
+              f"{drive_stats['throttled']:.0f}s rate limited)")
+    print(f"  📁 Excel report: {excel_file}")
+    
+    if failed_orders:
+        print(f"\n❌ FAILED ORDERS:")
+        for fail in failed_orders:
+            print(f"  - {fail['order']}: {fail['reason']}")
+        
+        # Save failed orders to file (with the job store: every order still failed, from all runs)
+        with open('failed_orders.txt', 'w') as f:
+            f.write(f"Failed orders ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
+            f.write("="*50 + "\n\n")
+            for fail in (_job_store.failed() if _job_store is not None else failed_orders):
+                attempts = f" (stage: {fail['stage']}, {fail['attempts']} attempt(s))" if 'attempts' in fail else ""
+                f.write(f"{fail['order']} - {fail['reason']}{attempts}\n")
+        print(f"\n  📝 Failed orders saved to: failed_orders.txt")
+    
+    print(f"\n📋 NEXT STEPS:")
+    print(f"  1. Open {excel_file}")
+    print(f"  2. Verify all data is correct")
+    print(f"  3. Submit the report to Shopee CS")
+    
+    if failed_orders and _job_store is not None:
+        print(f"  4. Failed orders are retried automatically on the next run (up to {_job_store.max_attempts} attempts)")
+    elif failed_orders:
+        print(f"  4. Retry failed orders from failed_orders.txt")
+    return excel_file
+
+def load_run_policies(config):
+    """
+    Read the answers to the run's prompts from [AUTOMATION] (see RUN_POLICIES).
+    In batch mode (BATCH_MODE / --batch) 'ask' becomes the batch answer, so
+    nothing waits for input.
+    
+    Returns:
+        dict: 'batch' plus 'resume', 'duplicates' and 'invalid_orders' policies
+    
+    Raises:
+        ValueError: If a policy is not one of its choices
+    """
+    batch = config.getboolean('AUTOMATION', 'BATCH_MODE', fallback=False)
+    policies = {'batch': batch}
+    for key, option, choices, batch_answer in RUN_POLICIES:
+        value = config.get('AUTOMATION', option, fallback='ask').strip().lower()
+        if value not in choices:
+            raise ValueError(f"{option} must be one of {', '.join(choices)} (got '{value}')")
+        policies[key] = batch_answer if batch and value == 'ask' else value
+    return policies
+
+def prepare_run(config, summary):
+    """
+    Checks shared by main() and main_async() before anything is started.
+    
+    Args:
+        config: Settings from load_config() with command-line overrides applied
+        summary: RunSummary to record the failure in
+    
+    Returns:
+        dict: Run policies from load_run_policies(), or None when the run
+              can't start (the reason is recorded in summary)
+    """
+    username = config.get('SHOPEE', 'USERNAME', fallback='your_shopee_username')
+    password = config.get('SHOPEE', 'PASSWORD', fallback='your_shopee_password')
+    if username == 'your_shopee_username' or password == 'your_shopee_password':
+        print("\n✗ ERROR: Shopee credentials not configured!")
+        print("Please edit config.ini and add your Shopee username and password.")
+        summary.finish(EXIT_CONFIG, 'config_error', "Shopee credentials not configured in config.ini")
+        return None
+    try:
+        policies = load_run_policies(config)
+    except ValueError as e:
+        print(f"\n✗ ERROR: {e}")
+        summary.finish(EXIT_USAGE, 'config_error', str(e))
+        return None
+    orders_file = config.get('AUTOMATION', 'ORDERS_FILE', fallback='')
+    if orders_file and not os.path.exists(orders_file):
+        print(f"\n✗ ERROR: Orders file '{orders_file}' tidak ditemukan")
+        summary.finish(EXIT_CONFIG, 'config_error', f"Orders file not found: {orders_file}")
+        return None
+    if policies['batch']:
+        print("ℹ Batch mode: no prompts (resume={resume}, duplicates={duplicates}, "
+              "invalid orders={invalid_orders})".format(**policies))
+    return policies
+
+def run_stats():
+    """
+    Returns:
+        dict: Drive retry, upload cache and upload worker statistics of the run
+              (for the JSON summary)
+    """
+    stats = {'drive': _drive_retry.summary()}
+    if _upload_cache is not None:
+        stats['upload_cache'] = {'hits': _upload_cache.hits, 'misses': _upload_cache.misses}
+    if _upload_concurrency is not None:
+        stats['upload_workers'] = _upload_concurrency.summary()
+    if _job_store is not None:
+        stats['jobs'] = _job_store.counts()
+    return stats
+
+def main(config=None, summary=None):
+    """
+    Main function to run the full automation workflow.
+    
+    Args:
+        config: Settings from load_config() with command-line overrides applied (default: config.ini)
+        summary: RunSummary the outcome is recorded in (default: a new one that isn't written)
+    
+    Returns:
+        int: Exit code (see run_summary.py)
+    """
+    from shopee_module import ShopeeAutomation
+    
     print("\n" + "="*70)
     print("🚀 SHOPEE AUTOMATION - ENHANCED VERSION")
     print("="*70)
     
     # Load configuration
-    config = load_config()
+    config = config or load_config()
+    summary = summary or RunSummary()
     folder_id = config.get('GOOGLE_DRIVE', 'FOLDER_ID')
     username = config.get('SHOPEE', 'USERNAME')
     password = config.get('SHOPEE', 'PASSWORD')
     chrome_profile = config.get('SHOPEE', 'CHROME_PROFILE', fallback='Default')
+    capture_options = load_capture_options(config)
     
-    # Check if credentials are configured
-    if username == 'your_shopee_username' or password == 'your_shopee_password':
-        print("\n✗ ERROR: Shopee credentials not configured!")
-        print("Please edit config.ini and add your Shopee username and password.")
-        return
+    # Check that credentials, policies and the orders file are usable
+    policies = prepare_run(config, summary)
+    if policies is None:
+        return summary.exit_code
     
     # Check for resume capability
-    checkpoint = load_checkpoint()
-    if checkpoint.get('processed_orders'):
-        print(f"\n📌 Found checkpoint with {len(checkpoint['processed_orders'])} processed orders")
-        resume = input("Resume from checkpoint? (y/n) [default: n]: ").strip().lower()
-        if resume == 'y':
-            processed_order_numbers = [o['order_number'] for o in checkpoint['processed_orders']]
-            print(f"✓ Will skip {len(processed_order_numbers)} already processed orders")
-        else:
-            processed_order_numbers = []
-            # Clear checkpoint
-            if os.path.exists(CHECKPOINT_FILE):
-                os.remove(CHECKPOINT_FILE)
-    else:
-        processed_order_numbers = []
+    # A shard worker (see shard_runner.py) shares the job store with other workers
+    shard = config.get('AUTOMATION', 'SHARD', fallback='')
+    processed_order_numbers = prepare_resume(policies['resume'])
+    enable_upload_cache(config)
+    enable_job_store(config, release_claims=not shard)
+    configure_drive_retry(config)
+    concurrency = configure_upload_concurrency(config)
     
     # Step 1: Connect to Google Drive
     print("\n[1/5] 📡 Connecting to Google Drive...")
-    gdrive_service = get_gdrive_service()
+    gdrive_service = get_gdrive_service(interactive=not policies['batch'])
     if not gdrive_service:
         print("✗ Could not connect to Google Drive. Aborting.")
-        return
+        return summary.finish(EXIT_DRIVE, 'drive_unavailable', "Could not connect to Google Drive")
     print("✓ Google Drive connected!")
     
     # Step 2: Initialize Shopee automation
     print("\n[2/5] 🌐 Initializing Shopee automation...")
-    shopee = ShopeeAutomation(username, password, headless=False, chrome_profile=chrome_profile)
+    shopee = ShopeeAutomation(username, password, chrome_profile=chrome_profile, **capture_options)
     shopee.start_browser()
+    pipeline = None
+    permissions = create_permission_batcher(config, gdrive_service)
+    archive = None
+    if shopee.in_memory and config.getboolean('AUTOMATION', 'ARCHIVE_SCREENSHOTS', fallback=True):
+        archive = ScreenshotArchive('screenshots')
+    order_data = []
+    failed_orders = []
     
     try:
         # Step 3: Login to Shopee
         print("\n[3/5] 🔐 Logging in to Shopee Seller Centre...")
         if not shopee.login():
             print("✗ Login failed. Aborting.")
-            return
+            return summary.finish(EXIT_LOGIN, 'login_failed', "Shopee login failed or needs a person")
         
-        # Step 4: Get orders (auto-detect or batch input)
+        # Step 4: Get orders (orders file, auto-detect or batch input)
         print("\n[4/5] 📦 Getting orders...")
         
         # Check auto-detect setting
+        orders_file = config.get('AUTOMATION', 'ORDERS_FILE', fallback='')
         auto_detect = config.getboolean('AUTOMATION', 'AUTO_DETECT_ORDERS', fallback=True)
         
-        # First try auto-detect from Shopee page if enabled
-        if auto_detect:
+        # An orders file replaces detection; otherwise try auto-detect from Shopee page if enabled
+        order_numbers = []
+        stream = None
+        if orders_file:
+            print(f"ℹ Using orders from {orders_file}")
+            order_numbers = get_batch_orders(orders_file, policies['invalid_orders'])
+        elif auto_detect:
             print("ℹ Auto-detect enabled (can be disabled in config.ini)")
-            order_numbers = shopee.get_orders_to_ship(auto_detect=True)
+            detection_mode = config.get('AUTOMATION', 'DETECTION_MODE', fallback='network')
+            if detection_mode == 'dom':
+                # The crawler follows the pager in its own tab while orders
+                # from the pages already scanned are captured
+                try:
+                    stream = peek_orders(shopee.iter_orders_to_ship())
+                except Exception as e:
+                    print(f"  ✗ Auto-detection error: {e}")
+                if not stream:
+                    print("⚠ Auto-detection failed or no orders found.")
+            else:
+                order_numbers = shopee.get_orders_to_ship(auto_detect=True, detection_mode=detection_mode)
         else:
             print("ℹ Auto-detect disabled, using manual/batch input")
-            order_numbers = []
-        
-        # If auto-detect returned nothing, use batch input
-        if not order_numbers:
-            order_numbers = get_batch_orders()
-        
-        if not order_numbers:
-            print("No orders to process. Exiting.")
-            return
-        
-        # Filter out already processed orders
-        if processed_order_numbers:
-            original_count = len(order_numbers)
-            order_numbers = [o for o in order_numbers if o not in processed_order_numbers]
-            skipped = original_count - len(order_numbers)
-            if skipped > 0:
-                print(f"⏭ Skipping {skipped} already processed orders")
-        
-        if not order_numbers:
-            print("All orders already processed!")
-            return
-        
-        # Check for duplicates in Excel
-        print("\n🔍 Checking for duplicates in existing Excel...")
-        duplicates = []
-        for order in order_numbers:
-            if check_duplicate_in_excel(order):
-                duplicates.append(order)
-        
-        if duplicates:
-            print(f"\n⚠ WARNING: {len(duplicates)} order(s) already in Excel report:")
-            for dup in duplicates[:5]:  # Show first 5
-                print(f"  - {dup}")
-            if len(duplicates) > 5:
-                print(f"  ... and {len(duplicates) - 5} more")
-            
-            confirm = input("\nProcess anyway? (y/n) [default: n]: ").strip().lower()
-            if confirm != 'y':
-                # Remove duplicates
-                order_numbers = [o for o in order_numbers if o not in duplicates]
-                print(f"✓ Removed {len(duplicates)} duplicates, {len(order_numbers)} orders remaining")
-                
-                if not order_numbers:
-                    print("No orders to process. Exiting.")
-                    return
+        
+        # If auto-detect returned nothing, use batch input (batch mode has nobody to ask)
+        if not stream and not order_numbers and not orders_file and not policies['batch']:
+            order_numbers = get_batch_orders(invalid_policy=policies['invalid_orders'])
+        
+        if stream:
+            # Filtered and queued one order at a time; the total is known after the last page
+            orders = stream_orders(stream, processed_order_numbers, policies['duplicates'], summary,
+                                   queue=not shard)
+            total_orders = None
+        else:
+            summary.requested = len(order_numbers)
+            if order_numbers:
+                order_numbers = filter_orders(order_numbers, processed_order_numbers, policies['duplicates'])
+            # Failed and unfinished orders of earlier runs are picked up again (by the runner when sharded)
+            if not shard:
+                queued = queue_orders(order_numbers)
+                summary.requested += len(queued) - len(order_numbers)
+                order_numbers = queued
+            summary.to_process = len(order_numbers)
+            if not summary.requested:
+                print("No orders to process. Exiting.")
+                return summary.finish(EXIT_OK, 'no_orders', "No orders found")
+            if not order_numbers:
+                return summary.finish(EXIT_OK, 'nothing_to_do', "All orders already processed")
+            orders = order_numbers
+            total_orders = len(order_numbers)
         
         # Process orders with progress tracking
-        order_data = []
-        failed_orders = []
         screenshots_folder = 'screenshots'
-        total_orders = len(order_numbers)
         start_time = time.time()
         
+        # Pipelined mode: upload in the background while the next chat is captured
+        if config.getboolean('AUTOMATION', 'PIPELINE_UPLOADS', fallback=True):
+            upload_queue_size = config.getint('AUTOMATION', 'UPLOAD_QUEUE_SIZE', fallback=5)
+            uploader = create_async_uploader(config, gdrive_service, concurrency)
+            if uploader:
+                pipeline = AsyncUploadPipeline(uploader, folder_id, max_pending=upload_queue_size,
+                                               permissions=permissions, concurrency=concurrency)
+            else:
+                pipeline = UploadPipeline(gdrive_service, folder_id, max_pending=upload_queue_size,
+                                          permissions=permissions, concurrency=concurrency)
+            print(f"ℹ Pipelined uploads enabled (queue size: {upload_queue_size}, "
+                  f"{'asyncio ' if uploader else ''}workers: {concurrency.limit}, up to {concurrency.maximum})")
+        
         print(f"\n{'='*70}")
-        print(f"📸 PROCESSING {total_orders} ORDERS")
+        print(f"📸 PROCESSING {total_orders or 'DETECTED'} ORDERS")
         print(f"{'='*70}\n")
         
-        for i, order_number in enumerate(order_numbers, 1):
-            # Progress indicator
-            progress_pct = (i / total_orders) * 100
-            elapsed = time.time() - start_time
-            if i > 1:
-                avg_time_per_order = elapsed / (i - 1)
-                remaining_orders = total_orders - i
-                eta_seconds = avg_time_per_order * remaining_orders
-                eta_minutes = int(eta_seconds // 60)
-                eta_seconds_remainder = int(eta_seconds % 60)
-                eta_str = f"ETA: {eta_minutes}m {eta_seconds_remainder}s"
-            else:
-                eta_str = "ETA: calculating..."
-            
-            print(f"\n{'─'*70}")
-            print(f"[{i}/{total_orders}] ({progress_pct:.0f}%) | {eta_str}")
-            print(f"Order: {order_number}")
-            print(f"{'─'*70}")
-            
-            # Take screenshot
-            screenshot_path = shopee.take_chat_screenshot(order_number, screenshots_folder)
+        order_numbers = []
+        for i, order_number in enumerate(orders, 1):
+            order_numbers.append(order_number)
+            print_progress(i, total_orders, start_time, order_number)
+            if not claim_job(order_number):
+                continue
             
+            # Take screenshot (or reuse the file of an interrupted upload)
+            screenshot_path = pending_upload_file(order_number, screenshots_folder)
+            if screenshot_path:
+                print(f"  ↻ Resuming interrupted upload of {os.path.basename(screenshot_path)}")
+            else:
+                screenshot_path = shopee.take_chat_screenshot(order_number, screenshots_folder)
+                if screenshot_path and archive:
+                    archive.save(screenshot_path)
             if screenshot_path:
+                track_job(order_number, CAPTURED,
+                          screenshot=screenshot_path if isinstance(screenshot_path, str) else None)
+            
+            if screenshot_path and pipeline:
+                # Hand off to the background uploader and continue capturing
+                pipeline.submit(order_number, screenshot_path)
+                print(f"  📤 Queued for upload ({pipeline.pending} pending)")
+            elif screenshot_path:
                 # Upload to Google Drive with retry
                 print(f"  📤 Uploading to Google Drive...")
-                gdrive_link = upload_to_gdrive(gdrive_service, screenshot_path, folder_id)
+                gdrive_link = upload_and_checkpoint(gdrive_service, order_number, screenshot_path, folder_id,
+                                                    permissions)
                 
                 if gdrive_link:
                     order_data.append({
                         'order_number': order_number,
                         'gdrive_link': gdrive_link
                     })
-                    # Save checkpoint
-                    save_checkpoint(order_number, gdrive_link)
                     print(f"  ✅ Order {order_number} processed successfully!")
                 else:
                     failed_orders.append({'order': order_number, 'reason': 'Upload failed'})
@@ -578,66 +1888,442 @@ def main():
                 failed_orders.append({'order': order_number, 'reason': 'Screenshot failed'})
                 print(f"  ❌ Failed to take screenshot")
         
-        # Step 5: Generate Excel report
-        print(f"\n{'='*70}")
-        print("[5/5] 📊 Generating Excel report...")
-        print(f"{'='*70}")
+        if total_orders is None:
+            total_orders = len(order_numbers)
+            print(f"\n✓ {total_orders} detected order(s) processed")
+            if not order_numbers:
+                return summary.finish(EXIT_OK, 'nothing_to_do', "All orders already processed")
         
-        if order_data:
-            excel_file = create_excel_report(order_data, 'shopee_report.xlsx')
-            
-            # Final summary
-            total_time = time.time() - start_time
-            minutes = int(total_time // 60)
-            seconds = int(total_time % 60)
-            
-            print(f"\n{'='*70}")
-            print("✅ AUTOMATION COMPLETED!")
-            print(f"{'='*70}")
-            print(f"\n📊 SUMMARY:")
-            print(f"  ✓ Total processed: {len(order_data)}/{total_orders}")
-            print(f"  ✓ Successful: {len(order_data)}")
-            print(f"  ✗ Failed: {len(failed_orders)}")
-            print(f"  ⏱ Total time: {minutes}m {seconds}s")
-            print(f"  📁 Excel report: {excel_file}")
-            
-            if failed_orders:
-                print(f"\n❌ FAILED ORDERS:")
-                for fail in failed_orders:
-                    print(f"  - {fail['order']}: {fail['reason']}")
-                
-                # Save failed orders to file
-                with open('failed_orders.txt', 'w') as f:
-                    f.write(f"Failed orders ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
-                    f.write("="*50 + "\n\n")
-                    for fail in failed_orders:
-                        f.write(f"{fail['order']} - {fail['reason']}\n")
-                print(f"\n  📝 Failed orders saved to: failed_orders.txt")
-            
-            print(f"\n📋 NEXT STEPS:")
-            print(f"  1. Open {excel_file}")
-            print(f"  2. Verify all data is correct")
-            print(f"  3. Submit the report to Shopee CS")
-            
-            if failed_orders:
-                print(f"  4. Retry failed orders from failed_orders.txt")
+        if pipeline:
+            print(f"\n⏳ Waiting for background uploads to finish...")
+            collect_upload_results(order_numbers, dict(pipeline.close()), order_data, failed_orders)
+            print(f"✓ Uploads finished: {len(order_data)} succeeded")
+        
+        if permissions:
+            print(f"\n🔗 Sharing uploaded files...")
+            apply_permission_failures(permissions.close(), order_data, failed_orders)
+            print(f"✓ {len(permissions.granted)} file(s) shared in {permissions.batches} batch request(s)")
+        
+        # Step 5: Generate Excel report
+        if shard:
+            # The runner merges all shards into one report
+            record_failures(failed_orders)
         else:
-            print("\n⚠ No orders were successfully processed.")
+            summary.excel_report = report_results(order_data, failed_orders, total_orders, start_time)
+        if failed_orders:
+            return summary.finish(EXIT_ORDERS_FAILED, 'completed_with_failures',
+                                  f"{len(failed_orders)} of {total_orders} order(s) failed")
+        return summary.finish(EXIT_OK, 'completed')
             
     except KeyboardInterrupt:
         print("\n\n⚠ Process interrupted by user.")
         print("💾 Progress has been saved. You can resume later.")
+        summary.finish(EXIT_INTERRUPTED, 'interrupted', "Interrupted by user")
     except Exception as e:
         print(f"\n✗ Error during automation: {e}")
         import traceback
         traceback.print_exc()
+        summary.finish(EXIT_ERROR, 'error', str(e))
     finally:
+        # Let queued uploads finish so their checkpoints are saved
+        if pipeline:
+            pipeline.close()
+        if permissions:
+            permissions.close()
+        summary.record_orders(order_data, failed_orders)
+        if _job_store is not None:
+            _job_store.release()
+        if archive:
+            print(f"✓ {archive.close()} screenshot(s) archived to screenshots/")
+        flush_checkpoint()
+        save_upload_cache()
+        gdrive_service.close()
+        shopee.wait.report()
         # Cleanup
         print("\nClosing browser...")
         shopee.close_browser()
         print("✓ Automation finished.")
+    return summary.exit_code
+
+async def main_async(config=None, summary=None):
+    """
+    Asyncio variant of main(): the browser runs on playwright.async_api and
+    uploads run on a Drive executor, so capture and upload interleave on one
+    event loop. Prompts are read in a thread and don't block pending uploads.
+    
+    Args:
+        config: Settings from load_config() with command-line overrides applied (default: config.ini)
+        summary: RunSummary the outcome is recorded in (default: a new one that isn't written)
+    
+    Returns:
+        int: Exit code (see run_summary.py)
+    """
+    import asyncio
+    from shopee_async import AsyncShopeeAutomation
+    
+    print("\n" + "="*70)
+    print("🚀 SHOPEE AUTOMATION - ENHANCED VERSION (async)")
+    print("="*70)
+    
+    config = config or load_config()
+    summary = summary or RunSummary()
+    folder_id = config.get('GOOGLE_DRIVE', 'FOLDER_ID')
+    username = config.get('SHOPEE', 'USERNAME')
+    password = config.get('SHOPEE', 'PASSWORD')
+    chrome_profile = config.get('SHOPEE', 'CHROME_PROFILE', fallback='Default')
+    capture_options = load_capture_options(config)
+    
+    policies = prepare_run(config, summary)
+    if policies is None:
+        return summary.exit_code
+    
+    # A shard worker (see shard_runner.py) shares the job store with other workers
+    shard = config.get('AUTOMATION', 'SHARD', fallback='')
+    processed_order_numbers = prepare_resume(policies['resume'])
+    enable_upload_cache(config)
+    enable_job_store(config, release_claims=not shard)
+    configure_drive_retry(config)
+    concurrency = configure_upload_concurrency(config)
+    
+    print("\n[1/5] 📡 Connecting to Google Drive...")
+    gdrive_service = await asyncio.to_thread(get_gdrive_service, not policies['batch'])
+    if not gdrive_service:
+        print("✗ Could not connect to Google Drive. Aborting.")
+        return summary.finish(EXIT_DRIVE, 'drive_unavailable', "Could not connect to Google Drive")
+    print("✓ Google Drive connected!")
+    
+    print("\n[2/5] 🌐 Initializing Shopee automation...")
+    shopee = AsyncShopeeAutomation(username, password, chrome_profile=chrome_profile, **capture_options)
+    await shopee.start_browser()
+    archive = None
+    if shopee.in_memory and config.getboolean('AUTOMATION', 'ARCHIVE_SCREENSHOTS', fallback=True):
+        archive = ScreenshotArchive('screenshots')
+    
+    # Each Drive worker thread gets its own client from the pool; with
+    # DRIVE_UPLOADER=asyncio uploads run on this loop instead
+    uploader = create_async_uploader(config, gdrive_service, concurrency)
+    drive_executor = ThreadPoolExecutor(max_workers=concurrency.maximum, thread_name_prefix='gdrive-upload')
+    loop = asyncio.get_running_loop()
+    uploads = {}
+    # Batched grants run on the Drive executor too
+    permissions = create_permission_batcher(config, gdrive_service)
+    order_data = []
+    failed_orders = []
+    
+    try:
+        print("\n[3/5] 🔐 Logging in to Shopee Seller Centre...")
+        if not await shopee.login():
+            print("✗ Login failed. Aborting.")
+            return summary.finish(EXIT_LOGIN, 'login_failed', "Shopee login failed or needs a person")
+        
+        print("\n[4/5] 📦 Getting orders...")
+        order_numbers = []
+        stream = None
+        orders_file = config.get('AUTOMATION', 'ORDERS_FILE', fallback='')
+        if orders_file:
+            print(f"ℹ Using orders from {orders_file}")
+            order_numbers = await asyncio.to_thread(get_batch_orders, orders_file, policies['invalid_orders'])
+        elif config.getboolean('AUTOMATION', 'AUTO_DETECT_ORDERS', fallback=True):
+            detection_mode = config.get('AUTOMATION', 'DETECTION_MODE', fallback='network')
+            if detection_mode == 'dom':
+                # Orders are captured while the crawler's tab follows the pager (see main())
+                try:
+                    stream = await peek_orders_async(shopee.iter_orders_to_ship())
+                except Exception as e:
+                    print(f"  ✗ Auto-detection error: {e}")
+                if not stream:
+                    print("⚠ Auto-detection failed or no orders found.")
+            else:
+                order_numbers = await shopee.get_orders_to_ship(auto_detect=True, detection_mode=detection_mode)
+        if not stream and not order_numbers and not orders_file and not policies['batch']:
+            order_numbers = await asyncio.to_thread(get_batch_orders, None, policies['invalid_orders'])
+        if stream:
+            stream = stream_orders_async(stream, processed_order_numbers, policies['duplicates'], summary,
+                                         queue=not shard)
+            total_orders = None
+        else:
+            summary.requested = len(order_numbers)
+            if order_numbers:
+                order_numbers = await asyncio.to_thread(filter_orders, order_numbers, processed_order_numbers,
+                                                        policies['duplicates'])
+            # Failed and unfinished orders of earlier runs are picked up again (by the runner when sharded)
+            if not shard:
+                queued = queue_orders(order_numbers)
+                summary.requested += len(queued) - len(order_numbers)
+                order_numbers = queued
+            summary.to_process = len(order_numbers)
+            if not summary.requested:
+                print("No orders to process. Exiting.")
+                return summary.finish(EXIT_OK, 'no_orders', "No orders found")
+            if not order_numbers:
+                return summary.finish(EXIT_OK, 'nothing_to_do', "All orders already processed")
+            total_orders = len(order_numbers)
+        
+        start_time = time.time()
+        
+        print(f"\n{'='*70}")
+        print(f"📸 PROCESSING {total_orders or 'DETECTED'} ORDERS")
+        print(f"{'='*70}\n")
+        
+        def start_upload(order_number, screenshot_path, resumed=False):
+            if screenshot_path and archive and not resumed:
+                archive.save(screenshot_path)
+            if screenshot_path:
+                track_job(order_number, CAPTURED,
+                          screenshot=screenshot_path if isinstance(screenshot_path, str) else None)
+            if screenshot_path and uploader:
+                uploads[order_number] = asyncio.ensure_future(concurrency.run_async(
+                    upload_and_checkpoint_async, uploader, order_number, screenshot_path, folder_id, permissions
+                ))
+                print(f"  📤 Upload started in background")
+            elif screenshot_path:
+                uploads[order_number] = loop.run_in_executor(
+                    drive_executor, concurrency.run, upload_and_checkpoint,
+                    gdrive_service, order_number, screenshot_path, folder_id, permissions
+                )
+                print(f"  📤 Upload started in background")
+            else:
+                failed_orders.append({'order': order_number, 'reason': 'Screenshot failed'})
+                print(f"  ❌ Failed to take screenshot")
+        
+        def ready_to_capture(order_number):
+            """Claim an order; interrupted uploads from an earlier run continue from their local file."""
+            if not claim_job(order_number):
+                return False
+            pending_path = pending_upload_file(order_number, 'screenshots')
+            if pending_path:
+                print(f"  ↻ {order_number}: resuming interrupted upload of {os.path.basename(pending_path)}")
+                start_upload(order_number, pending_path, resumed=True)
+                return False
+            return True
+        
+        capture_concurrency = config.getint('AUTOMATION', 'CAPTURE_CONCURRENCY', fallback=1)
+        if stream and capture_concurrency == 1:
+            # Each order is captured as soon as the crawler yields it
+            async for order_number in stream:
+                order_numbers.append(order_number)
+                if ready_to_capture(order_number):
+                    print_progress(len(order_numbers), None, start_time, order_number)
+                    screenshot_path = await shopee.take_chat_screenshot(order_number, 'screenshots')
+                    start_upload(order_number, screenshot_path)
+        else:
+            if stream:
+                # The capture pool deals out a known list of orders
+                order_numbers = [order_number async for order_number in stream]
+            to_capture = [order_number for order_number in order_numbers if ready_to_capture(order_number)]
+            if capture_concurrency > 1:
+                # Several tabs capture at once; uploads start as each capture finishes
+                await shopee.capture_pool(to_capture, 'screenshots', capture_concurrency,
+                                          on_captured=start_upload)
+            else:
+                for i, order_number in enumerate(to_capture, 1):
+                    print_progress(i, len(to_capture), start_time, order_number)
+                    screenshot_path = await shopee.take_chat_screenshot(order_number, 'screenshots')
+                    start_upload(order_number, screenshot_path)
+        
+        if total_orders is None:
+            total_orders = len(order_numbers)
+            print(f"\n✓ {total_orders} detected order(s) processed")
+            if not order_numbers:
+                return summary.finish(EXIT_OK, 'nothing_to_do', "All orders already processed")
+        
+        print(f"\n⏳ Waiting for background uploads to finish...")
+        links = await asyncio.gather(*uploads.values(), return_exceptions=True)
+        uploaded = {
+            order_number: (None if isinstance(link, BaseException) else link)
+            for order_number, link in zip(uploads, links)
+        }
+        collect_upload_results(order_numbers, uploaded, order_data, failed_orders)
+        
+        if permissions:
+            print(f"\n🔗 Sharing uploaded files...")
+            failures = await loop.run_in_executor(drive_executor, permissions.close)
+            apply_permission_failures(failures, order_data, failed_orders)
+            print(f"✓ {len(permissions.granted)} file(s) shared in {permissions.batches} batch request(s)")
+        
+        if shard:
+            # The runner merges all shards into one report
+            record_failures(failed_orders)
+        else:
+            summary.excel_report = report_results(order_data, failed_orders, total_orders, start_time)
+        if failed_orders:
+            return summary.finish(EXIT_ORDERS_FAILED, 'completed_with_failures',
+                                  f"{len(failed_orders)} of {total_orders} order(s) failed")
+        return summary.finish(EXIT_OK, 'completed')
+    
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\n\n⚠ Process interrupted by user.")
+        print("💾 Progress has been saved. You can resume later.")
+        summary.finish(EXIT_INTERRUPTED, 'interrupted', "Interrupted by user")
+    except Exception as e:
+        print(f"\n✗ Error during automation: {e}")
+        import traceback
+        traceback.print_exc()
+        summary.finish(EXIT_ERROR, 'error', str(e))
+    finally:
+        # Let started uploads finish so their checkpoints are saved
+        if uploads:
+            await asyncio.gather(*uploads.values(), return_exceptions=True)
+        if permissions:
+            drive_executor.submit(permissions.close)
+        drive_executor.shutdown(wait=True)
+        if uploader:
+            await uploader.close()
+        summary.record_orders(order_data, failed_orders)
+        if _job_store is not None:
+            _job_store.release()
+        if archive:
+            print(f"✓ {archive.close()} screenshot(s) archived to screenshots/")
+        flush_checkpoint()
+        save_upload_cache()
+        gdrive_service.close()
+        shopee.wait.report()
+        print("\nClosing browser...")
+        await shopee.close_browser()
+        print("✓ Automation finished.")
+    return summary.exit_code
 
+# Command-line options that override a [AUTOMATION] setting: argparse dest -> option
+CLI_OVERRIDES = {
+    'orders': 'ORDERS_FILE',
+    'resume': 'RESUME_POLICY',
+    'duplicates': 'DUPLICATE_POLICY',
+    'invalid_orders': 'INVALID_ORDER_POLICY',
+    'capture_mode': 'CAPTURE_MODE',
+    'capture_profile': 'CAPTURE_PROFILE',
+    'engine': 'ENGINE',
+    'upload_workers': 'UPLOAD_WORKERS',
+    'max_upload_workers': 'MAX_UPLOAD_WORKERS',
+    'capture_concurrency': 'CAPTURE_CONCURRENCY',
+    'workers': 'SHARD_WORKERS',
+    'summary': 'SUMMARY_FILE'
+}
 
-if __name__ == "__main__":
-    main()
+def _positive_int(value):
+    import argparse
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1 (got {value})")
+    return number
 
+def parse_args(argv=None):
+    """
+    Parse the command line. Every option is optional and overrides the
+    matching config.ini setting for this run only.
+    
+    Args:
+        argv: Arguments without the program name (default: sys.argv[1:])
+    
+    Returns:
+        argparse.Namespace
+    """
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Capture Shopee order chats, upload them to Google Drive and update the Excel report.",
+        epilog="Options that are not given are read from config.ini [AUTOMATION]. Exit codes: 0 ok, "
+               "1 error, 2 invalid option, 3 some orders failed, 4 config or orders file missing, "
+               "5 Google Drive unavailable, 6 Shopee login needed, 130 interrupted."
+    )
+    policy_choices = {key: choices for key, _, choices, _ in RUN_POLICIES}
+    parser.add_argument('--batch', action='store_true',
+                        help="run unattended: never prompt, answer 'ask' policies automatically "
+                             "(resume, skip duplicates, keep invalid orders) and write a JSON summary")
+    parser.add_argument('--orders', metavar='FILE',
+                        help="process the order numbers in FILE (one per line) instead of detecting them")
+    parser.add_argument('--resume', choices=policy_choices['resume'],
+                        help="continue from the checkpoint of an interrupted run, or start fresh")
+    parser.add_argument('--duplicates', choices=policy_choices['duplicates'],
+                        help="orders already in the Excel report")
+    parser.add_argument('--invalid-orders', choices=policy_choices['invalid_orders'],
+                        help="order numbers with an unexpected format")
+    parser.add_argument('--detect', choices=('network', 'dom', 'off'),
+                        help="how to detect orders on the Shopee page (off: only --orders or manual input)")
+    parser.add_argument('--capture-mode', choices=('visible', 'full'), help="screenshot area")
+    parser.add_argument('--capture-profile', choices=tuple(CAPTURE_PROFILES), help="screenshot encoding")
+    parser.add_argument('--engine', choices=('sync', 'async'), help="browser engine")
+    parser.add_argument('--upload-workers', type=_positive_int, metavar='N', help="parallel uploads at the start")
+    parser.add_argument('--max-upload-workers', type=_positive_int, metavar='N',
+                        help="upper limit for adaptive parallel uploads")
+    parser.add_argument('--capture-concurrency', type=_positive_int, metavar='N',
+                        help="browser tabs capturing at once (async engine)")
+    parser.add_argument('--workers', type=_positive_int, metavar='N',
+                        help="split the orders over N browser processes, each with a copy of browser_data/")
+    parser.add_argument('--headless', action='store_true', help="run the browser without a window")
+    parser.add_argument('--summary', metavar='FILE',
+                        help="write the JSON run summary to FILE (batch mode default: run_summary.json)")
+    return parser.parse_args(argv)
+
+def apply_cli_overrides(config, args):
+    """
+    Copy the given command-line options into config [AUTOMATION], so the
+    rest of the run reads a single set of settings.
+    
+    Returns:
+        ConfigParser: config (modified in place)
+    """
+    if not config.has_section('AUTOMATION'):
+        config.add_section('AUTOMATION')
+    for dest, option in CLI_OVERRIDES.items():
+        value = getattr(args, dest, None)
+        if value is not None:
+            config.set('AUTOMATION', option, str(value))
+    if args.detect == 'off':
+        config.set('AUTOMATION', 'AUTO_DETECT_ORDERS', 'false')
+    elif args.detect:
+        config.set('AUTOMATION', 'AUTO_DETECT_ORDERS', 'true')
+        config.set('AUTOMATION', 'DETECTION_MODE', args.detect)
+    if args.headless:
+        config.set('AUTOMATION', 'HEADLESS', 'true')
+    if args.batch:
+        config.set('AUTOMATION', 'BATCH_MODE', 'true')
+    if config.getboolean('AUTOMATION', 'BATCH_MODE', fallback=False):
+        # Manual chat navigation is the only alternative, and it needs a person
+        config.set('AUTOMATION', 'UNATTENDED_CAPTURE', 'true')
+    return config
+
+def run_main(config, summary):
+    """
+    Run main() or main_async(), depending on ENGINE.
+    
+    Returns:
+        int: Exit code (see run_summary.py)
+    """
+    if config.get('AUTOMATION', 'ENGINE', fallback='sync') == 'async':
+        import asyncio
+        return asyncio.run(main_async(config, summary))
+    return main(config, summary)
+
+def run(argv=None):
+    """
+    Command-line entry point: run main() or main_async() with the options
+    applied and write the JSON summary.
+    
+    Returns:
+        int: Exit code (see run_summary.py)
+    """
+    config = apply_cli_overrides(load_config(), parse_args(argv))
+    summary_file = config.get('AUTOMATION', 'SUMMARY_FILE', fallback='')
+    if not summary_file and config.getboolean('AUTOMATION', 'BATCH_MODE', fallback=False):
+        summary_file = 'run_summary.json'
+    summary = RunSummary(summary_file or None)
+    try:
+        if config.getint('AUTOMATION', 'SHARD_WORKERS', fallback=1) > 1:
+            from shard_runner import run_sharded
+            run_sharded(config, summary)
+        else:
+            run_main(config, summary)
+    except KeyboardInterrupt:
+        print("\n\n⚠ Process interrupted by user.")
+        summary.finish(EXIT_INTERRUPTED, 'interrupted', "Interrupted by user")
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        summary.finish(EXIT_ERROR, 'error', str(e))
+    summary.finish(EXIT_ERROR, 'error', "Run ended without a result")
+    summary.stats = {**run_stats(), **summary.stats}
+    if summary.write():
+        print(f"📝 Run summary saved to: {summary.path} (exit code {summary.exit_code})")
+    return summary.exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(run())
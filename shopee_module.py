@@ -6,10 +6,328 @@ from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeo
 import time
 import os
 import re
+from contextlib import contextmanager
 from datetime import datetime
+# Capture helpers live in screenshots.py so they can be used without Playwright
+from screenshots import (
+    CAPTURE_PROFILES,
+    IMAGE_EXTENSIONS,
+    IMAGE_MIME_TYPES,
+    CaptureProfile,
+    Screenshot,
+    image_mime_type,
+    write_screenshot
+)
+
+# Shopee order number: YYMMDD + 8-20 alphanumeric characters
+ORDER_NUMBER_PATTERN = r'\b\d{6}[A-Z0-9]{8,20}\b'
+
+LOGIN_URL = 'https://accounts.shopee.co.id/seller/login?next=https%3A%2F%2Fseller.shopee.co.id%2F'
+ORDERS_TO_SHIP_URL = 'https://seller.shopee.co.id/portal/sale/order?type=toship&source=processed&sort_by=confirmed_date_asc'
+
+# Unattended chat navigation: order search -> order detail -> buyer chat
+ORDER_SEARCH_URL = 'https://seller.shopee.co.id/portal/sale/order?type=all&keyword={order_number}'
+ORDER_LINK_SELECTOR = 'a[href*="/portal/sale/order/"]'
+CHAT_BUTTON_SELECTORS = [
+    'button:has-text("Chat dengan Pembeli")',
+    'button:has-text("Chat Pembeli")',
+    'button:has-text("Chat Sekarang")',
+    '[class*="chat-button"]',
+    'a:has-text("Chat")'
+]
+# The buyer conversation is ready once its message list is rendered
+CHAT_READY_SELECTOR = '[class*="message-list"], [class*="messageList"], [class*="chat-message"]'
+# The chat may show up in the current tab or a new one; both are checked this often (ms)
+CHAT_POLL_MS = 500
+
+# Chat panel (message list + composer) that compact captures are clipped to
+CHAT_PANEL_SELECTOR = '[class*="chat-window"], [class*="chatWindow"], [class*="chat-box"], [class*="chatBox"]'
+
+SELLER_URL_PATTERN = re.compile(r'^https://seller\.shopee\.co\.id/')
+
+# True once any order number is rendered on the page
+ORDERS_RENDERED_JS = "(patternSource) => new RegExp(patternSource, 'i').test(document.body.innerText)"
+# True once the page shows an order number that wasn't on the previous page
+NEXT_PAGE_LOADED_JS = """([patternSource, previous]) => {
+    const matches = document.body.innerText.match(new RegExp(patternSource, 'gi')) || [];
+    return matches.some((m) => !previous.includes(m.toUpperCase()));
+}"""
+
+# Per-step wait budgets in seconds (override in config.ini [WAIT_BUDGETS])
+DEFAULT_WAIT_BUDGETS = {
+    'login_page': 15,
+    'verification': 10,
+    'login_complete': 30,
+    'orders_page': 10,
+    'orders_rendered': 10,
+    'order_list_response': 15,
+    'lazy_load': 3,
+    'next_page': 15,
+    'order_detail': 15,
+    'chat_button': 15,
+    'chat_ready': 15
+}
+DEFAULT_STEP_BUDGET = 10
+
+BROWSER_ARGS = [
+    '--start-maximized',
+    '--disable-blink-features=AutomationControlled'
+]
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Enabled "next page" controls, most specific first
+NEXT_PAGE_SELECTORS = [
+    'button.eds-pager__button-next:not([disabled])',
+    'button.shopee-pager__button-next:not([disabled])',
+    'button:has-text("Selanjutnya"):not([disabled])',
+    'button:has-text("Next"):not([disabled])',
+    'a:has-text("Next")'
+]
+
+# Walks the DOM once inside the browser and returns deduplicated order number
+# candidates, with where each one was found (text node or attribute + element)
+ORDER_EXTRACT_JS = """
+(patternSource) => {
+    const pattern = new RegExp(patternSource, 'gi');
+    const found = new Map();
+    const describe = (el) => {
+        if (!el) return '';
+        const cls = typeof el.className === 'string' ? el.className.trim().split(/\\s+/)[0] : '';
+        return el.tagName.toLowerCase() + (cls ? '.' + cls : '');
+    };
+    const add = (value, source, el) => {
+        const order = value.toUpperCase();
+        let entry = found.get(order);
+        if (!entry) {
+            entry = {order: order, count: 0, sources: []};
+            found.set(order, entry);
+        }
+        entry.count += 1;
+        const where = source + ':' + describe(el);
+        if (entry.sources.length < 3 && !entry.sources.includes(where)) {
+            entry.sources.push(where);
+        }
+    };
+    if (!document.body) return [];
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    let node;
+    while ((node = walker.nextNode())) {
+        const text = node.nodeValue;
+        if (!text || text.length < 14) continue;
+        for (const match of text.matchAll(pattern)) add(match[0], 'text', node.parentElement);
+    }
+    const attributes = ['href', 'data-order-id', 'data-order-sn'];
+    for (const el of document.querySelectorAll('a[href], [data-order-id], [data-order-sn]')) {
+        for (const attr of attributes) {
+            const value = el.getAttribute(attr);
+            if (!value) continue;
+            for (const match of value.matchAll(pattern)) add(match[0], attr, el);
+        }
+    }
+    return Array.from(found.values());
+}
+"""
+
+# Order-list XHR endpoints of Seller Centre (list, card list and search index)
+ORDER_LIST_API_PATTERN = re.compile(r'/api/v\d+/order/[^?]*(list|search)', re.IGNORECASE)
+
+ORDER_STATUS_KEYS = ('status', 'order_status', 'status_ext', 'list_type')
+ORDER_DATE_KEYS = ('confirmed_date', 'confirm_time', 'order_confirm_time', 'create_time', 'ctime')
+
+
+def parse_order_list_payload(payload):
+    """
+    Extract orders from an order-list JSON payload.
+    The payload is walked recursively, so the different list/card response
+    shapes are handled the same way: every object with an 'order_sn' is an order.
+    
+    Args:
+        payload: Decoded JSON response
+    
+    Returns:
+        list: Dicts with 'order_number', 'status' and 'confirmed_at' (may be None)
+    """
+    orders = []
+    seen = set()
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        order_sn = node.get('order_sn')
+        if isinstance(order_sn, str) and re.fullmatch(ORDER_NUMBER_PATTERN, order_sn.upper()):
+            order_number = order_sn.upper()
+            if order_number not in seen:
+                seen.add(order_number)
+                status = next((node[k] for k in ORDER_STATUS_KEYS if node.get(k) is not None), None)
+                confirmed_at = next((node[k] for k in ORDER_DATE_KEYS if node.get(k)), None)
+                if isinstance(confirmed_at, (int, float)):
+                    confirmed_at = datetime.fromtimestamp(confirmed_at).isoformat()
+                orders.append({
+                    'order_number': order_number,
+                    'status': status,
+                    'confirmed_at': confirmed_at
+                })
+        stack.extend(reversed(list(node.values())))
+    return orders
+
+
+class OrderListHarvester:
+    """
+    Collects orders from Seller Centre's order-list XHR responses.
+    attach() it to the page before navigating, so the first response is
+    not missed; pagination waits for each page's response itself.
+    """
+    
+    def __init__(self):
+        self.orders = {}
+        self.responses = 0
+        self.page = None
+    
+    def attach(self, page):
+        """Collect every order-list response of page (page.on('response'))."""
+        self.detach()
+        page.on('response', self.handle_response)
+        self.page = page
+    
+    def detach(self):
+        """Stop listening; responses are then only read when passed in explicitly."""
+        if self.page is not None:
+            self.page.remove_listener('response', self.handle_response)
+            self.page = None
+    
+    @staticmethod
+    def matches(response):
+        """True for JSON responses from an order-list endpoint."""
+        if not ORDER_LIST_API_PATTERN.search(response.url):
+            return False
+        content_type = response.headers.get('content-type', '')
+        return 'json' in content_type
+    
+    def handle_response(self, response):
+        """page.on('response') handler."""
+        if not self.matches(response):
+            return
+        try:
+            payload = response.json()
+        except Exception:
+            return
+        self.add_payload(payload)
+    
+    def add_payload(self, payload):
+        """
+        Returns:
+            int: Number of orders in the payload that were not seen before
+        """
+        self.responses += 1
+        added = 0
+        for order in parse_order_list_payload(payload):
+            if order['order_number'] not in self.orders:
+                self.orders[order['order_number']] = order
+                added += 1
+        return added
+    
+    @property
+    def order_numbers(self):
+        return list(self.orders)
+
+
+class WaitBudget:
+    """
+    Named, time-boxed waits for the browser layer.
+    
+    Each wait is a condition (URL pattern, selector, network idle, response
+    matcher or page function) with a timeout budget per step. The time
+    actually spent waiting is recorded per step, so report() shows where
+    latency goes instead of hiding it in fixed sleeps.
+    """
+    
+    def __init__(self, budgets=None):
+        """
+        Args:
+            budgets: Dict of step name -> budget in seconds, overriding DEFAULT_WAIT_BUDGETS
+        """
+        self.budgets = dict(DEFAULT_WAIT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.timings = {}
+    
+    def timeout_ms(self, step):
+        return float(self.budgets.get(step, DEFAULT_STEP_BUDGET)) * 1000
+    
+    def record(self, step, seconds, ok):
+        stats = self.timings.setdefault(step, {'count': 0, 'seconds': 0.0, 'max': 0.0, 'timeouts': 0})
+        stats['count'] += 1
+        stats['seconds'] += seconds
+        stats['max'] = max(stats['max'], seconds)
+        if not ok:
+            stats['timeouts'] += 1
+    
+    @contextmanager
+    def step(self, step):
+        """Time an arbitrary action; yields the step's timeout in milliseconds."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield self.timeout_ms(step)
+            ok = True
+        finally:
+            self.record(step, time.perf_counter() - started, ok)
+    
+    def _wait(self, step, action):
+        """
+        Run a Playwright wait with the step's budget.
+        
+        Returns:
+            The wait's result (True if it returns nothing), or None on timeout
+        """
+        started = time.perf_counter()
+        try:
+            result = action(self.timeout_ms(step))
+        except PlaywrightTimeout:
+            self.record(step, time.perf_counter() - started, False)
+            return None
+        self.record(step, time.perf_counter() - started, True)
+        return True if result is None else result
+    
+    def url(self, page, step, pattern):
+        """Wait until the page URL matches pattern (glob, regex or predicate)."""
+        return self._wait(step, lambda timeout: page.wait_for_url(pattern, timeout=timeout, wait_until='commit'))
+    
+    def selector(self, page, step, selector, state='visible'):
+        """Wait until selector reaches state."""
+        return self._wait(step, lambda timeout: page.wait_for_selector(selector, state=state, timeout=timeout))
+    
+    def network_idle(self, page, step):
+        """Wait until the page has had no network activity for 500 ms."""
+        return self._wait(step, lambda timeout: page.wait_for_load_state('networkidle', timeout=timeout))
+    
+    def response(self, page, step, matcher):
+        """Wait for a response accepted by matcher and return it."""
+        return self._wait(step, lambda timeout: page.wait_for_response(matcher, timeout=timeout))
+    
+    def function(self, page, step, expression, arg=None):
+        """Wait until a JavaScript predicate returns a truthy value."""
+        return self._wait(step, lambda timeout: page.wait_for_function(expression, arg=arg, timeout=timeout))
+    
+    def report(self):
+        """Print time spent waiting per step."""
+        if not self.timings:
+            return
+        print(f"\n⏱ Wait time per step:")
+        for step, stats in sorted(self.timings.items(), key=lambda item: -item[1]['seconds']):
+            timeouts = f", {stats['timeouts']} timeout(s)" if stats['timeouts'] else ""
+            print(f"  {step:20s} {stats['seconds']:7.2f}s total, {stats['max']:6.2f}s max "
+                  f"({stats['count']}x, budget {self.budgets.get(step, DEFAULT_STEP_BUDGET)}s{timeouts})")
+
 
 class ShopeeAutomation:
-    def __init__(self, username, password, headless=False, chrome_profile="Default"):
+    def __init__(self, username, password, headless=False, chrome_profile="Default",
+                 unattended=False, capture_mode='visible', chat_timeout=15, wait_budgets=None,
+                 capture_profile=None, in_memory=False, interactive=True,
+                 user_data_dir='browser_data'):
         """
         Initialize Shopee automation
         
@@ -18,15 +336,36 @@ class ShopeeAutomation:
             password: Shopee seller password
             headless: Run browser in headless mode (True/False)
             chrome_profile: Chrome profile name (e.g., "Default", "Profile 1", "Profile 2")
+            unattended: Open each order's chat automatically instead of prompting
+            capture_mode: 'visible' (viewport) or 'full' (full page) for unattended capture
+            chat_timeout: Seconds to wait for the chat before falling back to manual navigation
+            wait_budgets: Dict of wait step -> budget in seconds (see DEFAULT_WAIT_BUDGETS)
+            capture_profile: CaptureProfile for screenshots (default: lossless PNG)
+            in_memory: Return Screenshot objects instead of writing files to output_folder
+            interactive: Prompt at the console when a step needs the user; when False
+                         (batch mode) such steps fail instead of waiting for an answer
+            user_data_dir: Persistent browser profile that keeps the Shopee login
         """
         self.username = username
         self.password = password
         self.headless = headless
         self.chrome_profile = chrome_profile
+        self.unattended = unattended
+        self.capture_mode = capture_mode
+        self.chat_timeout = chat_timeout
+        chat_budgets = {'order_detail': chat_timeout, 'chat_button': chat_timeout, 'chat_ready': chat_timeout}
+        self.wait = WaitBudget({**chat_budgets, **(wait_budgets or {})})
+        self.capture_profile = capture_profile or CaptureProfile.from_name('lossless')
+        self.in_memory = in_memory
+        self.interactive = interactive
+        self.user_data_dir = user_data_dir
         self.browser = None
         self.context = None
         self.page = None
         self.playwright = None
+        self.last_detection = []
+        self.page_timings = []
+        self.detected_orders = {}
         
     def start_browser(self):
         """Start the browser and create a new page"""
@@ -34,7 +373,7 @@ class ShopeeAutomation:
         self.playwright = sync_playwright().start()
         
         # Use persistent context to save login state
-        user_data_dir = os.path.join(os.getcwd(), 'browser_data')
+        user_data_dir = os.path.abspath(self.user_data_dir)
         os.makedirs(user_data_dir, exist_ok=True)
         
         print(f"Using persistent browser session...")
@@ -43,13 +382,10 @@ class ShopeeAutomation:
         try:
             self.browser = self.playwright.chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
-                headless=False,
-                args=[
-                    '--start-maximized',
-                    '--disable-blink-features=AutomationControlled'
-                ],
+                headless=self.headless,
+                args=BROWSER_ARGS,
                 viewport=None,  # None = responsive, bisa di-resize bebas
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                user_agent=USER_AGENT
             )
             self.page = self.browser.pages[0] if self.browser.pages else self.browser.new_page()
             print("✓ Browser started with saved session")
@@ -60,6 +396,17 @@ class ShopeeAutomation:
             raise
         
         print("✓ Browser ready")
+    
+    def _needs_user(self, reason):
+        """
+        Report a step that needs a person. Returns True in batch mode, where
+        the caller gives up on the step instead of prompting.
+        """
+        if self.interactive:
+            return False
+        print(f"✗ {reason} - tidak bisa dilakukan dalam batch mode")
+        print("  Jalankan sekali tanpa --batch untuk menyelesaikannya di browser.")
+        return True
         
     def login(self):
         """Login to Shopee Seller Centre"""
@@ -70,8 +417,9 @@ class ShopeeAutomation:
         try:
             # Navigate to Shopee Seller Centre login page for Indonesia
             print("Navigating to Shopee Seller Centre...")
-            self.page.goto('https://accounts.shopee.co.id/seller/login?next=https%3A%2F%2Fseller.shopee.co.id%2F', timeout=60000)
-            time.sleep(3)
+            self.page.goto(LOGIN_URL, timeout=60000)
+            # Let the redirect to the dashboard (or verification) settle
+            self.wait.network_idle(self.page, 'login_page')
             
             # Check if traffic verification appears
             if 'verify/traffic' in self.page.url:
@@ -80,8 +428,10 @@ class ShopeeAutomation:
                 print("Shopee meminta verifikasi traffic.")
                 print("Silakan selesaikan verifikasi di browser (puzzle/CAPTCHA).")
                 print("="*70)
+                if self._needs_user("Verifikasi traffic diperlukan"):
+                    return False
                 input("\nTekan Enter setelah verifikasi selesai...")
-                time.sleep(2)
+                self.wait.network_idle(self.page, 'verification')
             
             # Check if already logged in
             current_url = self.page.url
@@ -89,6 +439,8 @@ class ShopeeAutomation:
                 print("✓ Already logged in!")
                 return True
             
+            if self._needs_user("Login manual diperlukan (sesi browser_data/ belum login)"):
+                return False
             print("\n⚠ MANUAL LOGIN REQUIRED")
             print("="*70)
             print("Silakan login secara manual di browser yang terbuka.")
@@ -98,15 +450,15 @@ class ShopeeAutomation:
             print("="*70)
             input("\nTekan Enter setelah Anda berhasil login...")
             
-            # Wait a bit for page to stabilize
-            time.sleep(2)
+            # Wait until the browser is on Seller Centre
+            self.wait.url(self.page, 'login_complete', SELLER_URL_PATTERN)
             
             # Check again for traffic verification after login
             if 'verify/traffic' in self.page.url:
                 print("\n⚠ Verifikasi traffic muncul lagi setelah login.")
                 print("Silakan selesaikan verifikasi di browser.")
                 input("Tekan Enter setelah verifikasi selesai...")
-                time.sleep(2)
+                self.wait.url(self.page, 'verification', SELLER_URL_PATTERN)
             
             # Verify login successful
             current_url = self.page.url
@@ -116,21 +468,27 @@ class ShopeeAutomation:
             else:
                 print(f"⚠ Current URL: {current_url}")
                 print("Login mungkin belum selesai. Pastikan Anda sudah di dashboard.")
+                if self._needs_user("Login belum terverifikasi"):
+                    return False
                 retry = input("Sudah login? (y/n): ").strip().lower()
                 return retry == 'y'
                 
         except Exception as e:
             print(f"✗ Login error: {e}")
+            if self._needs_user("Login gagal"):
+                return False
             print("\n⚠ Silakan login secara manual di browser.")
             input("Tekan Enter setelah login berhasil...")
             return True
     
-    def get_orders_to_ship(self, auto_detect=True):
+    def get_orders_to_ship(self, auto_detect=True, detection_mode='network'):
         """
         Get list of orders with status 'Perlu Dikirim' (Ready to Ship)
         
         Args:
             auto_detect: Try to automatically extract order numbers from page (default: True)
+            detection_mode: 'network' reads the order-list XHR responses,
+                            'dom' scans the rendered page (default: 'network')
         
         Returns:
             list: List of order numbers
@@ -139,12 +497,18 @@ class ShopeeAutomation:
         print("GETTING ORDERS WITH STATUS 'PERLU DIKIRIM'")
         print("="*70)
         
+        harvester = None
         try:
+            # Listen for order-list responses before they are requested
+            if auto_detect and detection_mode == 'network':
+                harvester = OrderListHarvester()
+                harvester.attach(self.page)
+            
             # Navigate to orders page with correct URL
-            url = 'https://seller.shopee.co.id/portal/sale/order?type=toship&source=processed&sort_by=confirmed_date_asc'
             print(f"Navigating to orders page...")
-            self.page.goto(url, timeout=30000, wait_until='domcontentloaded')
-            time.sleep(5)
+            self.page.goto(ORDERS_TO_SHIP_URL, timeout=30000, wait_until='domcontentloaded')
+            if not harvester:
+                self.wait.network_idle(self.page, 'orders_page')
             
             print(f"✓ Berhasil akses halaman pesanan")
             print(f"Current URL: {self.page.url}")
@@ -155,7 +519,13 @@ class ShopeeAutomation:
             if auto_detect:
                 print("\n🔍 Attempting to auto-detect order numbers from page...")
                 print("(This may take a few seconds...)\n")
-                order_numbers = self._auto_detect_orders()
+                if harvester:
+                    order_numbers = self._harvest_orders_from_network(harvester)
+                    self.detected_orders = harvester.orders
+                    if not order_numbers:
+                        print("  ⚠ Network detection found nothing, scanning page instead...")
+                if not order_numbers:
+                    order_numbers = self._auto_detect_orders()
                 
                 if order_numbers:
                     print(f"\n✅ Successfully auto-detected {len(order_numbers)} pesanan:")
@@ -165,9 +535,12 @@ class ShopeeAutomation:
                     if len(order_numbers) > 10:
                         print(f"  ... and {len(order_numbers) - 10} more orders")
                     
-                    # Confirmation
+                    # Confirmation (batch mode uses the detected orders as they are)
                     print("\n" + "="*70)
-                    confirm = input("✓ Use detected orders? (y/n) [default: y]: ").strip().lower() or 'y'
+                    if self.interactive:
+                        confirm = input("✓ Use detected orders? (y/n) [default: y]: ").strip().lower() or 'y'
+                    else:
+                        confirm = 'y'
                     if confirm == 'y':
                         print(f"✓ Using {len(order_numbers)} auto-detected orders")
                         return order_numbers
@@ -179,6 +552,8 @@ class ShopeeAutomation:
                     print("⚠ Switching to manual input mode...\n")
             
             # Manual input fallback
+            if not self.interactive:
+                return []
             print("\n" + "="*70)
             print("INPUT NOMOR PESANAN (MANUAL)")
             print("="*70)
@@ -202,122 +577,194 @@ class ShopeeAutomation:
             
         except Exception as e:
             print(f"✗ Error: {e}")
-            print("\nSilakan input nomor pesanan secara manual:")
             order_numbers = []
+            if not self.interactive:
+                return order_numbers
+            print("\nSilakan input nomor pesanan secara manual:")
             while True:
                 order = input("Nomor pesanan (Enter kosong untuk selesai): ").strip()
                 if not order:
                     break
                 order_numbers.append(order)
             return order_numbers
+        finally:
+            if harvester:
+                harvester.detach()
+    
+    def _extract_order_candidates(self, page=None):
+        """
+        Run ORDER_EXTRACT_JS in the page (one round trip).
+        
+        Args:
+            page: Page to scan (default: self.page)
+        
+        Returns:
+            list: Candidate dicts with 'order', 'count' and 'sources'
+        """
+        return (page or self.page).evaluate(ORDER_EXTRACT_JS, ORDER_NUMBER_PATTERN)
+    
+    def _find_next_button(self, page):
+        """Return the enabled 'next page' button, or None on the last page."""
+        for selector in NEXT_PAGE_SELECTORS:
+            button = page.query_selector(selector)
+            if button and button.is_visible() and button.is_enabled():
+                return button
+        return None
+    
+    def _harvest_orders_from_network(self, harvester, max_pages=None):
+        """
+        Collect orders from the order-list XHR responses, following the pager.
+        The first response is awaited if it has not arrived yet; each next-page
+        click waits for its own response instead of a fixed sleep.
+        
+        Args:
+            harvester: OrderListHarvester attached to self.page before navigation
+            max_pages: Maximum number of pages to visit (default: all)
+        
+        Returns:
+            list: Order numbers in response order
+        """
+        if not harvester.responses:
+            response = self.wait.response(self.page, 'order_list_response', harvester.matches)
+            if not response:
+                print("  ⚠ No order-list response captured")
+                return []
+            harvester.handle_response(response)
+        # Each next page is read from its own awaited response; a listener
+        # still attached would ingest it a second time
+        harvester.detach()
+        print(f"  📡 Page 1: {len(harvester.orders)} orders from network")
+        
+        page_no = 1
+        while not max_pages or page_no < max_pages:
+            button = self._find_next_button(self.page)
+            if not button:
+                break
+            known = len(harvester.orders)
+            try:
+                with self.wait.step('order_list_response') as timeout:
+                    with self.page.expect_response(harvester.matches, timeout=timeout) as response_info:
+                        button.click()
+                harvester.add_payload(response_info.value.json())
+            except PlaywrightTimeout:
+                break
+            added = len(harvester.orders) - known
+            page_no += 1
+            print(f"  📡 Page {page_no}: {added} new orders from network")
+            if not added:
+                break
+        return harvester.order_numbers
+    
+    def _go_to_next_page(self, page, current_orders):
+        """
+        Click the pager's next button and wait until a different set of orders is shown.
+        
+        Returns:
+            bool: True if the next page loaded, False on the last page or timeout
+        """
+        button = self._find_next_button(page)
+        if not button:
+            return False
+        
+        button.click()
+        return bool(self.wait.function(page, 'next_page', NEXT_PAGE_LOADED_JS,
+                                       [ORDER_NUMBER_PATTERN, list(current_orders)]))
+    
+    def iter_orders_to_ship(self, page=None, navigate=True, seen=None, watermark=None, max_pages=None):
+        """
+        Crawl every page of the 'Perlu Dikirim' list, yielding order numbers
+        as each page is scanned so processing can start before the last page loads.
+        
+        Args:
+            page: Page to crawl on (default: a new tab in the same browser context)
+            navigate: Open ORDERS_TO_SHIP_URL first; False scans the page as it is
+            seen: Order numbers to skip (e.g. already processed)
+            watermark: Stop crawling when this order number is reached
+            max_pages: Maximum number of pages to visit (default: all)
+        
+        Yields:
+            str: Order numbers in page order, each at most once
+        """
+        own_page = page is None
+        if own_page:
+            page = self.browser.new_page()
+        skip = set(seen or ())
+        crawled = set()
+        self.last_detection = []
+        self.page_timings = []
+        
+        try:
+            if navigate:
+                page.goto(ORDERS_TO_SHIP_URL, timeout=30000, wait_until='domcontentloaded')
+                self.wait.function(page, 'orders_rendered', ORDERS_RENDERED_JS, ORDER_NUMBER_PATTERN)
+            
+            page_no = 1
+            page_started = time.perf_counter()
+            while True:
+                page_orders = []
+                for candidate in self._extract_order_candidates(page):
+                    page_orders.append(candidate['order'])
+                    if candidate['order'] not in crawled:
+                        self.last_detection.append(candidate)
+                
+                # Scroll to the bottom to trigger lazy loading, then rescan
+                page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+                self.wait.network_idle(page, 'lazy_load')
+                page_orders.extend(c['order'] for c in self._extract_order_candidates(page))
+                
+                new_orders = [o for o in dict.fromkeys(page_orders) if o not in crawled]
+                crawled.update(new_orders)
+                elapsed = time.perf_counter() - page_started
+                self.page_timings.append({'page': page_no, 'orders': len(new_orders), 'seconds': elapsed})
+                print(f"  📄 Page {page_no}: {len(new_orders)} orders ({elapsed:.2f}s)")
+                
+                reached_watermark = False
+                for order in new_orders:
+                    if order == watermark:
+                        reached_watermark = True
+                        break
+                    if order not in skip:
+                        yield order
+                
+                # Stop on the watermark, a page with nothing new, or the page limit
+                if reached_watermark or not new_orders or (max_pages and page_no >= max_pages):
+                    break
+                page_started = time.perf_counter()
+                if not self._go_to_next_page(page, page_orders):
+                    break
+                page_no += 1
+        finally:
+            if own_page:
+                page.close()
     
     def _auto_detect_orders(self):
         """
         Auto-detect order numbers from Shopee 'Perlu Dikirim' page.
-        Uses multiple strategies to find order numbers.
+        Each page is scanned inside the browser by a single page.evaluate call,
+        following the pager until the last page.
         
         Returns:
             list: List of detected order numbers (unique), or empty list if detection fails
         """
         order_numbers = []
+        self.last_detection = []
         
         try:
-            # Wait for dynamic content to load
-            time.sleep(2)
-            
-            print("  Strategy 1: Searching for order elements...")
-            
-            # Strategy 1: CSS Selectors for common Shopee order patterns
-            selectors = [
-                # Try various common selectors
-                'a[href*="/portal/sale/"]',  # Order detail links
-                'div[class*="order"]',       # Order containers
-                'span[class*="order"]',      # Order number spans
-                '[data-order-id]',           # Data attributes
-                'td', 'div', 'span', 'a'     # Fallback to common elements
-            ]
-            
-            for selector in selectors:
-                try:
-                    elements = self.page.query_selector_all(selector)
-                    if not elements:
-                        continue
-                    
-                    for element in elements:
-                        try:
-                            # Try to get text content
-                            text = element.inner_text().strip()
-                            
-                            # Also check href for order numbers
-                            if element.tag_name.lower() == 'a':
-                                href = element.get_attribute('href') or ''
-                                # Extract from URL patterns
-                                url_matches = re.findall(r'\b\d{6}[A-Z0-9]{8,20}\b', href)
-                                for match in url_matches:
-                                    if match not in order_numbers:
-                                        order_numbers.append(match)
-                            
-                            # Validate Shopee order format: 6 digits (YYMMDD) + alphanumeric
-                            if len(text) >= 10 and len(text) <= 30:
-                                # Check if starts with 6 digits
-                                if text[:6].isdigit():
-                                    # Clean text (remove whitespace, special chars)
-                                    cleaned = text.strip().replace(' ', '').replace('\n', '')
-                                    # Final validation
-                                    if re.match(r'^\d{6}[A-Z0-9]+$', cleaned, re.IGNORECASE):
-                                        if cleaned not in order_numbers:
-                                            order_numbers.append(cleaned.upper())
-                        except:
-                            continue
-                    
-                    if order_numbers:
-                        print(f"  ✓ Found {len(order_numbers)} orders using selector: {selector}")
-                        break
-                        
-                except Exception as e:
-                    continue
+            # Wait until the order list is rendered
+            self.wait.function(self.page, 'orders_rendered', ORDERS_RENDERED_JS, ORDER_NUMBER_PATTERN)
             
-            # Strategy 2: Page text analysis with regex
-            if not order_numbers:
-                print("  Strategy 2: Analyzing page text with regex...")
-                try:
-                    page_text = self.page.inner_text('body')
-                    # Pattern: 6 digits + 8-20 alphanumeric characters
-                    pattern = r'\b\d{6}[A-Z0-9]{8,20}\b'
-                    matches = re.findall(pattern, page_text, re.IGNORECASE)
-                    
-                    for match in matches:
-                        cleaned = match.upper()
-                        if cleaned not in order_numbers:
-                            order_numbers.append(cleaned)
-                    
-                    if order_numbers:
-                        print(f"  ✓ Found {len(order_numbers)} orders via text analysis")
-                        
-                except Exception as e:
-                    print(f"  ✗ Text analysis failed: {e}")
+            print("  Scanning pages for order numbers (text + links)...")
+            started = time.perf_counter()
+            for order in self.iter_orders_to_ship(page=self.page, navigate=False):
+                order_numbers.append(order)
+            elapsed = time.perf_counter() - started
             
-            # Strategy 3: Scroll and load more if pagination exists
             if order_numbers:
-                print("  Strategy 3: Checking for pagination...")
-                initial_count = len(order_numbers)
-                
-                try:
-                    # Try to scroll to bottom to trigger lazy loading
-                    self.page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                    time.sleep(2)
-                    
-                    # Check for "next page" or "load more" buttons
-                    next_buttons = self.page.query_selector_all('button:has-text("Next"), button:has-text("Selanjutnya"), a:has-text("Next")')
-                    if next_buttons:
-                        print(f"  ℹ Found pagination controls, but skipping for safety")
-                        print(f"  ℹ Showing orders from first page only")
-                    
-                except Exception as e:
-                    pass
-            
-            # Remove duplicates while preserving order
-            order_numbers = list(dict.fromkeys(order_numbers))
+                print(f"  ✓ Found {len(order_numbers)} orders on {len(self.page_timings)} page(s) in {elapsed:.2f}s")
+                for candidate in self.last_detection[:3]:
+                    print(f"    {candidate['order']} ← {', '.join(candidate['sources'])}")
+            else:
+                print(f"  ✗ No order numbers found ({elapsed:.2f}s)")
             
             # Debug: Save screenshot and HTML if detection returns results
             if order_numbers:
@@ -350,23 +797,130 @@ class ShopeeAutomation:
                 pass
             return []
     
+    def _open_order_chat(self, page, order_number):
+        """
+        Open the buyer chat for an order without user interaction: search the
+        order, open its detail page, click the chat button and wait until the
+        message list is visible. All steps share one CHAT_TIMEOUT deadline, so
+        an order whose chat can't be opened costs at most that long. A chat
+        that opens in a new tab is followed there.
+        
+        Returns:
+            Page showing the chat (a new tab if the chat button opened one)
+        
+        Raises:
+            PlaywrightTimeout: If the chat isn't ready before the deadline
+        """
+        deadline = time.monotonic() + self.chat_timeout
+        
+        def remaining(budget_ms):
+            # A step gets its own budget, capped by what is left of the order's deadline
+            left_ms = int((deadline - time.monotonic()) * 1000)
+            if left_ms <= 0:
+                raise PlaywrightTimeout(f"Chat for {order_number} did not open within {self.chat_timeout}s")
+            return min(budget_ms, left_ms)
+        
+        page.goto(ORDER_SEARCH_URL.format(order_number=order_number), timeout=remaining(30000),
+                  wait_until='domcontentloaded')
+        with self.wait.step('order_detail') as timeout:
+            page.locator(ORDER_LINK_SELECTOR, has_text=order_number).first.click(timeout=remaining(timeout))
+        
+        # Tabs opened by this page's chat button. 'popup' only fires on the opener, so
+        # chats opened by other tabs of the shared context are never picked up here
+        opened = []
+        on_popup = opened.append
+        page.on('popup', on_popup)
+        try:
+            with self.wait.step('chat_button') as timeout:
+                page.locator(', '.join(CHAT_BUTTON_SELECTORS)).first.click(timeout=remaining(timeout))
+            with self.wait.step('chat_ready') as timeout:
+                deadline = min(deadline, time.monotonic() + timeout / 1000)
+                while True:
+                    chat_page = opened[-1] if opened else page
+                    poll_ms = remaining(CHAT_POLL_MS)
+                    try:
+                        chat_page.wait_for_selector(CHAT_READY_SELECTOR, state='visible', timeout=poll_ms)
+                        return chat_page
+                    except PlaywrightTimeout:
+                        continue
+        except BaseException:
+            for tab in opened:
+                tab.close()
+            raise
+        finally:
+            page.remove_listener('popup', on_popup)
+    
+    def _screenshot_name(self, order_number):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{order_number}_{timestamp}{self.capture_profile.extension}"
+    
+    def _capture(self, page, full_page=False):
+        """
+        Take a screenshot with the capture profile.
+        Visible-area captures are clipped to the chat panel when the profile asks
+        for it and the panel is on the page.
+        
+        Returns:
+            bytes: Encoded image
+        """
+        profile = self.capture_profile
+        kwargs = profile.screenshot_kwargs(full_page)
+        panel = page.locator(CHAT_PANEL_SELECTOR).first if profile.clip and not full_page else None
+        if panel is not None and panel.count() and panel.is_visible():
+            kwargs.pop('full_page', None)
+            data = panel.screenshot(**kwargs)
+        else:
+            data = page.screenshot(**kwargs)
+        return profile.encode(data)
+    
+    def _store(self, order_number, data, output_folder):
+        """
+        Returns:
+            Screenshot in in-memory mode, otherwise the path of the written file
+        """
+        name = self._screenshot_name(order_number)
+        if self.in_memory:
+            return Screenshot(order_number, name, data, self.capture_profile.mime_type)
+        return write_screenshot(os.path.join(output_folder, name), data)
+    
     def take_chat_screenshot(self, order_number, output_folder='screenshots'):
         """
-        Navigate to order chat and take screenshot
+        Navigate to order chat and take screenshot.
+        When unattended capture is enabled the chat is opened automatically;
+        the manual prompts are only used if that times out.
         
         Args:
             order_number: Order number to screenshot
-            output_folder: Folder to save screenshots
+            output_folder: Folder to save screenshots (unused in in-memory mode)
             
         Returns:
-            str: Path to screenshot file, or None if failed
+            str: Path to screenshot file (Screenshot in in-memory mode), or None if failed
         """
         try:
             # Create output folder if not exists
-            os.makedirs(output_folder, exist_ok=True)
+            if not self.in_memory:
+                os.makedirs(output_folder, exist_ok=True)
             
             print(f"\nProcessing order: {order_number}")
             
+            if self.unattended:
+                try:
+                    print(f"  → Opening chat automatically...")
+                    chat_page = self._open_order_chat(self.page, order_number)
+                    try:
+                        data = self._capture(chat_page, full_page=(self.capture_mode == 'full'))
+                    finally:
+                        if chat_page is not self.page:
+                            chat_page.close()
+                    screenshot = self._store(order_number, data, output_folder)
+                    print(f"  ✓ Screenshot captured: {os.path.basename(str(screenshot))} ({len(data) / 1024:.0f} KB)")
+                    return screenshot
+                except PlaywrightTimeout:
+                    print(f"  ⚠ Chat did not open within {self.chat_timeout}s, switching to manual navigation")
+            
+            if self._needs_user(f"Chat pesanan {order_number} harus dibuka manual"):
+                return None
+            
             # Ask user to navigate to the chat
             print(f"\n" + "="*50)
             print(f"MANUAL NAVIGATION REQUIRED")
@@ -385,10 +939,6 @@ class ShopeeAutomation:
             input("\nTekan Enter setelah chat terbuka dan siap di-screenshot...")
             
             # Take screenshot
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            screenshot_filename = f"{order_number}_{timestamp}.png"
-            screenshot_path = os.path.join(output_folder, screenshot_filename)
-            
             # Give user option for screenshot type
             print("\nPilih tipe screenshot:")
             print("1. Full page (seluruh halaman)")
@@ -397,15 +947,16 @@ class ShopeeAutomation:
             
             print(f"  → Taking screenshot...")
             if choice == "1":
-                self.page.screenshot(path=screenshot_path, full_page=True)
-                print(f"  ✓ Full page screenshot saved")
+                data = self._capture(self.page, full_page=True)
+                print(f"  ✓ Full page screenshot taken")
             else:
-                self.page.screenshot(path=screenshot_path, full_page=False)
-                print(f"  ✓ Visible area screenshot saved")
+                data = self._capture(self.page, full_page=False)
+                print(f"  ✓ Visible area screenshot taken")
             
-            print(f"  ✓ Screenshot saved: {screenshot_filename}")
+            screenshot = self._store(order_number, data, output_folder)
+            print(f"  ✓ Screenshot captured: {os.path.basename(str(screenshot))} ({len(data) / 1024:.0f} KB)")
             
-            return screenshot_path
+            return screenshot
             
         except Exception as e:
             print(f"  ✗ Error taking screenshot for {order_number}: {e}")
@@ -0,0 +1,261 @@
+"""
+Test script for the asyncio Drive uploader (drive_async.py)
+Runs against a local stand-in for the Drive v3 upload and permissions endpoints
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from google.oauth2.credentials import Credentials
+
+import shopee_automation
+from drive_async import AsyncDriveUploader
+from drive_retry import RetryEngine
+from shopee_automation import ANYONE_READER_PERMISSION, AsyncUploadPipeline, create_gdrive_file_async
+from shopee_module import Screenshot
+
+
+class FakeDrive:
+    """State of the stand-in Drive: files, permissions, sessions and scripted failures."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.permissions = {}
+        self.sessions = {}
+        self.connections = 0
+        self.active = 0
+        self.peak = 0
+        self.fail_next = []  # (status, headers) answered before the next uploads
+        self.valid_tokens = {"test-token"}
+        self.unauthorized = 0
+
+
+class FakeDriveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    drive = None
+
+    def setup(self):
+        super().setup()
+        with self.drive.lock:
+            self.drive.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _new_file(self, metadata, data):
+        file_id = uuid.uuid4().hex[:12]
+        self.drive.files[file_id] = {'name': metadata['name'], 'parents': metadata['parents'], 'data': data}
+        return {'id': file_id, 'webViewLink': f"https://drive.google.com/file/d/{file_id}/view"}
+
+    def _handle(self, method):
+        drive = self.drive
+        body = self._body()
+        token = self.headers.get('Authorization', '').replace('Bearer ', '')
+        if token not in drive.valid_tokens:
+            drive.unauthorized += 1
+            return self._reply(401, {'error': {'code': 401, 'message': 'Invalid Credentials'}})
+        with drive.lock:
+            drive.active += 1
+            drive.peak = max(drive.peak, drive.active)
+            failure = drive.fail_next.pop(0) if drive.fail_next and 'upload' in self.path else None
+        try:
+            time.sleep(0.02)
+            if failure:
+                status, headers = failure
+                reason = 'rateLimitExceeded' if status in (403, 429) else 'backendError'
+                return self._reply(status, {'error': {'code': status, 'errors': [{'reason': reason}]}}, headers)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if method == 'POST' and url.path == '/upload/drive/v3/files':
+                if query['uploadType'] == ['multipart']:
+                    boundary = self.headers['Content-Type'].split('boundary=')[1].encode()
+                    parts = body.split(b'--' + boundary)
+                    metadata = json.loads(parts[1].split(b'\r\n\r\n', 1)[1].rstrip(b'\r\n'))
+                    data = parts[2].split(b'\r\n\r\n', 1)[1][:-2]
+                    return self._reply(200, self._new_file(metadata, data))
+                session_id = uuid.uuid4().hex
+                drive.sessions[session_id] = {'metadata': json.loads(body), 'data': b'',
+                                              'size': int(self.headers['X-Upload-Content-Length'])}
+                location = f"http://{self.headers['Host']}/upload/session/{session_id}"
+                return self._reply(200, headers={'Location': location})
+            if method == 'PUT' and url.path.startswith('/upload/session/'):
+                session = drive.sessions[url.path.rsplit('/', 1)[1]]
+                content_range = self.headers['Content-Range']
+                if not content_range.startswith('bytes */'):
+                    start = int(content_range.split(' ')[1].split('-')[0])
+                    session['data'] = session['data'][:start] + body
+                if len(session['data']) == session['size']:
+                    return self._reply(200, self._new_file(session['metadata'], session['data']))
+                return self._reply(308, headers={'Range': f"bytes=0-{len(session['data']) - 1}"})
+            if method == 'POST' and url.path.endswith('/permissions'):
+                file_id = url.path.split('/')[4]
+                drive.permissions[file_id] = json.loads(body)
+                return self._reply(200, {'id': 'anyoneWithLink'})
+            return self._reply(404, {'error': {'code': 404, 'errors': [{'reason': 'notFound'}]}})
+        finally:
+            with drive.lock:
+                drive.active -= 1
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+
+class RotatingCredentials(Credentials):
+    """Credentials whose token the server has already revoked; refresh issues a new one."""
+
+    def __init__(self, drive):
+        super().__init__(token="revoked-token")
+        self.drive = drive
+        self.refresh_calls = 0
+
+    def refresh(self, request):
+        self.refresh_calls += 1
+        self.token = f"fresh-{self.refresh_calls}"
+        self.drive.valid_tokens.add(self.token)
+
+
+drive = FakeDrive()
+FakeDriveHandler.drive = drive
+server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDriveHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}"
+# Generous quota and short backoff so the test isn't slowed down by the rate limiter
+retry = RetryEngine(requests_per_second=10000, base_delay=0.05, max_delay=0.2)
+
+
+def make_uploader(credentials=None, **kwargs):
+    return AsyncDriveUploader(credentials or Credentials(token="test-token"), base_url=base_url,
+                              retry=retry, **kwargs)
+
+
+def screenshot(i, size=64):
+    return Screenshot(f"ORDER{i:03d}", f"ORDER{i:03d}.jpg", bytes([i % 256]) * size, "image/jpeg")
+
+
+# Test 1: Multipart upload and sharing
+print("="*60)
+print("TEST 1: Multipart upload and link sharing")
+print("="*60)
+
+
+async def single_upload():
+    async with make_uploader() as uploader:
+        return await create_gdrive_file_async(uploader, screenshot(1), "folder123")
+
+file = asyncio.run(single_upload())
+stored = drive.files.get(file['id']) if file else None
+status = "✓" if stored and stored['data'] == screenshot(1).data and stored['parents'] == ["folder123"] else "✗"
+print(f"{status} File stored with its bytes and folder: {stored['name'] if stored else None}")
+status = "✓" if drive.permissions.get(file['id']) == ANYONE_READER_PERMISSION and file['shared'] else "✗"
+print(f"{status} Anyone-with-the-link grant applied")
+
+# Test 2: Many uploads in flight on a small connection pool
+print("\n" + "="*60)
+print("TEST 2: Concurrent uploads over pooled keep-alive connections")
+print("="*60)
+
+
+async def many_uploads(count):
+    async with make_uploader(max_connections=8) as uploader:
+        return await asyncio.gather(*(uploader.upload(s.name, s.data, s.mime_type, "folder123")
+                                      for s in map(screenshot, range(count))))
+
+drive.connections = drive.peak = 0
+started = time.perf_counter()
+files = asyncio.run(many_uploads(40))
+elapsed = time.perf_counter() - started
+status = "✓" if len({f['id'] for f in files}) == 40 else "✗"
+print(f"{status} 40 uploads completed in {elapsed:.2f}s")
+status = "✓" if 1 < drive.peak <= 8 else "✗"
+print(f"{status} Up to {drive.peak} requests in flight at once (pool limit 8)")
+status = "✓" if drive.connections <= 8 else "✗"
+print(f"{status} Connections reused: {drive.connections} opened for 40 requests")
+
+# Test 3: Resumable upload
+print("\n" + "="*60)
+print("TEST 3: Resumable upload in chunks")
+print("="*60)
+
+
+async def large_upload(data, **kwargs):
+    async with make_uploader(simple_upload_limit=256 * 1024, chunk_size=256 * 1024) as uploader:
+        return await uploader.upload("large.png", data, "image/png", "folder123", **kwargs)
+
+large = bytes(range(256)) * 2400
+sessions = []
+file = asyncio.run(large_upload(large, on_session=sessions.append))
+status = "✓" if drive.files[file['id']]['data'] == large and len(sessions) == 1 else "✗"
+print(f"{status} {len(large)} bytes sent in 256 KB chunks on one session")
+
+session_id = uuid.uuid4().hex
+drive.sessions[session_id] = {'metadata': {'name': 'large.png', 'parents': ['folder123']},
+                              'data': large[:262144], 'size': len(large)}
+file = asyncio.run(large_upload(large, resume_uri=f"{base_url}/upload/session/{session_id}"))
+status = "✓" if drive.files[file['id']]['data'] == large else "✗"
+print(f"{status} Interrupted session resumed from byte 262144")
+
+# Test 4: Retries and token refresh
+print("\n" + "="*60)
+print("TEST 4: Rate-limit retries and token refresh")
+print("="*60)
+
+drive.fail_next = [(429, {'Retry-After': '0'}), (503, {})]
+file = asyncio.run(single_upload())
+status = "✓" if file and not drive.fail_next and retry.retries['rate_limited'] == 1 else "✗"
+print(f"{status} 429 and 503 retried: {dict(retry.retries)}")
+
+credentials = RotatingCredentials(drive)
+
+
+async def upload_with_revoked_token():
+    async with make_uploader(credentials) as uploader:
+        return await uploader.upload("token.jpg", b"data", "image/jpeg", "folder123")
+
+file = asyncio.run(upload_with_revoked_token())
+status = "✓" if file and credentials.refresh_calls == 1 and drive.unauthorized == 1 else "✗"
+print(f"{status} 401 refreshed the token once and repeated the request")
+
+# Test 5: Pipeline used by main()
+print("\n" + "="*60)
+print("TEST 5: AsyncUploadPipeline with checkpoints")
+print("="*60)
+
+checkpointed = []
+saved_checkpoint = shopee_automation.save_checkpoint
+shopee_automation.save_checkpoint = lambda order, link: checkpointed.append(order)
+try:
+    pipeline = AsyncUploadPipeline(make_uploader(max_connections=6), "folder123", max_pending=4)
+    for i in range(20):
+        pipeline.submit(f"ORDER{i:03d}", screenshot(100 + i))
+    results = pipeline.close()
+finally:
+    shopee_automation.save_checkpoint = saved_checkpoint
+status = "✓" if len(results) == 20 and all(link for _, link in results) and len(checkpointed) == 20 else "✗"
+print(f"{status} 20 screenshots uploaded, shared and checkpointed from a sync caller")
+
+server.shutdown()
+
+print("\n" + "="*60)
+print("✅ ASYNC DRIVE UPLOADER TESTS COMPLETED")
+print("="*60)
@@ -0,0 +1,397 @@
+"""
+Test script for network-based order detection (XHR order-list responses)
+Uses the sample payloads and stand-in page in fixtures/
+"""
+import asyncio
+import builtins
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from shopee_module import (ORDERS_RENDERED_JS, OrderListHarvester, PlaywrightTimeout, ShopeeAutomation,
+                           parse_order_list_payload)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+EXPECTED_ORDERS = ["2504226A23B55PX", "2504226A34BUBPFX", "2504226A45CVCPGX", "2504226A56DWDPIX",
+                   "2504226A67EXEPJX"]
+FIXTURE_PAGES = 3
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Serves the stand-in page and maps the order-list API to the fixtures."""
+
+    def do_GET(self):
+        if self.path.startswith('/api/v3/order/get_order_list_card_list'):
+            page = int(re.search(r'page_number=(\d+)', self.path).group(1))
+            body = json.dumps(load_fixture(f'order_list_page{page}.json')).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeResponse:
+    """Order-list response carrying a fixture page, shaped like a Playwright Response."""
+
+    def __init__(self, page_no):
+        self.url = f"https://seller.shopee.co.id/api/v3/order/get_order_list_card_list?page_number={page_no}"
+        self.headers = {'content-type': 'application/json'}
+        self.payload = load_fixture(f'order_list_page{page_no}.json')
+
+    def json(self):
+        return self.payload
+
+
+class FakePager:
+    def __init__(self, page):
+        self.page = page
+
+    def is_visible(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.page.load(self.page.page_no + 1)
+
+
+class ResponseInfo:
+    value = None
+
+
+class FakeOrderListPage:
+    """
+    Delivers each fixture page's response the way Playwright does: to every
+    'response' listener and to a pending expect_response().
+    """
+
+    def __init__(self, pages=FIXTURE_PAGES):
+        self.pages = pages
+        self.page_no = 0
+        self.listeners = []
+        self.expected = []
+        self.url = ''
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    def goto(self, url, **kwargs):
+        self.url = url
+        self.load(1)
+
+    def load(self, page_no):
+        self.page_no = page_no
+        response = FakeResponse(page_no)
+        for handler in list(self.listeners):
+            handler(response)
+        for matcher, info in self.expected:
+            if matcher(response):
+                info.value = response
+
+    @contextmanager
+    def expect_response(self, matcher, timeout=None):
+        info = ResponseInfo()
+        self.expected.append((matcher, info))
+        try:
+            yield info
+        finally:
+            self.expected.remove((matcher, info))
+        if info.value is None:
+            raise PlaywrightTimeout("No order-list response")
+
+    def query_selector(self, selector):
+        return FakePager(self) if self.page_no < self.pages else None
+
+
+class AsyncFakeResponse(FakeResponse):
+    async def json(self):
+        return self.payload
+
+
+class AsyncFakePager(FakePager):
+    async def is_visible(self):
+        return True
+
+    async def is_enabled(self):
+        return True
+
+    async def click(self):
+        await self.page.load(self.page.page_no + 1)
+
+
+class AsyncFakeOrderListPage(FakeOrderListPage):
+    """FakeOrderListPage for playwright.async_api (awaited handlers and waits)."""
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        await self.load(1)
+
+    async def load(self, page_no):
+        self.page_no = page_no
+        response = AsyncFakeResponse(page_no)
+        for handler in list(self.listeners):
+            await handler(response)
+        for matcher, info in self.expected:
+            if matcher(response):
+                info.value.set_result(response)
+
+    @asynccontextmanager
+    async def expect_response(self, matcher, timeout=None):
+        info = ResponseInfo()
+        info.value = asyncio.get_running_loop().create_future()
+        self.expected.append((matcher, info))
+        try:
+            yield info
+        finally:
+            self.expected.remove((matcher, info))
+        if not info.value.done():
+            raise PlaywrightTimeout("No order-list response")
+
+    async def query_selector(self, selector):
+        return AsyncFakePager(self) if self.page_no < self.pages else None
+
+
+class FakeOrderListDom:
+    """
+    Rendered 'Perlu Dikirim' list: evaluate() scans the page shown, the pager
+    loads the next one, and every wait succeeds at once. Orders in lazy[page_no]
+    only render after scrolling to the bottom. Steps are logged.
+    """
+
+    def __init__(self, pages, lazy=None):
+        self.pages = pages
+        self.lazy = lazy or {}
+        self.page_no = 0
+        self.scrolled = False
+        self.log = []
+        self.url = ''
+
+    def goto(self, url, **kwargs):
+        self.url = url
+        self.load(1)
+
+    def load(self, page_no):
+        self.page_no = page_no
+        self.scrolled = False
+        self.log.append(f"page {page_no}")
+
+    def wait_for_function(self, expression, arg=None, timeout=None):
+        if expression == ORDERS_RENDERED_JS:
+            self.log.append("rendered")
+        return True
+
+    def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    def evaluate(self, expression, arg=None):
+        if expression.startswith('window.scrollTo'):
+            self.scrolled = True
+            return None
+        orders = self.pages[self.page_no - 1] + (self.lazy.get(self.page_no, []) if self.scrolled else [])
+        return [{'order': o, 'count': 1, 'sources': ['text']} for o in orders]
+
+    def query_selector(self, selector):
+        return FakePager(self) if self.page_no < len(self.pages) else None
+
+
+class AsyncFakeOrderListDom(FakeOrderListDom):
+    async def goto(self, url, **kwargs):
+        self.url = url
+        await self.load(1)
+
+    async def load(self, page_no):
+        FakeOrderListDom.load(self, page_no)
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        return super().wait_for_function(expression, arg, timeout)
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def evaluate(self, expression, arg=None):
+        return super().evaluate(expression, arg)
+
+    async def query_selector(self, selector):
+        return AsyncFakePager(self) if self.page_no < len(self.pages) else None
+
+
+# Test 1: Payload parsing
+print("="*60)
+print("TEST 1: Order-list payload parsing")
+print("="*60)
+
+orders = parse_order_list_payload(load_fixture('order_list_page1.json'))
+numbers = [o['order_number'] for o in orders]
+status = "✓" if numbers == EXPECTED_ORDERS[:2] else "✗"
+print(f"{status} Orders from page 1: {numbers}")
+status = "✓" if all(o['status'] == 2 and o['confirmed_at'] for o in orders) else "✗"
+print(f"{status} Status and confirmed date: {orders[0]['status']}, {orders[0]['confirmed_at']}")
+status = "✓" if not any('SKU' in n for n in numbers) else "✗"
+print(f"{status} Item SKUs are not mistaken for order numbers")
+
+harvester = OrderListHarvester()
+harvester.add_payload(load_fixture('order_list_page1.json'))
+added = harvester.add_payload(load_fixture('order_list_page1.json'))
+for page_no in range(2, FIXTURE_PAGES + 1):
+    harvester.add_payload(load_fixture(f'order_list_page{page_no}.json'))
+status = "✓" if added == 0 and harvester.order_numbers == EXPECTED_ORDERS else "✗"
+print(f"{status} Harvester deduplicates repeated responses: {harvester.order_numbers}")
+
+# Test 2: Pagination through the response handlers
+print("\n" + "="*60)
+print("TEST 2: Network harvesting across 3 pages (listener + awaited responses)")
+print("="*60)
+
+page = FakeOrderListPage()
+shopee = ShopeeAutomation('', '', interactive=False, wait_budgets={'order_list_response': 1})
+shopee.page = page
+detected = shopee.get_orders_to_ship(detection_mode='network')
+status = "✓" if detected == EXPECTED_ORDERS and page.page_no == FIXTURE_PAGES else "✗"
+print(f"{status} All {page.page_no} pages followed: {len(detected)} orders")
+status = "✓" if not page.listeners else "✗"
+print(f"{status} Response listener removed after detection")
+
+async def harvest_async():
+    from shopee_async import AsyncShopeeAutomation
+    shopee = AsyncShopeeAutomation('', '', interactive=False, wait_budgets={'order_list_response': 1})
+    shopee.page = AsyncFakeOrderListPage()
+    return await shopee.get_orders_to_ship(detection_mode='network'), shopee.page
+
+detected, page = asyncio.run(harvest_async())
+status = "✓" if detected == EXPECTED_ORDERS and page.page_no == FIXTURE_PAGES and not page.listeners else "✗"
+print(f"{status} Async engine follows all {page.page_no} pages: {len(detected)} orders")
+
+# Test 3: DOM crawler consumed one order at a time
+print("\n" + "="*60)
+print("TEST 3: DOM crawler streams orders into the capture loop")
+print("="*60)
+
+from shopee_automation import create_excel_report, peek_orders, peek_orders_async, stream_orders, stream_orders_async
+from run_summary import RunSummary
+
+DOM_PAGES = [EXPECTED_ORDERS[:2], EXPECTED_ORDERS[2:4], EXPECTED_ORDERS[4:]]
+stream_folder = tempfile.mkdtemp()
+previous_dir = os.getcwd()
+saved_input = builtins.input
+os.chdir(stream_folder)
+try:
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_excel_report([{'order_number': o, 'gdrive_link': f"https://drive.google.com/{o}"}
+                             for o in EXPECTED_ORDERS[2:4]])
+    prompts = []
+    builtins.input = lambda prompt='': prompts.append(prompt) or 'n'
+    
+    page = FakeOrderListDom(DOM_PAGES)
+    shopee = ShopeeAutomation('', '', interactive=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawl = peek_orders(shopee.iter_orders_to_ship(page=page))
+        peeked_at = page.page_no
+        summary = RunSummary()
+        captured = [(order, page.page_no) for order in
+                    stream_orders(crawl, {EXPECTED_ORDERS[1]}, 'ask', summary)]
+    status = "✓" if page.log[:2] == ["page 1", "rendered"] else "✗"
+    print(f"{status} Crawler waits for the rendered list after navigating: {page.log[:2]}")
+    status = "✓" if peeked_at == 1 and captured == [(EXPECTED_ORDERS[0], 1), (EXPECTED_ORDERS[4], 3)] else "✗"
+    print(f"{status} Each order reaches the loop while its own page is shown: {captured}")
+    status = "✓" if len(prompts) == 1 and (summary.requested, summary.to_process) == (5, 2) else "✗"
+    print(f"{status} Processed and reported orders skipped, duplicate question asked {len(prompts)}x")
+    
+    async def stream_async():
+        from shopee_async import AsyncShopeeAutomation
+        shopee = AsyncShopeeAutomation('', '', interactive=False)
+        page = AsyncFakeOrderListDom(DOM_PAGES)
+        crawl = await peek_orders_async(shopee.iter_orders_to_ship(page=page))
+        peeked_at = page.page_no
+        captured = [(order, page.page_no) async for order in
+                    stream_orders_async(crawl, set(), 'process', RunSummary())]
+        return page, peeked_at, captured
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        page, peeked_at, captured = asyncio.run(stream_async())
+    expected = [(order, page_no) for page_no, orders in enumerate(DOM_PAGES, 1) for order in orders]
+    status = "✓" if page.log[:2] == ["page 1", "rendered"] and peeked_at == 1 and captured == expected else "✗"
+    print(f"{status} Async crawler streams {len(captured)} orders page by page")
+    
+    # Lazily rendered orders and the watermark: both engines detect the same orders
+    LAZY_PAGES = [[EXPECTED_ORDERS[0]], [EXPECTED_ORDERS[2]], [EXPECTED_ORDERS[4]]]
+    LAZY = {1: [EXPECTED_ORDERS[1]], 2: [EXPECTED_ORDERS[3]]}
+    shopee = ShopeeAutomation('', '', interactive=False)
+    shopee.last_detection = [{'order': 'STALE'}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_orders = list(shopee.iter_orders_to_ship(page=FakeOrderListDom(LAZY_PAGES, LAZY),
+                                                      watermark=EXPECTED_ORDERS[3]))
+    sync_detection = [c['order'] for c in shopee.last_detection]
+    sync_pages = len(shopee.page_timings)
+    
+    async def crawl_lazy_async():
+        from shopee_async import AsyncShopeeAutomation
+        shopee = AsyncShopeeAutomation('', '', interactive=False)
+        shopee.last_detection = [{'order': 'STALE'}]
+        orders = [o async for o in shopee.iter_orders_to_ship(page=AsyncFakeOrderListDom(LAZY_PAGES, LAZY),
+                                                               watermark=EXPECTED_ORDERS[3])]
+        return orders, [c['order'] for c in shopee.last_detection], len(shopee.page_timings)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        async_orders, async_detection, async_pages = asyncio.run(crawl_lazy_async())
+    status = "✓" if sync_orders == async_orders == EXPECTED_ORDERS[:3] and sync_pages == async_pages == 2 else "✗"
+    print(f"{status} Both engines rescan lazy orders and stop at the watermark: {async_orders}")
+    status = "✓" if 'STALE' not in sync_detection and sync_detection == async_detection else "✗"
+    print(f"{status} Detection details start fresh on each crawl: {async_detection}")
+finally:
+    builtins.input = saved_input
+    os.chdir(previous_dir)
+    shutil.rmtree(stream_folder)
+
+# Test 4: Stand-in page in a real browser
+print("\n" + "="*60)
+print("TEST 4: Network harvesting against local stand-in page")
+print("="*60)
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), partial(StandInHandler, directory=FIXTURES))
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_address[1]}/order_list_standin.html"
+
+try:
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        shopee = ShopeeAutomation('', '', headless=True, wait_budgets={'order_list_response': 5})
+        shopee.page = browser.new_page()
+        harvester = OrderListHarvester()
+        harvester.attach(shopee.page)
+        shopee.page.goto(url, wait_until='domcontentloaded')
+        detected = shopee._harvest_orders_from_network(harvester)
+        status = "✓" if detected == EXPECTED_ORDERS else "✗"
+        print(f"{status} Orders harvested across pages: {detected}")
+        browser.close()
+except Exception as e:
+    print(f"⚠ Browser test skipped: {e}".splitlines()[0])
+finally:
+    server.shutdown()
+
+print("\n" + "="*60)
+print("✅ ORDER HARVEST TESTS COMPLETED")
+print("="*60)
@@ -11,8 +11,12 @@ try:
         save_checkpoint,
         load_checkpoint,
         check_duplicate_in_excel,
+        find_duplicates,
+        create_excel_report,
         CHECKPOINT_FILE
     )
+    from checkpoint_store import CheckpointJournal
+    from excel_report import OrderIndex
     print("✓ All imports successful")
 except ImportError as e:
     print(f"✗ Import error: {e}")
@@ -68,6 +72,66 @@ try:
 except Exception as e:
     print(f"✗ Checkpoint load failed: {e}")
 
+# Test 2b: Journal robustness
+print("\n" + "="*60)
+print("TEST 2b: Checkpoint Journal (torn tail, legacy, compaction)")
+print("="*60)
+
+journal_path = "test_journal.jsonl"
+legacy_path = "test_journal_legacy.json"
+for path in (journal_path, legacy_path):
+    if os.path.exists(path):
+        os.remove(path)
+
+journal = CheckpointJournal(journal_path, legacy_path=legacy_path)
+journal.append("2504226A23B55PX", "https://drive.google.com/test1")
+# Simulate a crash in the middle of writing the second record
+with open(journal_path, "a") as f:
+    f.write('{"order_number": "2504226A34BU')
+checkpoint = CheckpointJournal(journal_path).load()
+status = "✓" if checkpoint['order_numbers'] == {"2504226A23B55PX"} else "✗"
+print(f"{status} Torn tail ignored: {sorted(checkpoint['order_numbers'])}")
+
+journal = CheckpointJournal(journal_path)
+journal.append("2504226A34BUBPFX", "https://drive.google.com/test2")
+checkpoint = journal.load()
+status = "✓" if len(checkpoint['processed_orders']) == 2 else "✗"
+print(f"{status} Append after torn tail: {len(checkpoint['processed_orders'])} orders (expected: 2)")
+
+journal = CheckpointJournal(journal_path, compact_min_lines=4)
+for i in range(5):
+    journal.append("2504226A23B55PX", f"https://drive.google.com/retry{i}")
+with open(journal_path) as f:
+    line_count = sum(1 for _ in f)
+status = "✓" if line_count <= 4 else "✗"
+print(f"{status} Compaction: {line_count} lines for 2 orders")
+status = "✓" if journal.load()['processed_orders'][-1]['gdrive_link'].endswith("retry4") else "✗"
+print(f"{status} Latest link wins after compaction")
+
+# A later session-only record (upload retried) keeps the order's link
+journal.append("2504226A34BUBPFX", None, upload_session="https://www.googleapis.com/upload/session1")
+checkpoint = CheckpointJournal(journal_path).load()
+record = next(r for r in checkpoint['processed_orders'] if r['order_number'] == "2504226A34BUBPFX")
+status = "✓" if record['gdrive_link'].endswith("test2") and not checkpoint['upload_sessions'] else "✗"
+print(f"{status} Link-less record merged into the processed one: {record['gdrive_link']}")
+journal = CheckpointJournal(journal_path)
+journal.append("2504226A34BUBPFX", "https://drive.google.com/test3")
+journal.compact()
+record = next(r for r in journal.load()['processed_orders'] if r['order_number'] == "2504226A34BUBPFX")
+status = "✓" if record['gdrive_link'].endswith("test3") and 'upload_session' not in record else "✗"
+print(f"{status} Finished upload replaces the link and drops the session")
+os.remove(journal_path)
+
+import json
+with open(legacy_path, "w") as f:
+    json.dump({'processed_orders': [{'order_number': "2504226A23B55PX",
+                                     'gdrive_link': "https://drive.google.com/old"}],
+               'timestamp': None}, f, indent=2)
+checkpoint = CheckpointJournal(journal_path, legacy_path=legacy_path).load()
+status = "✓" if "2504226A23B55PX" in checkpoint['order_numbers'] and not os.path.exists(legacy_path) else "✗"
+print(f"{status} Legacy processed_orders.json migrated")
+os.remove(journal_path)
+
 # Test 3: Duplicate detection
 print("\n" + "="*60)
 print("TEST 3: Duplicate Detection in Excel")
@@ -84,6 +148,1235 @@ if os.path.exists("shopee_report.xlsx"):
 else:
     print("⚠ No existing Excel file to test")
 
+# Test with a generated report and its sidecar index
+test_report = "test_duplicates.xlsx"
+report_files = (test_report, test_report + ".index.json", test_report + ".rows.jsonl")
+for path in report_files:
+    if os.path.exists(path):
+        os.remove(path)
+create_excel_report([{'order_number': "2504226A23B55PX", 'gdrive_link': "https://drive.google.com/test1"}],
+                    test_report)
+result = find_duplicates(["2504226A23B55PX", "2504226A34BUBPFX"], test_report)
+status = "✓" if result == {"2504226A23B55PX"} else "✗"
+print(f"{status} Bulk duplicate check: {sorted(result)}")
+create_excel_report([{'order_number': "2504226A34BUBPFX", 'gdrive_link': "https://drive.google.com/test2"}],
+                    test_report)
+result = check_duplicate_in_excel("2504226A34BUBPFX", test_report)
+status = "✓" if result else "✗"
+print(f"{status} Index updated after append: {result} (expected: True)")
+fresh_index = OrderIndex(test_report)
+status = "✓" if fresh_index.load() == {"2504226A23B55PX", "2504226A34BUBPFX"} and fresh_index.rows == 2 else "✗"
+print(f"{status} Sidecar index reused ({fresh_index.rows} rows)")
+
+# Test 4: Report layout
+print("\n" + "="*60)
+print("TEST 4: Excel Report Layout (streaming writer)")
+print("="*60)
+
+import openpyxl
+from excel_report import REPORT_HEADERS, ReportWriter
+
+# Simulate a manual edit: the ledger must be reseeded from the workbook
+wb = openpyxl.load_workbook(test_report)
+wb.active['A4'] = 3
+wb.active['B4'] = "2504226A45CVCPGX"
+wb.active['C4'] = "https://drive.google.com/manual"
+wb.active['D1'] = "Catatan"
+wb.active['D2'] = "dicek manual"
+wb.active['C5'] = "catatan tanpa nomor pesanan"
+wb.active['B3'].font = openpyxl.styles.Font(color="FFFF0000")
+wb.save(test_report)
+create_excel_report([{'order_number': "2504226A56DWDPIX", 'gdrive_link': "https://drive.google.com/test4"}],
+                    test_report)
+
+ws = openpyxl.load_workbook(test_report).active
+rows = [[cell.value for cell in row] for row in ws.iter_rows(min_row=2)]
+status = "✓" if [r[1] for r in rows] == ["2504226A23B55PX", "2504226A34BUBPFX",
+                                         "2504226A45CVCPGX", None, "2504226A56DWDPIX"] else "✗"
+print(f"{status} Manual edit preserved, new row appended: {len(rows)} rows")
+status = "✓" if [r[0] for r in rows] == [1, 2, 3, None, 4] else "✗"
+print(f"{status} Sequential numbering: {[r[0] for r in rows]}")
+status = "✓" if (ws['D1'].value == "Catatan" and ws['D2'].value == "dicek manual"
+                 and ws['C5'].value == "catatan tanpa nomor pesanan" and ws['B3'].font.color.rgb == "FFFF0000") else "✗"
+print(f"{status} Extra column, note row and formatting kept")
+create_excel_report([{'order_number': "2504226A67EXEPJX", 'gdrive_link': "https://drive.google.com/test5"}],
+                    test_report)
+ws = openpyxl.load_workbook(test_report).active
+status = "✓" if ws['D2'].value == "dicek manual" and ws['B7'].value == "2504226A67EXEPJX" and ws['A7'].value == 5 else "✗"
+print(f"{status} Edited report keeps being appended in place")
+status = "✓" if [ws['A1'].value, ws['B1'].value, ws['C1'].value] == REPORT_HEADERS and ws['A1'].font.b else "✗"
+print(f"{status} Headers match Shopee CS template")
+widths = [ws.column_dimensions[c].width for c in "ABC"]
+status = "✓" if widths == [6, 25, 120] and ws.row_dimensions[1].height == 100 else "✗"
+print(f"{status} Column widths {widths}, header height {ws.row_dimensions[1].height}")
+status = "✓" if ws['C2'].alignment.wrap_text and ws['B2'].alignment.horizontal == 'center' else "✗"
+print(f"{status} Data row alignment")
+status = "✓" if find_duplicates(["2504226A45CVCPGX"], test_report) == {"2504226A45CVCPGX"} else "✗"
+print(f"{status} Index follows manual edit")
+
+for path in report_files:
+    if os.path.exists(path):
+        os.remove(path)
+
+# A run that stops before the workbook swap: its rows are reported again next run
+writer = ReportWriter(test_report)
+writer.append([{'order_number': "A1", 'gdrive_link': "https://drive.google.com/a1"}])
+write_workbook = writer._write_workbook
+def crash_before_swap(rows):
+    raise OSError("disk full")
+writer._write_workbook = crash_before_swap
+try:
+    writer.append([{'order_number': "B2", 'gdrive_link': "https://drive.google.com/b2"}])
+except OSError:
+    pass
+writer._write_workbook = write_workbook
+writer.append([{'order_number': "B2", 'gdrive_link': "https://drive.google.com/b2"},
+               {'order_number': "C3", 'gdrive_link': "https://drive.google.com/c3"}])
+ws = openpyxl.load_workbook(test_report).active
+rows = [(no, order_number) for no, order_number, _ in ws.iter_rows(min_row=2, values_only=True)]
+_, _, streamed = writer._read_ledger()
+status = "✓" if rows == [(1, "A1"), (2, "B2"), (3, "C3")] and streamed else "✗"
+print(f"{status} Rows of an interrupted append aren't written twice: {rows}")
+
+for path in report_files:
+    if os.path.exists(path):
+        os.remove(path)
+
+# A report written before the ledger existed, the way the old version saved it
+from openpyxl.styles import Alignment, Font
+wb = openpyxl.Workbook()
+ws = wb.active
+ws.append(REPORT_HEADERS)
+for cell in ws[1]:
+    cell.font = Font(bold=True)
+    cell.alignment = Alignment(wrap_text=True, vertical='top')
+for no, order_number in enumerate(["2504226A23B55PX", "2504226A34BUBPFX"], start=1):
+    ws.append([no, order_number, f"https://drive.google.com/old{no}"])
+    ws.cell(row=no + 1, column=1).alignment = Alignment(horizontal='center', vertical='center')
+    ws.cell(row=no + 1, column=2).alignment = Alignment(horizontal='center', vertical='center')
+    ws.cell(row=no + 1, column=3).alignment = Alignment(wrap_text=True, vertical='top')
+    ws.row_dimensions[no + 1].height = 30
+wb.save(test_report)
+writer = ReportWriter(test_report)
+writer._append_in_place = None  # must not be needed
+writer.append([{'order_number': "2504226A45CVCPGX", 'gdrive_link': "https://drive.google.com/new"}])
+rows, _, streamed = writer._read_ledger()
+status = "✓" if streamed and [r[0] for r in rows] == ["2504226A23B55PX", "2504226A34BUBPFX", "2504226A45CVCPGX"] else "✗"
+print(f"{status} Report without a ledger seeded from a read-only pass and streamed ({len(rows)} rows)")
+
+writer = ReportWriter(test_report)
+wb = openpyxl.load_workbook(test_report)
+wb.active['D1'] = "Catatan"
+wb.save(test_report)
+writer.append([{'order_number': "2504226A56DWDPIX", 'gdrive_link': "https://drive.google.com/d"}])
+_, _, streamed_with_note = writer._read_ledger()
+wb = openpyxl.load_workbook(test_report)
+wb.active['D1'] = None
+wb.save(test_report)
+writer.append([{'order_number': "2504226A67EXEPJX", 'gdrive_link': "https://drive.google.com/e"}])
+rows, _, streamed = writer._read_ledger()
+ws = openpyxl.load_workbook(test_report).active
+status = "✓" if not streamed_with_note and streamed and len(rows) == 5 and ws['A6'].value == 5 else "✗"
+print(f"{status} Extra column appends in place; removing it brings streaming back")
+
+for path in report_files:
+    if os.path.exists(path):
+        os.remove(path)
+
+# Test 5: Capture profiles
+print("\n" + "="*60)
+print("TEST 5: Screenshot Capture Profiles")
+print("="*60)
+
+import configparser
+from shopee_automation import load_capture_options
+
+config = configparser.ConfigParser()
+config.read_string("[AUTOMATION]\nCAPTURE_PROFILE=compact\nIMAGE_QUALITY=55\n")
+profile = load_capture_options(config)['capture_profile']
+kwargs = profile.screenshot_kwargs()
+status = "✓" if kwargs['type'] == 'jpeg' and kwargs['quality'] == 55 and kwargs['scale'] == 'css' else "✗"
+print(f"{status} Compact profile with quality override: {profile.describe()}")
+status = "✓" if profile.clip and profile.extension == '.jpg' and profile.mime_type == 'image/jpeg' else "✗"
+print(f"{status} Clipped to chat panel, saved as {profile.extension}")
+
+config.read_string("[AUTOMATION]\nCAPTURE_PROFILE=lossless\nIMAGE_QUALITY=55\n")
+kwargs = load_capture_options(config)['capture_profile'].screenshot_kwargs(full_page=True)
+status = "✓" if kwargs['type'] == 'png' and 'quality' not in kwargs and kwargs['full_page'] else "✗"
+print(f"{status} Lossless profile ignores quality: {kwargs}")
+
+# Test 6: In-memory screenshots
+print("\n" + "="*60)
+print("TEST 6: In-memory Upload and Background Archive")
+print("="*60)
+
+import httplib2
+import shutil
+import tempfile
+from googleapiclient.errors import HttpError
+from shopee_automation import ScreenshotArchive, upload_to_gdrive
+from shopee_module import Screenshot
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+def drive_error(status, reason, message="", headers=None):
+    """HttpError shaped like a Drive API error response."""
+    body = {'error': {'code': status, 'message': message, 'errors': [{'reason': reason, 'message': message}]}}
+    return HttpError(httplib2.Response({'status': status, **(headers or {})}), json.dumps(body).encode('utf-8'))
+
+
+class FakeBatch:
+    """Answers each permission sub-request, failing file IDs listed in service.failures."""
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            file_id = request.result['fileId']
+            if self.service.failures.get(file_id, 0) > 0:
+                self.service.failures[file_id] -= 1
+                self.callback(request_id, None, drive_error(403, 'rateLimitExceeded', f"Rate limit exceeded ({file_id})"))
+            else:
+                self.service.shared.append(file_id)
+                self.callback(request_id, {'id': 'anyoneWithLink'}, None)
+
+
+class FakeDriveService:
+    """Records what would be sent to the Drive API."""
+
+    def __init__(self, failures=None):
+        self.uploads = []
+        self.failures = dict(failures or {})
+        self.batch_sizes = []
+        self.shared = []
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def files(self):
+        return self
+
+    def permissions(self):
+        return self
+
+    def create(self, body=None, media_body=None, fields=None, fileId=None):
+        if media_body is None:
+            return FakeRequest({'fileId': fileId})
+        self.uploads.append((body, media_body))
+        return FakeRequest({'id': 'file1', 'webViewLink': 'https://drive.google.com/file/d/file1/view'})
+
+
+screenshot = Screenshot("2504226A23B55PX", "2504226A23B55PX_test.jpg", b"\xff\xd8jpeg-bytes\xff\xd9", "image/jpeg")
+service = FakeDriveService()
+link = upload_to_gdrive(service, screenshot, "folder123")
+body, media = service.uploads[0]
+status = "✓" if link and body['name'] == screenshot.name and media.mimetype() == "image/jpeg" else "✗"
+print(f"{status} Uploaded from buffer as {body['name']} ({media.mimetype()})")
+status = "✓" if media.getbytes(0, media.size()) == screenshot.data else "✗"
+print(f"{status} Upload body matches captured bytes ({media.size()} bytes)")
+
+archive_folder = tempfile.mkdtemp()
+archive = ScreenshotArchive(archive_folder)
+archive.save(screenshot)
+saved = archive.close()
+archived = os.path.join(archive_folder, screenshot.name)
+status = "✓" if saved == 1 and open(archived, 'rb').read() == screenshot.data else "✗"
+print(f"{status} Archive copy written in background: {saved} file(s)")
+shutil.rmtree(archive_folder)
+
+# Test 7: Batched permissions
+print("\n" + "="*60)
+print("TEST 7: Batched Drive Permission Grants")
+print("="*60)
+
+from drive_retry import RetryEngine
+from shopee_automation import PermissionBatcher, apply_permission_failures
+
+# Not throttled to the Drive quota, so the batches go out right away
+unthrottled = RetryEngine(requests_per_second=100000)
+service = FakeDriveService()
+checkpointed = []
+permissions = PermissionBatcher(service, on_granted=lambda order, link: checkpointed.append(order), retry=unthrottled)
+for i in range(205):
+    permissions.add(f"ORDER{i:03d}", f"file{i:03d}", f"https://drive.google.com/file/d/file{i:03d}/view")
+failures = permissions.close()
+status = "✓" if service.batch_sizes == [100, 100, 5] and not failures else "✗"
+print(f"{status} 205 grants sent as {len(service.batch_sizes)} batch requests: {service.batch_sizes}")
+status = "✓" if len(checkpointed) == 205 and len(permissions.granted) == 205 else "✗"
+print(f"{status} Every shared order reported back: {len(checkpointed)} checkpointed")
+
+service = FakeDriveService(failures={'fileB': 1, 'fileC': 5})
+permissions = PermissionBatcher(service, max_retries=2, retry=unthrottled)
+for order in "ABC":
+    permissions.add(f"ORDER{order}", f"file{order}", f"https://drive.google.com/file/d/file{order}/view")
+permissions.flush()
+first_round = sorted(order for order, _, _ in permissions.pending)
+permissions.flush()
+failures = permissions.close()
+status = "✓" if first_round == ["ORDERB", "ORDERC"] and service.batch_sizes == [3, 2] else "✗"
+print(f"{status} Only failed items retried: {first_round}")
+status = "✓" if sorted(permissions.granted) == ["ORDERA", "ORDERB"] and list(failures) == ["ORDERC"] else "✗"
+print(f"{status} Errors mapped back to orders: {failures}")
+
+order_data = [{'order_number': "ORDERA", 'gdrive_link': "a"}, {'order_number': "ORDERC", 'gdrive_link': "c"}]
+failed_orders = []
+apply_permission_failures(failures, order_data, failed_orders)
+status = "✓" if [d['order_number'] for d in order_data] == ["ORDERA"] and failed_orders[0]['order'] == "ORDERC" else "✗"
+print(f"{status} Unshared order moved to failed orders: {failed_orders[0]['reason'][:40]}")
+
+# upload_to_gdrive_batch() is public API: path -> link, every file shared
+from shopee_automation import upload_to_gdrive_batch
+service = FakeDriveService()
+batch_files = [Screenshot(f"ORDER{i}", f"ORDER{i}.jpg", b"\xff\xd8" + bytes([i]) + b"\xff\xd9", "image/jpeg")
+               for i in range(3)]
+links = upload_to_gdrive_batch(service, batch_files, "folder123", max_workers=1)
+status = "✓" if set(links) == set(batch_files) and all(links.values()) and len(service.shared) == 3 else "✗"
+print(f"{status} upload_to_gdrive_batch() uploads and shares {len(links)} files")
+
+# Test 8: Drive client pool
+print("\n" + "="*60)
+print("TEST 8: Thread-safe Drive Client Pool")
+print("="*60)
+
+import threading
+import time
+from google.oauth2.credentials import Credentials
+from drive_client import DriveClientPool, SharedCredentials
+
+
+class SlowRefreshCredentials:
+    """Expired credentials whose refresh takes a while and is counted."""
+
+    def __init__(self):
+        self.token = "expired"
+        self.valid = False
+        self.refresh_calls = 0
+
+    def refresh(self, request):
+        self.refresh_calls += 1
+        time.sleep(0.05)
+        self.token = f"fresh-{self.refresh_calls}"
+        self.valid = True
+
+    def apply(self, headers, token=None):
+        headers['authorization'] = f"Bearer {self.token}"
+
+
+raw_credentials = SlowRefreshCredentials()
+shared = SharedCredentials(raw_credentials)
+headers = [{} for _ in range(8)]
+threads = [threading.Thread(target=shared.before_request, args=(None, 'POST', 'https://x', h)) for h in headers]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+status = "✓" if raw_credentials.refresh_calls == 1 and all(h['authorization'] == "Bearer fresh-1" for h in headers) else "✗"
+print(f"{status} 8 workers with an expired token: {raw_credentials.refresh_calls} refresh")
+
+pool = DriveClientPool(Credentials(token="test-token"))
+services = {}
+def grab(name):
+    services[name] = (pool.get(), pool.get())
+threads = [threading.Thread(target=grab, args=(i,)) for i in range(3)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+status = "✓" if all(a is b for a, b in services.values()) and len({id(a) for a, _ in services.values()}) == 3 else "✗"
+print(f"{status} One client per worker thread, reused within a thread ({pool.size} clients)")
+request = pool.files().create(body={'name': 'x'})
+status = "✓" if request.http.credentials is pool.credentials and request.http is not services[0][0]._http else "✗"
+print(f"{status} Pool forwards files() to the calling thread's authorized client")
+pool.close()
+
+# Test 9: Size-aware uploads
+print("\n" + "="*60)
+print("TEST 9: Multipart vs Resumable Uploads (session resume)")
+print("="*60)
+
+import shopee_automation
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from shopee_automation import create_gdrive_file
+
+
+class RecordingHttp(HttpMockSequence):
+    """Scripted Drive responses that also records each request."""
+
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.calls = []
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.calls.append((method, uri, (headers or {}).get('Content-Range')))
+        return super().request(uri, method, body, headers, **kwargs)
+
+
+saved_limits = (shopee_automation.SIMPLE_UPLOAD_LIMIT, shopee_automation.RESUMABLE_CHUNK_SIZE)
+shopee_automation.SIMPLE_UPLOAD_LIMIT = shopee_automation.RESUMABLE_CHUNK_SIZE = 256 * 1024
+
+http = RecordingHttp([({'status': '200'}, json.dumps({'id': 'small', 'webViewLink': 'https://drive/small'}))])
+small = Screenshot("2504226A23B55PX", "small.jpg", b"\xff\xd8small", "image/jpeg")
+result = create_gdrive_file(build("drive", "v3", http=http), small, "folder123", share=False)
+status = "✓" if result['id'] == 'small' and len(http.calls) == 1 and 'uploadType=multipart' in http.calls[0][1] else "✗"
+print(f"{status} Small file sent as a single multipart request ({len(http.calls)} request)")
+
+large = Screenshot("2504226A34BUBPFX", "large.png", b"x" * (600 * 1024), "image/png")
+http = RecordingHttp([
+    ({'status': '200', 'location': 'https://upload.example/session1'}, ''),
+    ({'status': '308', 'range': 'bytes=0-262143'}, ''),
+    ({'status': '503'}, 'connection lost')
+])
+sessions = []
+result = create_gdrive_file(build("drive", "v3", http=http), large, "folder123", max_retries=1, share=False,
+                            on_session=sessions.append)
+status = "✓" if result is None and sessions == ['https://upload.example/session1'] else "✗"
+print(f"{status} Interrupted large upload keeps its session: {sessions}")
+
+http = RecordingHttp([
+    ({'status': '308', 'range': 'bytes=0-262143'}, ''),
+    ({'status': '308', 'range': 'bytes=0-524287'}, ''),
+    ({'status': '200'}, json.dumps({'id': 'large', 'webViewLink': 'https://drive/large'}))
+])
+result = create_gdrive_file(build("drive", "v3", http=http), large, "folder123", share=False, resume_uri=sessions[0])
+ranges = [content_range for _, _, content_range in http.calls]
+status = "✓" if result['id'] == 'large' and ranges == ['bytes */614400', 'bytes 262144-524287/614400',
+                                                      'bytes 524288-614399/614400'] else "✗"
+print(f"{status} Resumed from byte 262144 instead of 0: {ranges}")
+shopee_automation.SIMPLE_UPLOAD_LIMIT, shopee_automation.RESUMABLE_CHUNK_SIZE = saved_limits
+
+journal = CheckpointJournal(journal_path)
+journal.clear()
+journal.append("2504226A34BUBPFX", None, upload_session=sessions[0], upload_source="large.png", upload_size=614400)
+status = "✓" if not journal.load()['order_numbers'] and journal.upload_session("2504226A34BUBPFX") else "✗"
+print(f"{status} Unfinished upload is checkpointed but not counted as processed")
+journal.append("2504226A34BUBPFX", "https://drive/large")
+loaded = journal.load()
+status = "✓" if loaded['order_numbers'] == {"2504226A34BUBPFX"} and not loaded['upload_sessions'] else "✗"
+print(f"{status} Finished upload replaces the session record")
+journal.clear()
+
+# Test 10: Content-hash upload cache
+print("\n" + "="*60)
+print("TEST 10: Upload Cache (skip identical screenshots)")
+print("="*60)
+
+from upload_cache import UploadCache, content_digest
+
+cache_folder = tempfile.mkdtemp()
+cache_path = os.path.join(cache_folder, 'upload_cache.json')
+cache = UploadCache(cache_path, max_entries=2)
+digests = [content_digest(bytes([i]) * 16) for i in range(3)]
+cache.put(digests[0], "folder123", "f0", "https://drive/f0")
+cache.put(digests[1], "folder123", "f1", "https://drive/f1")
+cache.get(digests[0], "folder123")
+cache.put(digests[2], "folder123", "f2", "https://drive/f2")
+status = "✓" if cache.get(digests[1], "folder123") is None and cache.get(digests[0], "folder123") else "✗"
+print(f"{status} Least recently used entry evicted at max_entries ({len(cache)} kept)")
+status = "✓" if cache.get(digests[0], "other_folder") is None else "✗"
+print(f"{status} Entries are per Drive folder")
+cache.mark_shared("https://drive/f2")
+cache.save()
+reloaded = UploadCache(cache_path, max_entries=2)
+status = "✓" if len(reloaded) == 2 and reloaded.get(digests[2], "folder123")['shared'] else "✗"
+print(f"{status} Cache persisted and reloaded: {len(reloaded)} entries")
+
+shopee_automation._upload_cache = UploadCache(cache_path)
+service = FakeDriveService()
+first = upload_to_gdrive(service, screenshot, "folder123")
+repeat = Screenshot("2504226A34BUBPFX", "2504226A34BUBPFX_test.jpg", screenshot.data, "image/jpeg")
+second = upload_to_gdrive(service, repeat, "folder123")
+status = "✓" if first == second and len(service.uploads) == 1 else "✗"
+print(f"{status} Identical bytes uploaded once, link reused ({len(service.uploads)} upload)")
+status = "✓" if shopee_automation._upload_cache.hits == 1 and shopee_automation._upload_cache.misses == 1 else "✗"
+print(f"{status} Hits/misses counted: {shopee_automation._upload_cache.hits}/{shopee_automation._upload_cache.misses}")
+shopee_automation._upload_cache = None
+shutil.rmtree(cache_folder)
+
+# Test 11: Shared rate limiter and retry engine
+print("\n" + "="*60)
+print("TEST 11: Drive Rate Limiter, Retries and Circuit Breaker")
+print("="*60)
+
+import socket
+from drive_retry import NETWORK_ERROR, RATE_LIMITED, SERVER_ERROR, RetryEngine, TokenBucket, classify_error
+
+
+class FakeClock:
+    """Time that only moves when something sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+reasons = [
+    classify_error(drive_error(403, 'userRateLimitExceeded')),
+    classify_error(drive_error(429, 'rateLimitExceeded')),
+    classify_error(drive_error(503, 'backendError')),
+    classify_error(socket.timeout("timed out")),
+    classify_error(drive_error(403, 'insufficientFilePermissions')),
+    classify_error(drive_error(404, 'notFound')),
+    classify_error(FileNotFoundError("shot.png"))
+]
+expected = [RATE_LIMITED, RATE_LIMITED, SERVER_ERROR, NETWORK_ERROR, None, None, None]
+status = "✓" if reasons == expected else "✗"
+print(f"{status} Errors classified by reason: {reasons}")
+
+clock = FakeClock()
+bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+for _ in range(6):
+    bucket.acquire()
+status = "✓" if abs(clock.now - 2.0) < 1e-9 else "✗"
+print(f"{status} Token bucket holds 6 requests to 2/s after a burst of 2 ({clock.now:.1f}s)")
+
+clock = FakeClock()
+engine = RetryEngine(requests_per_second=100, base_delay=1, max_delay=8, clock=clock, sleep=clock.sleep)
+responses = [drive_error(429, 'rateLimitExceeded', headers={'retry-after': '20'}), {'id': 'ok'}]
+def flaky():
+    response = responses.pop(0)
+    if isinstance(response, Exception):
+        raise response
+    return response
+result = engine.call(flaky)
+status = "✓" if result == {'id': 'ok'} and clock.now >= 20 and engine.retries[RATE_LIMITED] == 1 else "✗"
+print(f"{status} Retry-After honoured on 429: resumed after {clock.now:.0f}s")
+
+clock = FakeClock()
+engine = RetryEngine(requests_per_second=100, base_delay=1, max_delay=4, clock=clock, sleep=clock.sleep)
+calls = []
+def forbidden():
+    calls.append(1)
+    raise drive_error(403, 'insufficientFilePermissions')
+try:
+    engine.call(forbidden)
+except HttpError:
+    pass
+status = "✓" if len(calls) == 1 and not clock.sleeps else "✗"
+print(f"{status} Permanent 403 not retried ({len(calls)} call)")
+
+delays = []
+previous = 1
+for _ in range(20):
+    previous = engine.jitter(previous)
+    delays.append(previous)
+status = "✓" if all(1 <= d <= 4 for d in delays) and len(set(delays)) > 1 else "✗"
+print(f"{status} Decorrelated jitter stays within [1s, 4s]: {min(delays):.2f}-{max(delays):.2f}s")
+
+clock = FakeClock()
+engine = RetryEngine(requests_per_second=100, max_retries=5, base_delay=0.1, max_delay=0.1,
+                     breaker_threshold=3, breaker_cooldown=30, clock=clock, sleep=clock.sleep)
+outcomes = [drive_error(503, 'backendError')] * 3 + [{'id': 'ok'}]
+def unstable():
+    outcome = outcomes.pop(0)
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+result = engine.call(unstable)
+status = "✓" if result == {'id': 'ok'} and engine.breaker.opens == 1 and clock.now >= 30 else "✗"
+print(f"{status} 3 consecutive 5xx opened the breaker, calls resumed after {clock.now:.1f}s")
+status = "✓" if engine.breaker.state == 'closed' else "✗"
+print(f"{status} Successful trial call closed the breaker ({engine.breaker.state})")
+
+# Test 12: Adaptive upload concurrency
+print("\n" + "="*60)
+print("TEST 12: Adaptive Upload Concurrency (AIMD)")
+print("="*60)
+
+from drive_retry import AdaptiveConcurrency
+from shopee_automation import UploadPipeline
+
+clock = FakeClock()
+concurrency = AdaptiveConcurrency(initial=2, minimum=1, maximum=4, clock=clock)
+def timed_upload(seconds, result="link"):
+    clock.now += seconds
+    return result
+for _ in range(4):
+    concurrency.run(timed_upload, 1.0)
+status = "✓" if concurrency.limit == 3 else "✗"
+print(f"{status} Healthy window adds one worker: 2 → {concurrency.limit}")
+for _ in range(6):
+    concurrency.run(timed_upload, 1.0)
+for _ in range(8):
+    concurrency.run(timed_upload, 1.0)
+status = "✓" if concurrency.limit == 4 else "✗"
+print(f"{status} Growth stops at the maximum: {concurrency.limit}")
+for _ in range(8):
+    concurrency.run(timed_upload, 3.0)
+status = "✓" if concurrency.limit == 2 else "✗"
+print(f"{status} Rising p95 latency halves the limit: 4 → {concurrency.limit}")
+concurrency.throttled()
+concurrency.throttled()
+status = "✓" if concurrency.limit == 1 and concurrency.decisions[-1][3].startswith("throttled") else "✗"
+print(f"{status} 403/429 cuts once per window: 2 → {concurrency.limit}")
+for _ in range(4):
+    concurrency.run(timed_upload, 1.0, None)
+status = "✓" if concurrency.limit == 1 and concurrency.decisions[-1][3].startswith("hold") else "✗"
+print(f"{status} Failing uploads hold the limit: {concurrency.decisions[-1][3]}")
+print(f"  Decisions: {[(old, new) for _, old, new, _ in concurrency.summary()['decisions']]}")
+
+import asyncio
+from drive_retry import skip_latency_sample
+def cached_upload():
+    skip_latency_sample()
+    clock.now += 0.01
+    return "link"
+mixed = AdaptiveConcurrency(initial=2, minimum=1, maximum=4, clock=clock)
+# Cache hits take 10 ms; before they were skipped they made 1 s uploads look like overload
+for i in range(30):
+    if i % 3 == 0 or i >= 15:
+        mixed.run(timed_upload, 1.0)
+    else:
+        mixed.run(cached_upload)
+cuts = [(old, new) for _, old, new, _ in mixed.decisions if new < old]
+status = "✓" if not cuts and mixed.limit == 4 and mixed.last_p95 == 1.0 else "✗"
+print(f"{status} Cache hits mixed with real uploads leave the p95 alone: limit {mixed.limit}, {len(cuts)} cuts")
+async def cached_upload_async():
+    return cached_upload()
+sampled = len(mixed._window)
+asyncio.run(mixed.run_async(cached_upload_async))
+status = "✓" if len(mixed._window) == sampled else "✗"
+print(f"{status} Async cache hits are not sampled either")
+
+failing_fast = AdaptiveConcurrency(initial=2, minimum=1, maximum=4, clock=clock)
+for seconds, result in [(0.01, None)] * 4 + [(1.0, "link")] * 4:
+    failing_fast.run(timed_upload, seconds, result)
+status = "✓" if [new for _, _, new, _ in failing_fast.decisions] == [2, 3] else "✗"
+print(f"{status} Fast failures don't set the baseline: {[reason for *_, reason in failing_fast.decisions]}")
+
+pinned = AdaptiveConcurrency(initial=1, minimum=1, maximum=1, clock=clock)
+for seconds in [1.0] * 4 + [3.0] * 4:
+    pinned.run(timed_upload, seconds)
+status = "✓" if pinned.limit == 1 and not pinned.decisions else "✗"
+print(f"{status} No decrease recorded at the minimum: {pinned.decisions}")
+
+# Uploads get slower for good (bigger screenshots): the baseline follows after 2 windows
+drifting = AdaptiveConcurrency(initial=2, minimum=1, maximum=4, baseline_windows=2, clock=clock)
+for seconds in [0.5] * 4 + [1.0] * 14:
+    drifting.run(timed_upload, seconds)
+status = "✓" if [(old, new) for _, old, new, _ in drifting.decisions] == [(2, 3), (3, 1), (1, 2)] else "✗"
+print(f"{status} Baseline follows recent windows: {[(old, new) for _, old, new, _ in drifting.decisions]}")
+
+active = []
+peak = []
+lock = threading.Lock()
+class SlowService(FakeDriveService):
+    def create(self, body=None, media_body=None, fields=None, fileId=None):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        return super().create(body, media_body, fields, fileId)
+saved_retry, shopee_automation._drive_retry = shopee_automation._drive_retry, unthrottled
+pipeline = UploadPipeline(SlowService(), "folder123", max_pending=10,
+                          concurrency=AdaptiveConcurrency(initial=2, minimum=1, maximum=5))
+for i in range(6):
+    pipeline.submit(f"ORDER{i}", Screenshot(f"ORDER{i}", f"ORDER{i}.jpg", bytes([i]) * 8, "image/jpeg"))
+results = pipeline.close()
+shopee_automation._drive_retry = saved_retry
+status = "✓" if len(results) == 6 and max(peak) == 2 and len(pipeline._workers) == 5 else "✗"
+print(f"{status} 5 worker threads, {max(peak)} uploading at once (limit 2)")
+
+# Test 13: Offline Drive client construction
+print("\n" + "="*60)
+print("TEST 13: Cached Discovery Document and Lazy Token Refresh")
+print("="*60)
+
+import drive_client
+from shopee_automation import get_gdrive_service
+
+discovery_folder = tempfile.mkdtemp()
+drive_client._discovery_document = None
+document = drive_client.load_discovery_document(os.path.join(discovery_folder, 'missing.json'))
+status = "✓" if document['name'] == 'drive' and document['version'] == 'v3' else "✗"
+print(f"{status} Bundled Drive v3 document used without a download (revision {document['revision']})")
+status = "✓" if drive_client.load_discovery_document() is document else "✗"
+print(f"{status} Document parsed once per process")
+
+newer = dict(document, revision='99991231')
+older_api = dict(document, version='v2', revision='99991231')
+for name, doc in (('newer.json', newer), ('v2.json', older_api)):
+    with open(os.path.join(discovery_folder, name), 'w', encoding='utf-8') as f:
+        json.dump(doc, f)
+drive_client._discovery_document = None
+picked_newer = drive_client.load_discovery_document(os.path.join(discovery_folder, 'newer.json'))['revision']
+drive_client._discovery_document = None
+picked_v2 = drive_client.load_discovery_document(os.path.join(discovery_folder, 'v2.json'))
+status = "✓" if picked_newer == '99991231' and picked_v2['version'] == 'v3' else "✗"
+print(f"{status} Newer cached revision preferred, cached document for another version ignored")
+drive_client._discovery_document = None
+
+started = time.perf_counter()
+pool = DriveClientPool(Credentials(token="test-token"), api_endpoint="http://127.0.0.1:8089")
+request = pool.files().create(body={'name': 'x'})
+elapsed = (time.perf_counter() - started) * 1000
+status = "✓" if request.uri.startswith("http://127.0.0.1:8089/") else "✗"
+print(f"{status} Client built offline against a local endpoint in {elapsed:.1f}ms")
+pool.close()
+
+with open(os.path.join(discovery_folder, 'token.json'), 'w') as f:
+    json.dump({'token': 'expired-token', 'refresh_token': 'refresh-me', 'client_id': 'id', 'client_secret': 'secret',
+               'expiry': '2020-01-01T00:00:00Z'}, f)
+previous_dir = os.getcwd()
+os.chdir(discovery_folder)
+try:
+    started = time.perf_counter()
+    pool = get_gdrive_service()
+    elapsed = (time.perf_counter() - started) * 1000
+finally:
+    os.chdir(previous_dir)
+status = "✓" if pool and not pool.credentials.valid and pool.credentials.refreshes == 0 else "✗"
+print(f"{status} Expired token left for the first request to refresh (startup {elapsed:.1f}ms)")
+pool.close()
+shutil.rmtree(discovery_folder)
+
+# Test 14: Import time budget
+print("\n" + "="*60)
+print("TEST 14: Lazy Imports and Import-time Budget")
+print("="*60)
+
+from check_import_time import HEAVY_MODULES, IMPORT_BUDGETS_MS, measure_import
+
+elapsed, heavy = measure_import('shopee_automation')
+status = "✓" if not heavy else "✗"
+print(f"{status} shopee_automation imports none of {', '.join(HEAVY_MODULES)}: {heavy or 'none loaded'}")
+status = "✓" if elapsed <= IMPORT_BUDGETS_MS['shopee_automation'] else "✗"
+print(f"{status} Cold import in {elapsed:.1f}ms (budget {IMPORT_BUDGETS_MS['shopee_automation']}ms)")
+elapsed, heavy = measure_import('shopee_module')
+status = "✓" if 'playwright' in heavy else "✗"
+print(f"{status} shopee_module still loads Playwright itself ({elapsed:.1f}ms)")
+
+# Test 15: Batch mode
+print("\n" + "="*60)
+print("TEST 15: Non-interactive Batch CLI")
+print("="*60)
+
+import builtins
+import contextlib
+import io
+from run_summary import EXIT_CONFIG, EXIT_USAGE
+from shopee_automation import (apply_cli_overrides, filter_orders, get_batch_orders, load_run_policies,
+                               parse_args, prepare_resume, run)
+
+prompts = []
+saved_input = builtins.input
+builtins.input = lambda prompt='': prompts.append(prompt) or 'y'
+batch_folder = tempfile.mkdtemp()
+try:
+    config = configparser.ConfigParser()
+    args = parse_args(['--batch', '--orders', 'orders.txt', '--duplicates', 'process', '--detect', 'off',
+                       '--upload-workers', '4', '--capture-profile', 'lossless'])
+    apply_cli_overrides(config, args)
+    policies = load_run_policies(config)
+    automation = dict(config.items('AUTOMATION'))
+    status = "✓" if (automation['orders_file'] == 'orders.txt' and automation['upload_workers'] == '4'
+                     and automation['auto_detect_orders'] == 'false'
+                     and automation['unattended_capture'] == 'true') else "✗"
+    print(f"{status} Command-line options override config.ini [AUTOMATION]")
+    expected = {'batch': True, 'resume': 'resume', 'duplicates': 'process', 'invalid_orders': 'keep'}
+    status = "✓" if policies == expected else "✗"
+    print(f"{status} 'ask' policies answered in batch mode: {policies}")
+    try:
+        parse_args(['--upload-workers', '0'])
+        rejected = False
+    except SystemExit as e:
+        rejected = e.code == EXIT_USAGE
+    status = "✓" if rejected else "✗"
+    print(f"{status} Invalid worker count rejected with exit code {EXIT_USAGE}")
+    
+    orders_path = os.path.join(batch_folder, 'orders.txt')
+    with open(orders_path, 'w') as f:
+        f.write("2504226A23B55PX\nnot-an-order\n2504226A34BUBPFX\n")
+    kept = get_batch_orders(orders_path, 'keep')
+    dropped = get_batch_orders(orders_path, 'drop')
+    status = "✓" if len(kept) == 3 and dropped == ["2504226A23B55PX", "2504226A34BUBPFX"] else "✗"
+    print(f"{status} Orders file read without prompts (keep: {len(kept)}, drop: {len(dropped)})")
+    
+    save_checkpoint("2504226A99ZZZPX", "https://drive.google.com/test")
+    resumed = prepare_resume('resume')
+    prepare_resume('fresh')
+    status = "✓" if "2504226A99ZZZPX" in resumed and not load_checkpoint().get('processed_orders') else "✗"
+    print(f"{status} Resume policy: resume skips checkpointed orders, fresh clears them")
+    
+    saved_find_duplicates = shopee_automation.find_duplicates
+    shopee_automation.find_duplicates = lambda orders: {"2504226A23B55PX"}
+    try:
+        skipped = filter_orders(["2504226A23B55PX", "2504226A34BUBPFX"], set(), 'skip')
+        processed = filter_orders(["2504226A23B55PX", "2504226A34BUBPFX"], set(), 'process')
+    finally:
+        shopee_automation.find_duplicates = saved_find_duplicates
+    status = "✓" if skipped == ["2504226A34BUBPFX"] and len(processed) == 2 else "✗"
+    print(f"{status} Duplicate policy: skip drops report duplicates, process keeps them")
+    status = "✓" if not prompts else "✗"
+    print(f"{status} No prompts shown: {prompts}")
+    
+    # Runs that stop before the browser starts still exit with a code and write a summary
+    previous_dir = os.getcwd()
+    os.chdir(batch_folder)
+    try:
+        with open('config.ini', 'w') as f:
+            f.write("[SHOPEE]\nUSERNAME=your_shopee_username\nPASSWORD=your_shopee_password\n"
+                    "[GOOGLE_DRIVE]\nFOLDER_ID=folder\n[AUTOMATION]\n")
+        run_output = io.StringIO()
+        with contextlib.redirect_stdout(run_output):
+            missing_credentials = run(['--batch'])
+            with open('run_summary.json', encoding='utf-8') as f:
+                written = json.load(f)
+            with open('config.ini', 'w') as f:
+                f.write("[SHOPEE]\nUSERNAME=seller\nPASSWORD=secret\n[GOOGLE_DRIVE]\nFOLDER_ID=folder\n"
+                        "[AUTOMATION]\nDUPLICATE_POLICY=sometimes\n")
+            bad_policy = run(['--batch', '--summary', 'bad_policy.json'])
+            missing_orders = run(['--batch', '--duplicates', 'skip', '--orders', 'missing.txt'])
+    finally:
+        os.chdir(previous_dir)
+    status = "✓" if missing_credentials == EXIT_CONFIG and written['exit_code'] == EXIT_CONFIG else "✗"
+    print(f"{status} Unconfigured credentials: exit code {missing_credentials}, summary status '{written['status']}'")
+    status = "✓" if bad_policy == EXIT_USAGE and missing_orders == EXIT_CONFIG else "✗"
+    print(f"{status} Invalid policy exits with {bad_policy}, missing orders file with {missing_orders}")
+finally:
+    builtins.input = saved_input
+    shutil.rmtree(batch_folder)
+
+# Test 16: SQLite job store
+print("\n" + "="*60)
+print("TEST 16: SQLite Job Store (stages, claims, re-queue)")
+print("="*60)
+
+from job_store import CAPTURED, DETECTED, FAILED, REPORTED, SHARED, UPLOADED, JobStore
+
+jobs_folder = tempfile.mkdtemp()
+jobs_path = os.path.join(jobs_folder, 'jobs.db')
+clock = FakeClock()
+store = JobStore(jobs_path, worker='worker-a', max_attempts=2, lease_seconds=60, clock=clock)
+other = JobStore(jobs_path, worker='worker-b', max_attempts=2, lease_seconds=60, clock=clock)
+try:
+    journal_mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    status = "✓" if journal_mode == 'wal' else "✗"
+    print(f"{status} Database in {journal_mode.upper()} mode")
+    
+    added = store.add(["2504226A23B55PX", "2504226A34BUBPFX", "2504226A45CVCPGX"])
+    status = "✓" if added == 3 and store.add(["2504226A23B55PX"]) == 0 else "✗"
+    print(f"{status} {added} orders queued, re-adding an order is a no-op")
+    
+    status = "✓" if store.claim("2504226A23B55PX") and not other.claim("2504226A23B55PX") else "✗"
+    print(f"{status} A claimed order can't be claimed by a second worker")
+    store.advance("2504226A23B55PX", CAPTURED, screenshot="screenshots/a.jpg")
+    store.advance("2504226A23B55PX", UPLOADED, gdrive_link="https://drive.google.com/a", file_id="a")
+    store.advance("2504226A23B55PX", SHARED)
+    store.advance("2504226A23B55PX", UPLOADED)
+    job = store.get("2504226A23B55PX")
+    stages = [state for state, _, _, _ in store.history("2504226A23B55PX")]
+    status = "✓" if job['state'] == SHARED and job['claimed_by'] is None and stages == [DETECTED, CAPTURED, UPLOADED, SHARED] else "✗"
+    print(f"{status} Stages recorded in order, never backwards: {' → '.join(stages)}")
+    
+    # worker-a "crashes" holding a claim; worker-b takes over once the lease runs out
+    store.claim("2504226A34BUBPFX")
+    store.advance("2504226A34BUBPFX", CAPTURED)
+    blocked = other.requeue()
+    clock.now += 61
+    recovered = other.requeue()
+    status = "✓" if "2504226A34BUBPFX" not in blocked and "2504226A34BUBPFX" in recovered and other.claim("2504226A34BUBPFX") else "✗"
+    print(f"{status} Unfinished order of a crashed worker re-queued after its lease ({other.get('2504226A34BUBPFX')['state']})")
+    
+    other.fail("2504226A34BUBPFX", "Upload failed")
+    failed = other.failed()
+    status = "✓" if failed == [{'order': "2504226A34BUBPFX", 'reason': "Upload failed", 'stage': CAPTURED, 'attempts': 2}] else "✗"
+    print(f"{status} Failure recorded with stage and attempts: {failed}")
+    store.claim("2504226A45CVCPGX")
+    store.fail("2504226A45CVCPGX", "Screenshot failed")
+    requeued = store.requeue()
+    status = "✓" if requeued == ["2504226A45CVCPGX"] and store.get("2504226A34BUBPFX")['state'] == FAILED else "✗"
+    print(f"{status} Failed orders re-queued until max attempts: {requeued}")
+    
+    store.claim("2504226A45CVCPGX")
+    store.advance("2504226A45CVCPGX", SHARED, gdrive_link="https://drive.google.com/c")
+    unreported = store.unreported()
+    store.mark_reported([row['order_number'] for row in unreported])
+    status = "✓" if [r['order_number'] for r in unreported] == ["2504226A23B55PX", "2504226A45CVCPGX"] and not store.unreported() else "✗"
+    print(f"{status} Report rows queried from shared orders: {len(unreported)}, counts {store.counts()}")
+    
+    # Parallel claims never hand out the same order twice
+    store.add([f"2504227PAR{i:03d}" for i in range(40)])
+    workers = [JobStore(jobs_path, worker=f"thread-{i}") for i in range(4)]
+    claimed = []
+    def drain(worker_store):
+        for i in range(40):
+            order_number = f"2504227PAR{i:03d}"
+            if worker_store.claim(order_number):
+                claimed.append(order_number)
+    threads = [threading.Thread(target=drain, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for w in workers:
+        w.close()
+    status = "✓" if len(claimed) == 40 and len(set(claimed)) == 40 else "✗"
+    print(f"{status} 4 workers drained 40 orders with {len(claimed) - len(set(claimed))} double claims")
+    
+    # save_checkpoint() and report rows go through the store once it is enabled
+    config = configparser.ConfigParser()
+    config.read_dict({'AUTOMATION': {'JOB_STORE_FILE': os.path.join(jobs_folder, 'run.db')}})
+    run_store = shopee_automation.enable_job_store(config)
+    queued = shopee_automation.queue_orders(["2504226A99YYYPX"])
+    shopee_automation.claim_job("2504226A99YYYPX")
+    save_checkpoint("2504226A99YYYPX", "https://drive.google.com/y")
+    status = "✓" if queued == ["2504226A99YYYPX"] and run_store.get("2504226A99YYYPX")['state'] == SHARED else "✗"
+    print(f"{status} Checkpointed upload marks the order shared in the job store")
+    run_store.claim("2504226A97XXXPX")
+    run_store.fail("2504226A97XXXPX", "Chat not found")
+    with contextlib.redirect_stdout(io.StringIO()):
+        streamed = list(shopee_automation.stream_orders(["2504226A98ZZZPX", "2504226A99YYYPX"],
+                                                        {"2504226A99YYYPX"}, 'process'))
+    status = "✓" if streamed == ["2504226A98ZZZPX", "2504226A97XXXPX"] and run_store.get("2504226A98ZZZPX")['state'] == DETECTED else "✗"
+    print(f"{status} Streamed orders queued one by one, re-queued orders follow: {streamed}")
+finally:
+    store.close()
+    other.close()
+    if shopee_automation._job_store is not None:
+        shopee_automation._job_store.close()
+        shopee_automation._job_store = None
+    shutil.rmtree(jobs_folder)
+
+# Test 17: Sharded runs
+print("\n" + "="*60)
+print("TEST 17: Sharded Runs (several browser processes, merged results)")
+print("="*60)
+
+from concurrent.futures import ThreadPoolExecutor
+from run_summary import EXIT_LOGIN, EXIT_OK, EXIT_ORDERS_FAILED, RunSummary
+import shard_runner
+
+shard_orders = [f"2504228SHD{i:03d}X" for i in range(7)]
+failing_order = shard_orders[4]
+shard_settings_seen = {}
+
+def fake_shard(index, settings, paths):
+    """Stands in for run_shard(): 'processes' its orders like a worker would."""
+    shard_config = configparser.ConfigParser()
+    shard_config.read_dict(settings)
+    shard_settings_seen[index] = dict(shard_config.items('AUTOMATION'))
+    with open(shard_config.get('AUTOMATION', 'ORDERS_FILE')) as f:
+        orders = f.read().split()
+    journal = CheckpointJournal(paths['checkpoint'])
+    shard_store = JobStore('jobs.db', worker=f"shard{index}")
+    order_data, failed = [], []
+    for order_number in orders:
+        shard_store.claim(order_number)
+        if order_number == failing_order:
+            shard_store.fail(order_number, "Chat not found")
+            failed.append({'order': order_number, 'reason': "Chat not found"})
+            continue
+        link = f"https://drive.google.com/{order_number}"
+        journal.append(order_number, link)
+        shard_store.advance(order_number, SHARED, gdrive_link=link)
+        order_data.append({'order_number': order_number, 'gdrive_link': link})
+    journal.flush()
+    shard_store.close()
+    shard_cache = UploadCache(paths['upload_cache'])
+    shard_cache.put(f"digest{index}", "folder", f"file{index}", f"https://drive.google.com/cached{index}")
+    shard_cache.save()
+    shard_summary = RunSummary()
+    shard_summary.record_orders(order_data, failed)
+    shard_summary.finish(EXIT_ORDERS_FAILED if failed else EXIT_OK, 'completed')
+    return shard_summary.to_dict()
+
+status = "✓" if (shard_runner.split_orders(shard_orders, 3) == [shard_orders[0::3], shard_orders[1::3], shard_orders[2::3]]
+                 and len(shard_runner.split_orders(shard_orders[:2], 4)) == 2 and shard_runner.split_orders([], 3) == []) else "✗"
+print(f"{status} Orders dealt round-robin: {[len(s) for s in shard_runner.split_orders(shard_orders, 3)]}")
+
+shard_folder = tempfile.mkdtemp()
+previous_dir = os.getcwd()
+os.chdir(shard_folder)
+try:
+    os.makedirs(os.path.join('browser_data', 'Default', 'Cache'))
+    for name in ('SingletonLock', os.path.join('Default', 'Cookies'), os.path.join('Default', 'Cache', 'data_0')):
+        with open(os.path.join('browser_data', name), 'w') as f:
+            f.write("x")
+    with open('orders.txt', 'w') as f:
+        f.write("\n".join(shard_orders) + "\n")
+    main_cache = UploadCache('upload_cache.json')
+    main_cache.put("digest0", "folder", "file0", "https://drive.google.com/cached0")
+    main_cache.save()
+    
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'SHOPEE': {'USERNAME': 'seller', 'PASSWORD': 'secret'},
+        'GOOGLE_DRIVE': {'FOLDER_ID': 'folder'},
+        'AUTOMATION': {'BATCH_MODE': 'true', 'ORDERS_FILE': 'orders.txt', 'SHARD_WORKERS': '3',
+                       'DRIVE_REQUESTS_PER_SECOND': '9'}
+    })
+    summary = RunSummary()
+    with contextlib.redirect_stdout(io.StringIO()):
+        exit_code = shard_runner.run_sharded(config, summary, executor=ThreadPoolExecutor(3), worker=fake_shard)
+    
+    profile = os.path.join('shards', 'shard1', 'browser_data')
+    status = "✓" if (os.path.exists(os.path.join(profile, 'Default', 'Cookies'))
+                     and not os.path.exists(os.path.join(profile, 'SingletonLock'))
+                     and not os.path.exists(os.path.join(profile, 'Default', 'Cache'))) else "✗"
+    print(f"{status} Worker profile cloned without lock and cache files")
+    seen = shard_settings_seen.get(2, {})
+    status = "✓" if (seen.get('shard') == '2/3' and seen.get('browser_data_dir') == os.path.join('shards', 'shard2', 'browser_data')
+                     and float(seen.get('drive_requests_per_second', 0)) == 3.0 and seen.get('batch_mode') == 'true') else "✗"
+    print(f"{status} Worker settings: shard {seen.get('shard')}, own profile, {seen.get('drive_requests_per_second')} Drive requests/s")
+    
+    merged = load_checkpoint()
+    status = "✓" if (merged['order_numbers'] == set(shard_orders) - {failing_order}
+                     and not any(os.path.exists(shard_runner.shard_paths(i)['checkpoint']) for i in (1, 2, 3))) else "✗"
+    print(f"{status} Worker checkpoints merged into one journal: {len(merged['order_numbers'])} orders")
+    merged_cache = UploadCache('upload_cache.json')
+    status = "✓" if len(merged_cache) == 4 and merged_cache.get("digest3", "folder") else "✗"
+    print(f"{status} Worker upload caches merged: {len(merged_cache)} entries")
+    
+    from openpyxl import load_workbook
+    report_rows = load_workbook(summary.excel_report).active.max_row
+    status = "✓" if (exit_code == EXIT_ORDERS_FAILED and len(summary.succeeded) == 6 and summary.failed[0]['order'] == failing_order
+                     and len(summary.stats['shards']) == 3 and report_rows >= 6) else "✗"
+    print(f"{status} One report and summary: exit code {exit_code}, {len(summary.succeeded)} ok, {len(summary.failed)} failed")
+    
+    # A worker that can't log in decides the exit code; its orders (with the order that
+    # failed above, re-queued into shard 1) stay queued for the next run
+    def login_failure(index, settings, paths):
+        if index == 1:
+            return {'exit_code': EXIT_LOGIN, 'status': 'login_failed', 'message': "Shopee login failed",
+                    'succeeded': [], 'failed': []}
+        return fake_shard(index, settings, paths)
+    with open('orders.txt', 'w') as f:
+        f.write("2504228SHD100X\n2504228SHD101X\n")
+    summary = RunSummary()
+    with contextlib.redirect_stdout(io.StringIO()):
+        exit_code = shard_runner.run_sharded(config, summary, executor=ThreadPoolExecutor(2), worker=login_failure)
+    pending = JobStore('jobs.db').requeue()
+    status = "✓" if exit_code == EXIT_LOGIN and set(pending) == {failing_order, "2504228SHD100X"} else "✗"
+    print(f"{status} Failed worker sets exit code {exit_code}, its orders stay queued: {pending}")
+    
+    # Checkpoints left by an interrupted run are recovered before the next one
+    os.makedirs(shard_runner.shard_paths(5)['folder'])
+    CheckpointJournal(shard_runner.shard_paths(5)['checkpoint']).append("2504228SHD200X", "https://drive.google.com/z")
+    with contextlib.redirect_stdout(io.StringIO()):
+        recovered = shard_runner.recover_shards()
+    status = "✓" if recovered == 1 and "2504228SHD200X" in load_checkpoint()['order_numbers'] else "✗"
+    print(f"{status} Leftover worker checkpoint recovered: {recovered} order")
+    
+    # An order skipped as already processed is never queued, so it isn't re-queued run after run
+    with open('orders.txt', 'w') as f:
+        f.write("2504228SHD200X\n")
+    summary = RunSummary()
+    with contextlib.redirect_stdout(io.StringIO()):
+        shard_runner.run_sharded(config, summary, executor=ThreadPoolExecutor(2), worker=fake_shard)
+    skipped_store = JobStore('jobs.db')
+    status = "✓" if skipped_store.get("2504228SHD200X") is None and "2504228SHD200X" not in skipped_store.requeue() else "✗"
+    print(f"{status} Skipped order kept out of the job store: {summary.requested - summary.to_process} skipped")
+    skipped_store.close()
+finally:
+    if shopee_automation._job_store is not None:
+        shopee_automation._job_store.close()
+        shopee_automation._job_store = None
+    shopee_automation._upload_cache = None
+    os.chdir(previous_dir)
+    shutil.rmtree(shard_folder)
+
+# Test 18: Unattended chat opening
+print("\n" + "="*60)
+print("TEST 18: Unattended Chat Opening (one deadline per order, new tabs)")
+print("="*60)
+
+import re
+from shopee_module import CHAT_READY_SELECTOR, ORDER_LINK_SELECTOR, PlaywrightTimeout, ShopeeAutomation
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'chat_standin.html'), encoding='utf-8') as f:
+    CHAT_HTML = f.read()
+# The stand-in page without its chat window
+DETAIL_HTML = CHAT_HTML[:CHAT_HTML.index('<div class="chat-window">')]
+READY_CLASSES = re.findall(r'\[class\*="([^"]+)"\]', CHAT_READY_SELECTOR)
+
+class FakeContext:
+    def __init__(self):
+        self.listeners = []
+    
+    def on(self, event, handler):
+        self.listeners.append(handler)
+    
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+        self.first = self
+    
+    def count(self):
+        return 0
+    
+    def click(self, timeout=None):
+        self.page.timeouts.append(timeout)
+        if self.selector == ORDER_LINK_SELECTOR:
+            time.sleep(self.page.detail_delay)
+            self.page.html = DETAIL_HTML
+        elif self.page.chat == 'tab':
+            # Like Playwright: the context sees every new tab, 'popup' only fires on the opener
+            tab = type(self.page)(self.page.context, html=CHAT_HTML)
+            self.page.tabs.append(tab)
+            for handler in list(self.page.context.listeners) + list(self.page.popup_listeners):
+                handler(tab)
+        elif self.page.chat == 'same':
+            self.page.html = CHAT_HTML
+        elif self.page.chat == 'missing':
+            time.sleep(timeout / 1000)
+            raise PlaywrightTimeout(f"No chat button within {timeout} ms")
+
+class FakeChatPage:
+    """
+    Seller Centre order pages: the chat button shows the stand-in chat
+    (fixtures/chat_standin.html) in the same tab or a new one, or is missing.
+    Waits that can't succeed take their whole timeout, like Playwright's.
+    """
+    
+    def __init__(self, context=None, chat='same', html='', detail_delay=0, chat_delay=0):
+        self.context = context or FakeContext()
+        self.chat = chat
+        self.detail_delay = detail_delay
+        self.chat_delay = chat_delay
+        self.html = html
+        self.tabs = []
+        self.popup_listeners = []
+        self.timeouts = []
+        self.shots = 0
+        self.closed = False
+    
+    def on(self, event, handler):
+        self.popup_listeners.append(handler)
+    
+    def remove_listener(self, event, handler):
+        self.popup_listeners.remove(handler)
+    
+    def goto(self, url, timeout=None, wait_until=None):
+        self.timeouts.append(timeout)
+        self.html = ''
+    
+    def locator(self, selector, has_text=None):
+        return FakeLocator(self, selector)
+    
+    def wait_for_selector(self, selector, state='visible', timeout=None):
+        self.timeouts.append(timeout)
+        if any(re.search(r'class="[^"]*' + re.escape(name), self.html) for name in READY_CLASSES):
+            return True
+        time.sleep(timeout / 1000)
+        raise PlaywrightTimeout(f"{selector} not visible within {timeout} ms")
+    
+    def screenshot(self, **kwargs):
+        self.shots += 1
+        return b"\x89PNG" + self.html[:16].encode()
+    
+    def close(self):
+        self.closed = True
+
+class AsyncFakeChatPage(FakeChatPage):
+    async def goto(self, url, timeout=None, wait_until=None):
+        FakeChatPage.goto(self, url, timeout, wait_until)
+    
+    def locator(self, selector, has_text=None):
+        locator = FakeLocator(self, selector)
+        async def click(timeout=None):
+            if selector != ORDER_LINK_SELECTOR:
+                await asyncio.sleep(self.chat_delay)
+            FakeLocator.click(locator, timeout)
+        async def count():
+            return 0
+        locator.click, locator.count = click, count
+        return locator
+    
+    async def wait_for_selector(self, selector, state='visible', timeout=None):
+        return FakeChatPage.wait_for_selector(self, selector, state, timeout)
+    
+    async def screenshot(self, **kwargs):
+        return FakeChatPage.screenshot(self, **kwargs)
+    
+    async def close(self):
+        FakeChatPage.close(self)
+
+def open_chat(chat, chat_timeout=2, detail_delay=0):
+    shopee = ShopeeAutomation('', '', unattended=True, interactive=False, in_memory=True, chat_timeout=chat_timeout)
+    shopee.page = FakeChatPage(chat=chat, detail_delay=detail_delay)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        shot = shopee.take_chat_screenshot("2504226A23B55PX")
+    return shot, shopee.page, time.perf_counter() - started
+
+status = "✓" if not load_capture_options(configparser.ConfigParser())['unattended'] else "✗"
+print(f"{status} Unattended capture is off unless enabled (batch mode turns it on)")
+
+shot, page, _ = open_chat('same')
+status = "✓" if shot is not None and page.shots == 1 and shot.data.startswith(b"\x89PNG") else "✗"
+print(f"{status} Chat in the same tab captured from the stand-in page")
+
+shot, page, _ = open_chat('tab')
+tab = page.tabs[0] if page.tabs else None
+status = "✓" if shot is not None and tab and tab.shots == 1 and tab.closed and page.shots == 0 and not page.popup_listeners else "✗"
+print(f"{status} Chat opened in a new tab is captured there and the tab closed")
+
+# A slow detail page uses up part of the deadline; each step used to get a full CHAT_TIMEOUT
+for chat in ('missing', 'blank'):
+    shot, page, elapsed = open_chat(chat, chat_timeout=1, detail_delay=0.6)
+    status = "✓" if shot is None and elapsed < 1.3 and not page.popup_listeners else "✗"
+    print(f"{status} Chat {chat}: order gives up after {elapsed:.2f}s (CHAT_TIMEOUT=1 for all steps)")
+
+async def open_chat_async():
+    from shopee_async import AsyncShopeeAutomation
+    shopee = AsyncShopeeAutomation('', '', unattended=True, interactive=False, in_memory=True, chat_timeout=2)
+    page = AsyncFakeChatPage(chat='tab')
+    return await shopee.take_chat_screenshot("2504226A23B55PX", page=page), page
+
+with contextlib.redirect_stdout(io.StringIO()):
+    shot, page = asyncio.run(open_chat_async())
+tab = page.tabs[0] if page.tabs else None
+status = "✓" if shot is not None and tab and tab.shots == 1 and tab.closed and not page.popup_listeners else "✗"
+print(f"{status} Async engine follows the chat into a new tab")
+
+async def open_chats_in_two_tabs():
+    # Two capture_pool tabs of one context: B's chat tab opens while A is still
+    # waiting for its own chat, which shows up in A's tab
+    from shopee_async import AsyncShopeeAutomation
+    shopee = AsyncShopeeAutomation('', '', unattended=True, interactive=False, in_memory=True, chat_timeout=2)
+    context = FakeContext()
+    tab_a = AsyncFakeChatPage(context, chat='same', chat_delay=0.1)
+    tab_b = AsyncFakeChatPage(context, chat='tab', chat_delay=0.05)
+    context.on('page', lambda new_page: None)
+    shots = await asyncio.gather(shopee.take_chat_screenshot("2504226A23B55PX", page=tab_a),
+                                 shopee.take_chat_screenshot("2504226B77C12QY", page=tab_b))
+    return shots, tab_a, tab_b
+
+with contextlib.redirect_stdout(io.StringIO()):
+    shots, tab_a, tab_b = asyncio.run(open_chats_in_two_tabs())
+chat_b = tab_b.tabs[0] if tab_b.tabs else None
+status = "✓" if (all(shots) and tab_a.shots == 1 and chat_b and chat_b.shots == 1 and chat_b.closed
+                 and not tab_a.closed and not tab_b.closed and tab_b.shots == 0) else "✗"
+print(f"{status} Two tabs opening chats at once each capture their own chat")
+
 # Clean up test checkpoint
 if os.path.exists(CHECKPOINT_FILE):
     os.remove(CHECKPOINT_FILE)
@@ -96,4 +1389,19 @@ print("\nSummary:")
 print("  - Order validation: Working")
 print("  - Checkpoint system: Working")
 print("  - Duplicate detection: Working")
+print("  - Excel report layout: Working")
+print("  - Capture profiles: Working")
+print("  - In-memory upload: Working")
+print("  - Batched sharing: Working")
+print("  - Drive client pool: Working")
+print("  - Resumable uploads: Working")
+print("  - Upload cache: Working")
+print("  - Drive rate limiting/retries: Working")
+print("  - Adaptive upload concurrency: Working")
+print("  - Offline Drive client startup: Working")
+print("  - Import-time budget: Working")
+print("  - Batch CLI: Working")
+print("  - Job store: Working")
+print("  - Sharded runs: Working")
+print("  - Unattended chat opening: Working")
 print("\n✓ System ready for production use!")
@@ -0,0 +1,148 @@
+"""
+Upload Cache Module
+Content-addressed cache of screenshots that are already on Google Drive
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_VERSION = 1
+
+
+def content_digest(data):
+    """Return the SHA-256 hex digest of screenshot bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadCache:
+    """
+    Maps the SHA-256 of screenshot bytes to the Drive file that holds them.
+
+    Entries are kept in least-recently-used order and the oldest are evicted
+    beyond max_entries. The cache is saved to a JSON file every save_every
+    changes and on save(); losing unsaved entries only costs a re-upload.
+    """
+
+    def __init__(self, path='upload_cache.json', max_entries=5000, save_every=20):
+        """
+        Args:
+            path: JSON file the cache is persisted to
+            max_entries: Maximum number of cached files (least recently used are evicted)
+            save_every: Save after this many changes
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_link = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        for digest, entry in data.get('entries', []):
+            self._entries[digest] = entry
+            self._by_link[entry['gdrive_link']] = digest
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            _, entry = self._entries.popitem(last=False)
+            self._by_link.pop(entry['gdrive_link'], None)
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes >= self.save_every:
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': list(self._entries.items())}, f)
+            os.replace(tmp_path, self.path)
+            self._changes = 0
+        except OSError as e:
+            print(f"⚠ Warning: Could not save upload cache: {e}")
+
+    def get(self, digest, folder_id):
+        """
+        Look up a screenshot by content digest.
+
+        Returns:
+            dict: 'file_id', 'gdrive_link' and 'shared' of the Drive copy in
+                  folder_id, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry['folder_id'] != folder_id:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, digest, folder_id, file_id, gdrive_link, shared=False):
+        """Remember that the bytes with this digest were uploaded as file_id."""
+        with self._lock:
+            self._entries[digest] = {
+                'folder_id': folder_id,
+                'file_id': file_id,
+                'gdrive_link': gdrive_link,
+                'shared': shared
+            }
+            self._entries.move_to_end(digest)
+            self._by_link[gdrive_link] = digest
+            self._evict()
+            self._changed()
+
+    def mark_shared(self, gdrive_link):
+        """Record that the file behind gdrive_link is shared with anyone with the link."""
+        with self._lock:
+            digest = self._by_link.get(gdrive_link)
+            if digest in self._entries and not self._entries[digest]['shared']:
+                self._entries[digest]['shared'] = True
+                self._changed()
+
+    def merge(self, other):
+        """
+        Add the entries of another cache (e.g. one kept by a worker process).
+
+        Returns:
+            int: Number of entries added or updated
+        """
+        with other._lock:
+            entries = list(other._entries.items())
+        with self._lock:
+            changed = 0
+            for digest, entry in entries:
+                if self._entries.get(digest) != entry:
+                    self._entries[digest] = dict(entry)
+                    self._by_link[entry['gdrive_link']] = digest
+                    changed += 1
+                self._entries.move_to_end(digest)
+            self._evict()
+            if changed:
+                self._changes += changed
+                self._save()
+            return changed
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save."""
+        with self._lock:
+            if self._changes:
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)